@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Excel -> Revit | MULTI (piu' workbook / piu' discipline)
+Esegue in un colpo solo gli import HVAC, PLU-FFS, ELE e SPE (tutti gli sheet di
+ciascuna disciplina) su uno o piu' file Excel:
+- ogni categoria viene raccolta una volta e ogni indice chiave -> elementi
+  costruito una volta per tutta la sessione (manens.session): Pipes / Pipe Fittings /
+  Ducts / Duct Fittings sono condivisi tra HVAC ed ELE;
+- un'unica Transaction: ogni blocco e' una SubTransaction al suo interno
+  (un solo passo di Annulla in Revit);
+- un report consolidato a fine esecuzione (per workbook, disciplina e blocco).
+
+Le singole discipline restano quelle dei rispettivi pulsanti (stesso codice,
+caricato dalle cartelle vicine), con le stesse regole di match.
+"""
+
+__title__  = 'Excel to Revit\nMULTI'
+__author__ = 'Valerio Mascia'
+
+import clr, os, imp
+from System.Runtime.InteropServices import Marshal
+
+# Excel Interop
+clr.AddReference("Microsoft.Office.Interop.Excel")
+from Microsoft.Office.Interop import Excel
+
+# Revit
+clr.AddReference("RevitAPI")
+from Autodesk.Revit.DB import Transaction, TransactionStatus
+
+# Dialog / UI
+clr.AddReference("System.Windows.Forms")
+clr.AddReference("System.Drawing")
+from System.Windows.Forms import (
+    OpenFileDialog, DialogResult, Form, CheckBox, Button, Label, AnchorStyles,
+    FormStartPosition, FormBorderStyle
+)
+from System.Drawing import Point, Size, Font, FontStyle
+
+# Libreria condivisa (lib/ dell'estensione)
+from manens import comprobe, profiler, session, timing
+
+doc = __revit__.ActiveUIDocument.Document
+
+_PANEL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (disciplina, cartella del pulsante) nell'ordine di esecuzione
+DISCIPLINES = [
+    ("HVAC",    "Excel to Revit HVAC.pushbutton"),
+    ("PLU-FFS", "Excel to Revit PLU-FFS.pushbutton"),
+    ("ELE",     "Excel to Revit ELE.pushbutton"),
+    ("SPE",     "Excel to Revit SPE.pushbutton"),
+]
+
+def load_importer(name, folder):
+    """Carica lo script della disciplina come modulo (main() non viene eseguito)."""
+    path = os.path.join(_PANEL_DIR, folder, "script.py")
+    mod_name = "manens_import_" + name.replace("-", "_").lower()
+    return imp.load_source(mod_name, path)
+
+# ==================== UI ====================
+class RunPickerForm(Form):
+    def __init__(self):
+        Form.__init__(self)
+        self.Text = "Excel → Revit | MULTI"
+        self.StartPosition = FormStartPosition.CenterScreen
+        self.FormBorderStyle = FormBorderStyle.FixedDialog
+        self.MaximizeBox = False; self.MinimizeBox = False
+        self.ClientSize = Size(430, 250)
+
+        lbl = Label(); lbl.Text = "Discipline da importare (tutti gli sheet):"
+        lbl.Location = Point(16, 16); lbl.AutoSize = True
+        lbl.Font = Font(self.Font, FontStyle.Bold)
+        self.Controls.Add(lbl)
+
+        self._y = 48; self._dy = 26
+        def addchk(text, checked=True):
+            c = CheckBox(); c.Text = text
+            c.Location = Point(20, self._y); c.AutoSize = True; c.Checked = checked
+            self.Controls.Add(c); self._y += self._dy
+            return c
+
+        self.chkDisc = dict((name, addchk(name)) for name, folder in DISCIPLINES)
+        self.chkINC  = addchk("Solo righe modificate dall'ultimo import (incrementale)", False)
+
+        self.btnOk = Button(); self.btnOk.Text="OK"; self.btnOk.Size=Size(100,28)
+        self.btnOk.Location = Point(self.ClientSize.Width - 220, 208)
+        self.btnOk.Anchor = AnchorStyles.Bottom | AnchorStyles.Right
+        self.btnOk.DialogResult = DialogResult.OK; self.Controls.Add(self.btnOk)
+
+        self.btnCancel = Button(); self.btnCancel.Text="Annulla"; self.btnCancel.Size=Size(100,28)
+        self.btnCancel.Location = Point(self.ClientSize.Width - 110, 208)
+        self.btnCancel.Anchor = AnchorStyles.Bottom | AnchorStyles.Right
+        self.btnCancel.DialogResult = DialogResult.Cancel; self.Controls.Add(self.btnCancel)
+
+        self.AcceptButton = self.btnOk; self.CancelButton = self.btnCancel
+
+def pick_excel_paths():
+    dlg = OpenFileDialog()
+    dlg.Title  = "Seleziona uno o piu' file Excel"
+    dlg.Filter = "Excel (*.xlsx;*.xlsm;*.xls)|*.xlsx;*.xlsm;*.xls"
+    dlg.Multiselect = True
+    return list(dlg.FileNames) if dlg.ShowDialog() == DialogResult.OK else []
+
+# ==================== MAIN ====================
+def main():
+    form = RunPickerForm()
+    if form.ShowDialog() != DialogResult.OK: return
+
+    selected = [(name, folder) for name, folder in DISCIPLINES if form.chkDisc[name].Checked]
+    if not selected:
+        print("Nessuna disciplina selezionata. Operazione annullata.")
+        return
+
+    paths = pick_excel_paths()
+    if not paths: return
+
+    importers = []
+    for name, folder in selected:
+        try:
+            importers.append((name, load_importer(name, folder)))
+            profiler.instrument(importers[-1][1].__dict__, name + u".")
+        except Exception as ex:
+            print("[{}] Import non disponibile: {}".format(name, ex))
+    if not importers: return
+
+    sess = session.begin(doc)
+    timing.begin("Excel to Revit MULTI", paths)
+    excel = None
+    t = Transaction(doc, "Excel→Revit | MULTI")
+    t.Start()
+    try:
+        excel = Excel.ApplicationClass()
+        excel.Visible = False; excel.DisplayAlerts = False
+
+        for path in paths:
+            sess.workbook = os.path.basename(path)
+            workbook = None
+            try:
+                workbook = excel.Workbooks.Open(path)
+                timing.lap("open")
+                book = comprobe.wrap(workbook)
+                for name, mod in importers:
+                    sess.discipline = name
+                    timing.scope(u"{} | {}".format(name, sess.workbook) if len(paths) > 1 else name)
+                    print("==== {} | {} ====".format(name, sess.workbook))
+                    try:
+                        mod.run_workbook(book, path, incremental=form.chkINC.Checked)
+                    except Exception as ex:
+                        print("[{}] Errore: {}".format(name, ex))
+                # solo lettura: non salviamo Excel
+                workbook.Close(False)
+            finally:
+                try:
+                    if workbook: Marshal.ReleaseComObject(workbook)
+                except: pass
+        if t.Commit() == TransactionStatus.Committed:
+            sess.committed()    # hash per riga solo a transazione confermata
+        timing.lap("commit")
+    except:
+        t.RollBack()
+        timing.end()
+        raise
+    finally:
+        session.end()
+        try:
+            if excel:
+                excel.Quit()
+                Marshal.ReleaseComObject(excel)
+        except: pass
+
+    timing.lap("report")
+    print("==== Report consolidato ====")
+    for line in sess.report():
+        print(line)
+    timing.end()
+    comprobe.finish()
+
+if __name__ == "__main__":
+    profiler.run(main, globals())
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Revit -> Excel | BATCH (molti modelli, senza dialog per ogni export)
+Esegue gli export descritti in un file di job JSON, uno per modello:
+
+    [{"model": "C:\\Progetti\\A.rvt", "workbook": "C:\\BoQ\\A.xlsx", "blocks": ["HVAC", "ELE:PASSERELLE"]},
+     {"model": "C:\\Progetti\\B.rvt", "workbook": "C:\\BoQ\\B.xlsx", "blocks": ["PLU-FFS"]}]
+
+- "blocks": disciplina intera o disciplina:blocco (nomi di BLOCKS negli export);
+- i modelli gia' aperti vengono usati cosi' come sono, gli altri vengono aperti
+  e richiusi senza salvare a fine esecuzione;
+- ogni workbook viene aperto e salvato una volta per tutti i job che lo
+  riguardano (manens.batch), con un record JSON in %APPDATA%\\Manens\\runs.
+
+Il file di job si sceglie con un dialog, oppure si passa con la variabile
+d'ambiente MANENS_BATCH (esecuzione notturna senza interazione).
+"""
+
+__title__  = 'Revit to Excel\nBATCH'
+__author__ = 'Valerio Mascia'
+
+import clr, os
+
+# Dialog / UI
+clr.AddReference("System.Windows.Forms")
+from System.Windows.Forms import OpenFileDialog, DialogResult
+
+# Libreria condivisa (lib/ dell'estensione)
+from manens import batch, profiler
+
+app = getattr(__revit__, "Application", __revit__)
+
+
+def pick_jobs_path():
+    path = (os.environ.get("MANENS_BATCH") or "").strip()
+    if path: return path
+    dlg = OpenFileDialog()
+    dlg.Title  = "Seleziona il file dei job (JSON)"
+    dlg.Filter = "Job batch (*.json)|*.json"
+    dlg.Multiselect = False
+    return dlg.FileName if dlg.ShowDialog() == DialogResult.OK else None
+
+def open_documents(paths):
+    """{percorso: documento}, [documenti aperti qui (da chiudere)]."""
+    by_path = {}
+    for d in app.Documents:
+        try: by_path[os.path.normcase(d.PathName)] = d
+        except: pass
+    docs = {}; opened = []
+    for p in paths:
+        k = os.path.normcase(p)
+        if k in docs: continue
+        d = by_path.get(k)
+        if d is None:
+            try:
+                d = app.OpenDocumentFile(p)
+                opened.append(d)
+            except Exception as ex:
+                print("[BATCH] Modello non aperto: {} ({})".format(p, ex))
+                d = None
+        docs[k] = d
+    return docs, opened
+
+def main():
+    jobs_path = pick_jobs_path()
+    if not jobs_path: return
+    jobs = batch.load_jobs(jobs_path)
+    docs, opened = open_documents([j["model"] for j in jobs])
+    try:
+        run = [(docs[os.path.normcase(j["model"])], j["workbook"], j.get("blocks") or [d for d, f in batch.EXPORTERS])
+               for j in jobs if docs.get(os.path.normcase(j["model"])) is not None]
+        results = batch.run(run)
+    finally:
+        for d in opened:
+            try: d.Close(False)
+            except: pass
+
+    print("==== Export batch: {} job, {} workbook ====".format(len(run), len(results)))
+    for r in results:
+        print("{} | {} | JSON: {}".format(
+            os.path.basename(r["workbook"]), "OK" if not r["errors"] else u"; ".join(r["errors"]), r["run"]))
+
+if __name__ == "__main__":
+    profiler.run(main, globals())
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+Strumenti di sviluppo Manens (solo CPython 3 / Linux, non caricati da pyRevit).
+
+Stand-in dell'API Revit e dell'interop Excel per eseguire e profilare i
+pushbutton fuori da Revit:
+- revit_standin: FilteredElementCollector, BuiltInCategory / BuiltInParameter,
+  Parameter (AsDouble / AsString / AsValueString...), ElementId, GetElement,
+  LookupParameter, Transaction / SubTransaction, dialog e form finti;
+- excel_standin: workbook in memoria (Cells / Range / Value2 / End / Sort...),
+  con il conteggio delle chiamate "COM" in STATS;
+- modelgen: modelli sintetici parametrici (numero di istanze, di tipi, seed);
+- boqgen: workbook BoQ compilati e "sporchi" (sinonimi, virgole, Φ, righe
+  vuote, colonne utente) per gli import, con il controllo di equivalenza;
+- bench: benchmark di tutti i blocchi export / import;
+- comreplay: riesecuzione delle registrazioni COM di produzione (manens.comrec).
+- batch: export batch di piu' modelli (manens.batch) su un pool di processi.
+
+Uso (dalla radice del repository):
+    PYTHONPATH=devtools:lib python3
+    >>> from manens_dev import modelgen, revit_standin as rv, excel_standin as xs
+    >>> m = modelgen.install_model(5000, seed=1, n_types=12)
+    >>> rv.OpenFileDialog.next_path = "/tmp/boq.xlsx"
+    >>> xs.new_workbook("/tmp/boq.xlsx", ["Foglio1"])
+    >>> rv.load_script("Manens.tab/Revit to Excel.panel/Revit to Excel HVAC.pushbutton/script.py").main()
+"""
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Export batch (manens.batch) sul modello finto, con i job indipendenti
+distribuiti su un pool di processi.
+
+I job hanno la forma del file del pulsante Revit to Excel BATCH, con "model"
+= dimensione[:seed] del modello sintetico (modelgen) al posto del .rvt:
+    [{"model": "20k:1", "workbook": "/tmp/boq_a.json.gz", "blocks": ["HVAC", "ELE:PASSERELLE"]}, ...]
+I job sullo stesso workbook restano nello stesso processo (un'apertura per
+file, come in Revit); i workbook .json / .json.gz vengono letti e salvati su
+disco (excel_standin), i record JSON vanno in $APPDATA/Manens/runs.
+
+Uso (dalla radice del repository):
+    PYTHONPATH=devtools:lib python3 -m manens_dev.batch --jobs jobs.json [--workers 4]
+    PYTHONPATH=devtools:lib python3 -m manens_dev.batch --models 8 --size 20k --out /tmp/batch
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import warnings
+from timeit import default_timer as _now
+
+from manens_dev import modelgen, revit_standin as rv
+from manens_dev.bench import parse_size
+
+
+def parse_model(spec):
+    """"20k:3" -> (20000, 3); seed 1 se manca."""
+    size, _, seed = u"{}".format(spec).partition(u":")
+    return parse_size(size), int(seed or 1)
+
+def group(jobs):
+    """[(workbook, [(modello, blocchi)])]: un gruppo = un processo."""
+    order = []; by_path = {}
+    for j in jobs:
+        key = os.path.abspath(j["workbook"])
+        if key not in by_path:
+            by_path[key] = []
+            order.append(key)
+        by_path[key].append((j["model"], j.get("blocks")))
+    return [(k, by_path[k]) for k in order]
+
+
+def work(item):
+    """Un workbook con tutti i suoi job (eseguito nel processo del pool)."""
+    warnings.simplefilter("ignore", DeprecationWarning)     # imp in manens.batch
+    from manens import batch
+    path, jobs = item
+    t0 = _now()
+    rv.install()
+    models = {}
+    run = []
+    for spec, blocks in jobs:
+        m = models.get(spec)
+        if m is None:
+            n, seed = parse_model(spec)
+            m = models[spec] = modelgen.build_model(
+                n, seed, path=u"C:\\Progetti\\Synthetic_%s.rvt" % u"{}".format(spec).replace(u":", u"_"))
+        run.append((m.doc, path, blocks or [d for d, f in batch.EXPORTERS]))
+    rv.set_document(run[0][0])
+    t1 = _now()
+    res = batch.run(run)
+    for r in res:
+        r["model_s"] = round(t1 - t0, 2)
+        r["export_s"] = round(_now() - t1, 2)
+        r["pid"] = os.getpid()
+    return res
+
+
+def synthetic_jobs(n_models, size, out, blocks=None):
+    """Un modello (seed diverso) e un workbook per job."""
+    if not os.path.isdir(out): os.makedirs(out)
+    return [{"model": u"{}:{}".format(size, i + 1),
+             "workbook": os.path.join(out, "boq_%02d.json.gz" % (i + 1)),
+             "blocks": blocks} for i in range(n_models)]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Export batch Manens sul modello finto")
+    ap.add_argument("--jobs", default=None, help="file di job JSON (model = dimensione[:seed])")
+    ap.add_argument("--models", type=int, default=4, help="senza --jobs: numero di modelli sintetici")
+    ap.add_argument("--size", default="10k", help="senza --jobs: istanze per modello")
+    ap.add_argument("--blocks", default=None, help="senza --jobs: es. HVAC,ELE:PASSERELLE (default tutto)")
+    ap.add_argument("--out", default="/tmp/manens_batch", help="senza --jobs: cartella dei workbook")
+    ap.add_argument("--workers", type=int, default=None, help="processi (default: CPU; 1 = in questo processo)")
+    a = ap.parse_args(argv)
+
+    if a.jobs:
+        with open(a.jobs) as f: jobs = json.load(f)
+        base = os.path.dirname(os.path.abspath(a.jobs))
+        for j in jobs: j["workbook"] = os.path.join(base, j["workbook"])
+    else:
+        blocks = [b for b in (a.blocks or "").split(",") if b.strip()] or None
+        jobs = synthetic_jobs(a.models, a.size, a.out, blocks)
+    groups = group(jobs)
+    workers = max(1, min(a.workers or multiprocessing.cpu_count(), len(groups)))
+
+    t0 = _now()
+    if workers == 1:
+        results = [r for g in groups for r in work(g)]
+    else:
+        pool = multiprocessing.Pool(workers)
+        try:
+            results = [r for res in pool.imap_unordered(work, groups) for r in res]
+        finally:
+            pool.close(); pool.join()
+    wall = _now() - t0
+
+    print("{:<40} {:>8} {:>9} {:>9}  {}".format("workbook", "pid", "modello s", "export s", "esito"))
+    for r in sorted(results, key=lambda r: r["workbook"]):
+        print("{:<40} {:>8} {:>9.2f} {:>9.2f}  {}".format(
+            os.path.basename(r["workbook"]), r["pid"], r["model_s"], r["export_s"],
+            "OK" if not r["errors"] else "; ".join(r["errors"])))
+    busy = sum(r["model_s"] + r["export_s"] for r in results)
+    print("[BATCH] {} job, {} workbook, {} processi: {:.1f} s (somma {:.1f} s)".format(
+        len(jobs), len(groups), workers, wall, busy))
+    return 1 if any(r["errors"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark di tutti i blocchi export (run_*_into_workbook) e import (import_*)
+su modelli e workbook sintetici, a piu' dimensioni.
+
+Per ogni dimensione e disciplina (un workbook per disciplina, come in ufficio):
+  export   -> blocchi su sheet vuoti, senza snapshot del modello (manens.snapshot)
+  reexport -> stessi blocchi su sheet gia' compilati (percorso update / delete,
+              sincronizzazione completa: sync.FULL), valori dallo snapshot
+  unchanged -> di nuovo, con l'impronta del modello invariata (foglio saltato)
+  import   -> dopo fill_boq, ogni import_* sul suo sheet (con --messy sul
+              workbook sporcato da boqgen: sinonimi, virgole, Φ, buchi, colonne
+              utente), indici senza snapshot
+Per ogni blocco: tempo (ms), picco di memoria (KB, tracemalloc), chiamate al
+workbook (excel_standin.STATS) e ms per fase (manens.timing). tracemalloc
+rallenta molto: tempi e chiamate vengono da un passaggio senza tracciamento,
+i picchi da un secondo passaggio identico (stesso seed, stesso stato).
+
+Uso (dalla radice del repository):
+    PYTHONPATH=devtools:lib python3 -m manens_dev.bench --sizes 10k,100k,1M \\
+        --baseline devtools/bench_baseline.json [--save-baseline] [--threshold 0.25]
+Con --baseline il confronto fallisce (exit 1) se un blocco peggiora oltre la
+soglia in tempo o memoria (oltre un minimo assoluto, contro il rumore) o se
+aumenta il numero di chiamate al workbook (deterministico a parita' di seed).
+Il modello da 1M istanze richiede diversi GB di RAM e decine di minuti.
+
+    PYTHONPATH=devtools:lib python3 -m manens_dev.bench --suggest [20k:10k]
+misura i suggerimenti per le righe senza elementi (manens.suggest): righe
+Excel con un refuso (boqgen) contro le chiavi del modello; fallisce se indice
+e ricerche superano SUGGEST_TARGET_MS o se una riga resta senza suggerimento.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tracemalloc
+from timeit import default_timer as _now
+
+from manens_dev import modelgen, revit_standin as rv, excel_standin as xs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+EXPORT_DIR = os.path.join(ROOT, "Manens.tab", "Revit to Excel.panel")
+IMPORT_DIR = os.path.join(ROOT, "Manens.tab", "Excel to Revit.panel")
+DISCIPLINES = ("HVAC", "PLU-FFS", "ELE", "SPE")
+
+# sheet degli import che non hanno SHEETS_DISPATCH
+SPE_SHEETS = {"Generale": "import_generale", "Cavidotti": "import_cavidotti"}
+
+MIN_MS = 20.0       # sotto questa differenza il tempo non conta come regressione
+MIN_KB = 256.0
+SUGGEST_TARGET_MS = 1000.0  # indice + ricerche, CPython (IronPython e' piu' lento)
+
+
+def parse_size(text):
+    t = text.strip().lower()
+    mult = 1
+    if t.endswith("k"): mult, t = 1000, t[:-1]
+    elif t.endswith("m"): mult, t = 1000000, t[:-1]
+    return int(float(t) * mult)
+
+def size_label(n):
+    if n % 1000000 == 0: return "%dM" % (n // 1000000)
+    if n % 1000 == 0: return "%dk" % (n // 1000)
+    return str(n)
+
+
+def _script(folder, disc, kind):
+    name = "Revit to Excel %s.pushbutton" % disc if kind == "export" else "Excel to Revit %s.pushbutton" % disc
+    return rv.load_script(os.path.join(folder, name, "script.py"),
+                          "manens_bench_%s_%s" % (kind, disc.replace("-", "_").lower()))
+
+def export_blocks(mod):
+    """run_*_into_workbook dei moduli di manens.blocks, nell'ordine di BLOCKS dello script."""
+    from manens import blocks
+    return [getattr(blocks.load(module, mod.doc), fn) for name, module, fn in mod.BLOCKS]
+
+def import_blocks(mod, disc):
+    """[(funzione, sheet o None se l'import prende il workbook)]"""
+    fns = [getattr(mod, n) for n in dir(mod) if n.startswith("import_") and callable(getattr(mod, n))]
+    fns = sorted([f for f in fns if getattr(f, "__code__", None)], key=lambda f: f.__code__.co_firstlineno)
+    by_fn = {}
+    for sheet, fn in (getattr(mod, "SHEETS_DISPATCH", None) or {}).items():
+        by_fn.setdefault(fn.__name__, sheet)
+    if disc == "SPE":
+        for sheet, name in SPE_SHEETS.items(): by_fn[name] = sheet
+    out = []
+    for f in fns:
+        if f.__code__.co_varnames[:1] == ("workbook",): out.append((f, None))
+        elif f.__name__ in by_fn: out.append((f, by_fn[f.__name__]))
+    return out
+
+
+def _measure(label, call, memory, verbose):
+    from manens import timing
+    xs.reset_stats()
+    if memory:
+        if not tracemalloc.is_tracing(): tracemalloc.start()
+        tracemalloc.reset_peak()
+    m0 = tracemalloc.get_traced_memory()[0] if memory else 0
+    run = timing.begin("bench", label, buffered=False)
+    out = io.StringIO()
+    t0 = _now()
+    try:
+        if verbose: call()
+        else:
+            with contextlib.redirect_stdout(out): call()
+    finally:
+        ms = (_now() - t0) * 1000.0
+        timing.end(show=False, save=False)
+    peak = (tracemalloc.get_traced_memory()[1] - m0) / 1024.0 if memory else 0.0
+    phases = {}
+    for b in run.blocks:
+        for p in b.phases: phases[p] = phases.get(p, 0) + b.ms(p)
+    stats = dict(xs.STATS)
+    return {"ms": round(ms, 1), "peak_kb": round(max(peak, 0.0), 1),
+            "calls": sum(stats.values()), "stats": stats, "phases": phases}
+
+
+def run_size(n, seed=1, disciplines=DISCIPLINES, memory=True, verbose=False, n_types=None, messy=None):
+    """{blocco: misure}; con memory un secondo passaggio sotto tracemalloc da' i picchi.
+       messy = None (BoQ pulito) o righe per sheet del BoQ sporco (0 = quelle dell'export)."""
+    results = _run_pass(n, seed, disciplines, False, verbose, n_types, messy)
+    if memory:
+        peaks = _run_pass(n, seed, disciplines, True, False, n_types, messy)
+        tracemalloc.stop()
+        for key, r in results.items():
+            if key in peaks: r["peak_kb"] = peaks[key]["peak_kb"]
+    return results
+
+def _run_pass(n, seed, disciplines, memory, verbose, n_types, messy=None):
+    results = {}
+    t0 = _now()
+    modelgen.install_model(n, seed=seed, n_types=n_types)
+    print("[BENCH] {}: modello in {:.1f} s{}".format(size_label(n), _now() - t0, " (memoria)" if memory else ""))
+    for disc in disciplines:
+        path = "/tmp/manens_bench_%s_%d.xlsx" % (disc, n)
+        book = xs.new_workbook(path, ["Foglio1"])
+        exp = _script(EXPORT_DIR, disc, "export")
+        imp = _script(IMPORT_DIR, disc, "import")
+        from manens import snapshot
+        from manens.blocks import sync
+        for mode in ("export", "reexport", "unchanged"):
+            sync.FULL = mode != "unchanged"
+            snapshot.FULL = mode == "export"
+            for fn in export_blocks(exp):
+                key = "%s/%s/%s" % (disc, mode, fn.__name__)
+                results[key] = _measure(key, lambda: fn(book), memory, verbose)
+        sync.FULL = None
+        snapshot.FULL = True        # import: indici senza snapshot precedente
+        xs.fill_boq(book, seed=seed)
+        mode = "import"
+        if messy is not None:
+            from manens_dev import boqgen
+            boqgen.messify(book, disc, seed=seed, rows=messy or None)
+            mode = "import-messy"
+        for fn, sheet in import_blocks(imp, disc):
+            key = "%s/%s/%s" % (disc, mode, fn.__name__)
+            if sheet is None:
+                results[key] = _measure(key, lambda: fn(book), memory, verbose)
+            else:
+                sh = imp.get_sheet(book, sheet)
+                if sh is None: continue
+                results[key] = _measure(key, lambda: fn(sh), memory, verbose)
+        xs.REGISTRY.pop(path, None)
+        snapshot.FULL = None
+    return results
+
+
+def time_to_dialog(repeat=5):
+    """{pulsante: ms} dal clic al dialog: compilazione dello script dal sorgente
+       (pyRevit non tiene bytecode degli script), import ed esecuzione fino a
+       RunPickerForm.ShowDialog (qui annullato). Migliore di `repeat` prove."""
+    out = {}
+    rv.Form.next_result = rv._DialogResult.Cancel
+    try:
+        for folder in (EXPORT_DIR, IMPORT_DIR):
+            for name in sorted(os.listdir(folder)):
+                path = os.path.join(folder, name, "script.py")
+                if not os.path.exists(path): continue
+                best = None
+                for _ in range(repeat):
+                    t0 = _now()
+                    with io.open(path, encoding="utf-8") as f: code = compile(f.read(), path, "exec")
+                    ns = {"__name__": "manens_bench_dialog", "__file__": path}
+                    exec(code, ns)
+                    if "main" in ns:
+                        with contextlib.redirect_stdout(io.StringIO()): ns["main"]()
+                    ms = (_now() - t0) * 1000.0
+                    best = ms if best is None else min(best, ms)
+                out[name.replace(".pushbutton", "")] = round(best, 1)
+    finally:
+        rv.Form.next_result = rv._DialogResult.OK
+    return out
+
+
+def suggest_keys(n_keys, seed=1):
+    """n_keys chiavi (famiglia, tipo, diametro) con testi diversi, nomi come quelli di modelgen."""
+    import random
+    rnd = random.Random(seed)
+    words = (modelgen.PIPE_TYPES + modelgen.INS_TYPES + modelgen.DUCT_TYPES + modelgen.TRAY_TYPES +
+             modelgen.COND_TYPES + modelgen.FIT_FAMILIES + modelgen.MEQ_FAMILIES + modelgen.CFIT_TYPES)
+    discs = (u"HVAC", u"PLU", u"ELE", u"SPE", u"EEQ", u"SEQ", u"MEQ")
+    keys = []; seen = set()
+    while len(keys) < n_keys:
+        fam = u"MAN_%s_%s" % (rnd.choice(discs), rnd.choice(words).replace(u" ", u""))
+        typ = u"%s %d" % (rnd.choice(words), rnd.randint(1, 400))
+        if (fam, typ) in seen: continue
+        seen.add((fam, typ))
+        keys.append((fam, typ, rnd.choice(modelgen.PIPE_DIAMS) * 1000))
+    return keys
+
+def suggest_case(n_keys=20000, n_rows=10000, seed=1):
+    """Tempi di SuggestIndex (ms) e qualita' su n_rows righe con un refuso nel nome."""
+    import random
+    from manens_dev.boqgen import _typo
+    from manens.suggest import SuggestIndex
+    rnd = random.Random(seed + 1)
+    keys = suggest_keys(n_keys, seed)
+    rows = []
+    for k in rnd.sample(keys, min(n_rows, len(keys))):
+        j = rnd.randint(0, 1)
+        rows.append((tuple(_typo(p, rnd) if i == j else p for i, p in enumerate(k)), k))
+    t0 = _now()
+    idx = SuggestIndex(keys)
+    t1 = _now()
+    found = [(idx.suggest(row), k) for row, k in rows]
+    t2 = _now()
+    return {"keys": len(keys), "rows": len(rows), "index_ms": round((t1 - t0) * 1000.0, 1),
+            "query_ms": round((t2 - t1) * 1000.0, 1),
+            "none": sum(1 for f, k in found if not f),
+            "top1": sum(1 for f, k in found if f and f[0][1] == k),
+            "top3": sum(1 for f, k in found if any(c == k for sc, c in f))}
+
+
+def compare(current, baseline, threshold):
+    """Righe di regressione (vuoto = ok) tra due {size: {blocco: misure}}."""
+    bad = []
+    for size, blocks in sorted(current.items()):
+        base = baseline.get(size) or {}
+        for key, cur in sorted(blocks.items()):
+            ref = base.get(key)
+            if not ref: continue
+            if cur["ms"] > ref["ms"] * (1.0 + threshold) and cur["ms"] - ref["ms"] > MIN_MS:
+                bad.append("{} {}: tempo {:.0f} ms (baseline {:.0f})".format(size, key, cur["ms"], ref["ms"]))
+            if ref.get("peak_kb") and cur["peak_kb"] > ref["peak_kb"] * (1.0 + threshold) and cur["peak_kb"] - ref["peak_kb"] > MIN_KB:
+                bad.append("{} {}: memoria {:.0f} KB (baseline {:.0f})".format(size, key, cur["peak_kb"], ref["peak_kb"]))
+            if cur["calls"] > ref["calls"]:
+                bad.append("{} {}: chiamate workbook {} (baseline {})".format(size, key, cur["calls"], ref["calls"]))
+    return bad
+
+
+def table(results):
+    lines = []
+    for size, blocks in sorted(results.items(), key=lambda kv: parse_size(kv[0])):
+        lines.append("== {} ==".format(size))
+        lines.append("{:<58} {:>10} {:>10} {:>9}".format("blocco", "ms", "peak KB", "chiamate"))
+        for key in sorted(blocks):
+            r = blocks[key]
+            lines.append("{:<58} {:>10.1f} {:>10.0f} {:>9}".format(key, r["ms"], r["peak_kb"], r["calls"]))
+    return lines
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark blocchi export / import Manens")
+    ap.add_argument("--sizes", default="10k,100k,1M")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--types", type=int, default=None, help="tipi per categoria (default: modelgen)")
+    ap.add_argument("--only", default=",".join(DISCIPLINES), help="discipline, es. HVAC,ELE")
+    ap.add_argument("--baseline", default=None, help="file JSON di riferimento")
+    ap.add_argument("--save-baseline", action="store_true", help="scrive i risultati in --baseline")
+    ap.add_argument("--threshold", type=float, default=0.25)
+    ap.add_argument("--out", default=None, help="JSON dei risultati")
+    ap.add_argument("--messy", type=parse_size, default=None, const=0, nargs="?",
+                    help="import su BoQ sporco (boqgen), opz. righe per sheet")
+    ap.add_argument("--no-memory", action="store_true", help="senza il passaggio tracemalloc (meta' tempo)")
+    ap.add_argument("-v", "--verbose", action="store_true", help="mostra l'output degli script")
+    ap.add_argument("--dialog", action="store_true", help="solo il tempo dal clic al dialog di ogni pulsante")
+    ap.add_argument("--suggest", default=None, const="20k:10k", nargs="?",
+                    help="solo i suggerimenti per le righe senza elementi: chiavi:righe")
+    a = ap.parse_args(argv)
+
+    if a.suggest:
+        n_keys, _, n_rows = a.suggest.partition(":")
+        r = suggest_case(parse_size(n_keys), parse_size(n_rows or n_keys), a.seed)
+        total = r["index_ms"] + r["query_ms"]
+        print("[BENCH] Suggerimenti: {} chiavi, {} righe | indice {:.0f} ms, ricerche {:.0f} ms "
+              "(totale {:.0f}, obiettivo {:.0f}) | senza suggerimento {} | top-1 {} | top-3 {}".format(
+                  r["keys"], r["rows"], r["index_ms"], r["query_ms"], total, SUGGEST_TARGET_MS,
+                  r["none"], r["top1"], r["top3"]))
+        return 1 if total > SUGGEST_TARGET_MS or r["none"] else 0
+
+    if a.dialog:
+        modelgen.install_model(100, seed=a.seed)
+        for name, ms in sorted(time_to_dialog().items()):
+            print("{:<40} {:>8.1f} ms".format(name, ms))
+        return 0
+
+    memory = not a.no_memory
+    discs = [d.strip() for d in a.only.split(",") if d.strip()]
+    results = {}
+    for s in a.sizes.split(","):
+        n = parse_size(s)
+        results[size_label(n)] = run_size(n, a.seed, discs, memory, a.verbose, a.types, a.messy)
+    for line in table(results): print(line)
+
+    if a.out:
+        with open(a.out, "w") as f: json.dump(results, f, indent=1, sort_keys=True)
+    if a.baseline and a.save_baseline:
+        base = {}
+        if os.path.exists(a.baseline):
+            with open(a.baseline) as f: base = json.load(f)
+        base.update(results)
+        with open(a.baseline, "w") as f: json.dump(base, f, indent=1, sort_keys=True)
+        print("[BENCH] Baseline salvata: {}".format(a.baseline))
+        return 0
+    if a.baseline:
+        if not os.path.exists(a.baseline):
+            print("[BENCH] Baseline non trovata: {}".format(a.baseline)); return 2
+        with open(a.baseline) as f: base = json.load(f)
+        bad = compare(results, base, a.threshold)
+        for line in bad: print("[REGRESSIONE] " + line)
+        print("[BENCH] {} regressioni (soglia {:.0%})".format(len(bad), a.threshold))
+        return 1 if bad else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""
+Workbook BoQ sintetici "sporchi", come tornano compilati dai progettisti.
+
+Il punto di partenza e' il workbook prodotto dagli export reali sul modello
+attivo (stessi sheet, stesse chiavi: "Tubazioni", "Isolante Tubazioni",
+"Raccordi Tubi", "Generale", "Cavidotti", "Passerelle"...), compilato con
+MAN_ProductCode / MAN_BoQ_Units. messify() lo sporca con i tratti che gli
+import devono tollerare:
+- synonyms:  intestazioni sinonime / maiuscole diverse (solo dove l'import le
+             accetta: SPE, build_row_map_with_syns) e spazi attorno ai nomi;
+- comma:     misure come testo con la virgola decimale ("12,5", "50,0");
+- phi:       prefissi / suffissi sulle misure ("Φ50", "Ø 50 mm", "200 X 60 mm");
+- gaps:      righe vuote tra i dati, sempre meno di EMPTY_RUN_STOP, a volte con
+             una nota solo nelle colonne utente (subtotali);
+- user_cols: colonne dell'utente (note, prezzi con la virgola...) intercalate
+             alle colonne dell'export;
+- extra:     righe senza elementi nel modello (refusi, tipi fuori modello)
+             fino a `rows` righe per sheet;
+- footer:    titolo sopra l'intestazione e un "Totale" oltre EMPTY_RUN_STOP
+             righe vuote, che gli import non devono leggere.
+Nessun tratto cambia il risultato dell'import: check() importa il workbook
+pulito e quello sporco su due copie identiche del modello e confronta i
+parametri scritti.
+
+Uso (dalla radice del repository):
+    PYTHONPATH=devtools:lib python3 -m manens_dev.boqgen --n 10k --rows 2000 \\
+        --out /tmp/boq [--only HVAC,ELE] [--traits comma,gaps] [--check]
+Con --out i workbook (pulito e sporco) sono salvati come <out>_<DISC>.json.gz,
+rileggibili con excel_standin.load().
+"""
+import argparse
+import contextlib
+import io
+import random
+import sys
+
+from manens_dev import bench, modelgen, excel_standin as xs
+
+HEADER_ROW = 3
+FIRST_ROW = 5
+EMPTY_RUN_STOP = 20     # come detect_data_region_by_cols negli import
+
+TRAITS = ("synonyms", "comma", "phi", "gaps", "user_cols", "extra", "footer")
+
+# colonne misura (mm_key / wh_key negli import)
+SIZE_HEADERS = ("Diameter", "Insulation Thickness", "Pipe Size", "MAN_Fittings_MaxSize",
+                "Width/Height - Diameter", "Outside Diameter", "Height")
+WH_HEADERS = ("Size",)
+NAME_HEADERS = ("Type Name", "Family Name")
+
+# sinonimi accettati dagli import (oltre al nome canonico); le altre discipline
+# leggono solo i nomi esatti
+SYNONYMS = {
+    "SPE": {
+        "Family Name": [u"Family", u"FamilyName", u"family name"],
+        "Type Name": [u"Type", u"TypeName", u"type name"],
+        "Outside Diameter": [u"OutsideDiameter", u"Outside Dia", u"OD", u"OD mm"],
+        "MAN_ProductCode": [u"ProductCode", u"Product Code", u"man_productcode"],
+        "MAN_BoQ_Units": [u"BoQ_Units", u"BoQ Units"],
+    },
+}
+
+USER_COLUMNS = [u"Note", u"Fornitore", u"Prezzo unitario", u"Quantita'", u"Rev.", u"Codice interno"]
+SUPPLIERS = [u"Rossi Impianti", u"Termoidraulica Nord", u"Elettro Sud", u"ACME"]
+NOTES = [u"verificare", u"da offerta", u"vedi tavola M-101", u"OK", u"sostituito in rev. B"]
+
+
+def _silent(call):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return call()
+
+
+# ==================== workbook pulito ====================
+def export_book(disc, path):
+    """Workbook con gli sheet dell'export reale della disciplina (modello attivo)."""
+    book = xs.new_workbook(path, ["Foglio1"])
+    exp = bench._script(bench.EXPORT_DIR, disc, "export")
+    for fn in bench.export_blocks(exp):
+        _silent(lambda: fn(book))
+    return book
+
+def clone(book, path):
+    """Copia indipendente (celle e ordine degli sheet), registrata in REGISTRY."""
+    out = xs.new_workbook(path, [])
+    for sh in book._sheets:
+        dst = out.sheet(sh.Name)
+        dst.Visible = sh.Visible
+        dst._rows = dict((r, dict(rd)) for r, rd in sh._rows.items())
+    return out
+
+def data_sheets(book):
+    return [sh for sh in book._sheets if sh._rows.get(HEADER_ROW)]
+
+
+# ==================== tratti ====================
+def _mm_text(v):
+    s = u"%.3f" % float(v)
+    return s.rstrip(u"0").rstrip(u".")
+
+def _messy_size(v, rnd, traits):
+    """Stessa misura (per mm_key), scritta come la scriverebbe una persona."""
+    try: f = float(v)
+    except:
+        try: f = float(u"%s" % v.replace(u"mm", u""))      # "125 mm" (Pipe Size)
+        except: return v
+    forms = []
+    if "comma" in traits:
+        forms += [_mm_text(f).replace(u".", u","), (u"%.1f" % f).replace(u".", u",")]
+    if "phi" in traits:
+        t = _mm_text(f)
+        forms += [u"Φ" + t, u"Ø " + t + u" mm", t + u" mm", u"ø" + t]
+    if not forms or rnd.random() < 0.3: return v
+    return rnd.choice(forms)
+
+def _messy_wh(v, rnd, traits):
+    if "phi" not in traits or not v or rnd.random() < 0.3: return v
+    parts = u"%s" % v
+    if u"x" not in parts: return v
+    w, h = parts.split(u"x", 1)
+    if "comma" in traits and rnd.random() < 0.3:
+        w, h = w + u",0", h + u",0"
+    return rnd.choice([u"%s X %s" % (w, h), u"%s x %s mm" % (w, h), u"%smm x %smm" % (w, h)])
+
+def _typo(s, rnd):
+    """Lettere scambiate o doppie (mai sugli spazi, che gli import normalizzano)."""
+    s = u"%s" % s
+    at = [i for i in range(1, len(s) - 1) if s[i].isalpha() and s[i + 1].isalpha() and s[i] != s[i + 1]]
+    if not at: return s + u"-X"
+    i = rnd.choice(at)
+    if rnd.random() < 0.5:
+        return s[:i] + s[i + 1] + s[i] + s[i + 2:]
+    return s[:i] + s[i] + s[i:]
+
+def _user_value(name, rnd):
+    if name == u"Prezzo unitario":
+        return (u"%.2f" % rnd.uniform(1, 900)).replace(u".", u",")
+    if name == u"Quantita'":
+        return rnd.choice([(u"%.1f" % rnd.uniform(0.5, 300)).replace(u".", u","), float(rnd.randint(1, 50))])
+    if name == u"Fornitore": return rnd.choice(SUPPLIERS)
+    if name == u"Rev.": return rnd.choice([u"A", u"B", u"C"])
+    if name == u"Codice interno": return u"INT-%04d" % rnd.randint(1, 9999)
+    return rnd.choice(NOTES)
+
+
+def _extra_rows(rows, cols, n, rnd):
+    """Righe senza elementi: refuso sul nome di tipo o tipo fuori dal modello."""
+    tn = cols.get("Type Name")
+    if not rows or not tn or n <= 0: return []
+    seen = set(r[tn] for r in rows if r.get(tn))
+    pc = cols.get("MAN_ProductCode")
+    out = []
+    for i in range(n):
+        r = dict(rnd.choice(rows))
+        name = _typo(r.get(tn) or u"Tipo", rnd) if rnd.random() < 0.7 else None
+        if not name or name in seen:
+            name = u"Tipo fuori modello %d" % (i + 1)
+        r[tn] = name
+        if pc: r[pc] = u"PC-EXTRA-%05d" % (i + 1)
+        out.append(r)
+    return out
+
+
+def messify(book, disc, seed=0, traits=TRAITS, rows=None):
+    """Sporca in place tutti gli sheet con intestazione; rows = righe dati per sheet
+       (con "extra" le righe mancanti sono righe senza elementi nel modello)."""
+    rnd = random.Random(seed)
+    traits = set(traits)
+    syn = SYNONYMS.get(disc, {}) if "synonyms" in traits else {}
+    for sh in data_sheets(book):
+        hdr = sh._rows[HEADER_ROW]
+        cols = dict((v, c) for c, v in hdr.items())
+        data = [dict(sh._rows[r]) for r in sorted(sh._rows) if r >= FIRST_ROW]
+        if "extra" in traits and rows and rows > len(data):
+            data += _extra_rows(data, cols, rows - len(data), rnd)
+            rnd.shuffle(data)
+
+        # nuovo ordine delle colonne: utente intercalate, colonna A lasciata vuota
+        order = sorted(set(hdr) | set(c for rd in data for c in rd))
+        users = []
+        if "user_cols" in traits:
+            users = rnd.sample(USER_COLUMNS, rnd.randint(2, len(USER_COLUMNS)))
+            for u in users:
+                order.insert(rnd.randint(1, len(order)), u)
+        pos = dict((k, i + 2) for i, k in enumerate(order))      # colonna B in poi
+
+        new = {}
+        def put(r, key, v):
+            if v is None or v == u"": return
+            new.setdefault(r, {})[pos[key]] = v
+
+        for key in order:
+            name = hdr.get(key, key)
+            if key in hdr:
+                alts = syn.get(name)
+                if alts and rnd.random() < 0.7: name = rnd.choice(alts)
+                if "synonyms" in traits and rnd.random() < 0.2: name = u" %s " % name
+            put(HEADER_ROW, key, name)
+        if "footer" in traits:
+            new[1] = {2: u"Computo metrico - %s" % sh.Name}
+            new[HEADER_ROW - 1] = {2: u"Compilare le colonne MAN_ProductCode e MAN_BoQ_Units"}
+
+        size_cols = set(cols[h] for h in SIZE_HEADERS if h in cols)
+        wh_cols = set(cols[h] for h in WH_HEADERS if h in cols)
+        r = FIRST_ROW
+        for rd in data:
+            if "gaps" in traits and r > FIRST_ROW and rnd.random() < 0.02:
+                gap = rnd.randint(1, EMPTY_RUN_STOP - 1)
+                if users and rnd.random() < 0.5:
+                    put(r + gap // 2, users[0], u"Subtotale")
+                r += gap
+            for c, v in rd.items():
+                if c in size_cols: v = _messy_size(v, rnd, traits)
+                elif c in wh_cols: v = _messy_wh(v, rnd, traits)
+                put(r, c, v)
+            for u in users:
+                if rnd.random() < 0.4: put(r, u, _user_value(u, rnd))
+            r += 1
+        if "footer" in traits and "Type Name" in cols:
+            put(r + EMPTY_RUN_STOP + 5, cols["Type Name"], u"Totale generale")
+        sh._rows = new
+    return book
+
+
+def build(disc, path, seed=1, traits=TRAITS, rows=None, fraction=1.0):
+    """(pulito, sporco) per la disciplina, dal modello attivo."""
+    clean = export_book(disc, path)
+    xs.fill_boq(clean, seed=seed, fraction=fraction)
+    messy = clone(clean, path.replace(".xlsx", "_messy.xlsx"))
+    messify(messy, disc, seed=seed, traits=traits, rows=rows)
+    return clean, messy
+
+
+# ==================== equivalenza ====================
+def import_all(book, disc):
+    """Esegue ogni import_* della disciplina sul workbook (come bench)."""
+    imp = bench._script(bench.IMPORT_DIR, disc, "import")
+    for fn, sheet in bench.import_blocks(imp, disc):
+        if sheet is None:
+            _silent(lambda: fn(book))
+            continue
+        sh = imp.get_sheet(book, sheet)
+        if sh is not None: _silent(lambda: fn(sh))
+
+def snapshot(model):
+    """{Id: (MAN_ProductCode, MAN_BoQ_Units)} degli elementi del modello."""
+    out = {}
+    for eid, e in model.doc._by_id.items():
+        named = getattr(e, "_named", None) or {}
+        pc, uq = named.get("MAN_ProductCode"), named.get("MAN_BoQ_Units")
+        if pc is not None or uq is not None:
+            out[eid] = (pc._value if pc else None, uq._value if uq else None)
+    return out
+
+def check(disc, n, seed=1, traits=TRAITS, rows=None, n_types=None):
+    """Importa pulito e sporco su due modelli identici; [differenze] (vuoto = ok)."""
+    modelgen.install_model(n, seed=seed, n_types=n_types)
+    path = "/tmp/manens_boq_%s_%d.xlsx" % (disc, n)
+    clean, messy = build(disc, path, seed, traits, rows)
+    res = []
+    for book in (clean, messy):
+        m = modelgen.install_model(n, seed=seed, n_types=n_types)
+        import_all(book, disc)
+        res.append(snapshot(m))
+    a, b = res
+    diff = ["%s Id %s: pulito %r, sporco %r" % (disc, k, a.get(k), b.get(k))
+            for k in sorted(set(a) | set(b)) if a.get(k) != b.get(k)]
+    n_set = sum(1 for v in a.values() if v[0])
+    print("[BOQ] {}: {} elementi compilati, {} differenze".format(disc, n_set, len(diff)))
+    xs.REGISTRY.pop(clean.FullName, None); xs.REGISTRY.pop(messy.FullName, None)
+    return diff
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Workbook BoQ sintetici sporchi per gli import Manens")
+    ap.add_argument("--n", default="10k", help="istanze del modello (es. 10k, 1M)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--types", type=int, default=None, help="tipi per categoria (default: modelgen)")
+    ap.add_argument("--rows", type=bench.parse_size, default=None, help="righe dati per sheet (con extra)")
+    ap.add_argument("--only", default=",".join(bench.DISCIPLINES), help="discipline, es. HVAC,ELE")
+    ap.add_argument("--traits", default=",".join(TRAITS))
+    ap.add_argument("--out", default=None, help="prefisso dei file .json.gz")
+    ap.add_argument("--check", action="store_true", help="confronta import pulito / sporco")
+    a = ap.parse_args(argv)
+
+    n = bench.parse_size(a.n)
+    discs = [d.strip() for d in a.only.split(",") if d.strip()]
+    traits = [t.strip() for t in a.traits.split(",") if t.strip()]
+    bad = [t for t in traits if t not in TRAITS]
+    if bad:
+        print("[BOQ] Tratti sconosciuti: {} (validi: {})".format(", ".join(bad), ", ".join(TRAITS))); return 2
+    if a.out:
+        modelgen.install_model(n, seed=a.seed, n_types=a.types)
+        for disc in discs:
+            clean, messy = build(disc, "/tmp/manens_boq_%s.xlsx" % disc, a.seed, traits, a.rows)
+            for book, tag in ((clean, "clean"), (messy, "messy")):
+                p = "%s_%s_%s.json.gz" % (a.out, disc, tag)
+                xs.dump(book, p)
+                print("[BOQ] {} ({} sheet, {} righe)".format(p, len(data_sheets(book)),
+                      sum(len(sh._rows) for sh in data_sheets(book))))
+    if a.check:
+        diffs = []
+        for disc in discs:
+            diffs += check(disc, n, a.seed, traits, a.rows, a.types)
+        for line in diffs[:50]: print("[DIFF] " + line)
+        return 1 if diffs else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
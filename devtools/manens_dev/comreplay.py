@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Riesecuzione delle registrazioni COM (manens.comrec) sul workbook finto.
+
+Il file registrato in produzione (MANENS_COMREC=1) contiene lo stato iniziale
+di ogni sheet e la sequenza delle operazioni con gli esiti. Replay lo riesegue
+su excel_standin: ogni lettura viene confrontata con il valore registrato (le
+differenze dicono dove lo stand-in non si comporta come Excel), ogni blocco
+viene cronometrato, e in qualunque punto si possono prendere gli sheet con i
+dati veri del cliente per provare una variante di read_table, write_cells o
+sort_region di manens.blocks.sync senza il suo modello ne' Excel:
+
+    from manens_dev import comreplay
+    rp = comreplay.Replay(comreplay.load("...-Revit_to_Excel_HVAC.jsonl.gz"))
+    rp.run(until="PIPE")                      # stato all'inizio del blocco PIPE
+    sheet = rp.books[0].Worksheets.Item["Tubazioni"]
+
+Uso (dalla radice del repository):
+    PYTHONPATH=devtools:lib python3 -m manens_dev.comreplay FILE [--until BLOCCO]
+        [--dump PREFISSO] [--show 10]
+"""
+import argparse
+import gzip
+import json
+import sys
+from timeit import default_timer as _now
+
+from manens_dev import revit_standin as rv, excel_standin as xs
+
+
+def load(path):
+    """Operazioni del file (liste JSON), nell'ordine di registrazione."""
+    op = gzip.open if path.endswith(".gz") else open
+    with op(path, "rt") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _plain(v):
+    """Esito dello stand-in nella stessa forma del file (per il confronto)."""
+    if hasattr(v, "GetLength"):
+        lo = v.GetLowerBound(0)
+        return {"a": [[v.GetValue(i + lo, j + lo) for j in range(v.GetLength(1))]
+                      for i in range(v.GetLength(0))], "lo": lo}
+    if isinstance(v, tuple): return {"t": [_plain(x) for x in v]}
+    return v
+
+def _same(a, b):
+    if isinstance(a, dict) and "e" in a: a = a["e"]
+    if isinstance(a, float) or isinstance(b, float):
+        try: return abs(float(a) - float(b)) < 1e-9
+        except (TypeError, ValueError): return False
+    if isinstance(a, dict) and isinstance(b, dict) and "a" in a:
+        ra, rb = a.get("a") or [], b.get("a") or []
+        return len(ra) == len(rb) and all(
+            len(x) == len(y) and all(_same(p, q) for p, q in zip(x, y)) for x, y in zip(ra, rb))
+    return a == b
+
+
+class Replay(object):
+    def __init__(self, ops):
+        self.ops = ops
+        self.pos = 0
+        self.books = []
+        self.objs = {}
+        self.block = None
+        self.blocks = []        # [nome] nell'ordine di prima apparizione
+        self.stats = {}         # blocco -> {"ops", "ms", "diff", "errors"}
+        self.samples = []       # (blocco, operazione, registrato, stand-in)
+
+    # ---- decodifica ----
+    def _dec(self, v):
+        if isinstance(v, list): return [self._dec(x) for x in v]
+        if not isinstance(v, dict): return v
+        if "r" in v: return self.objs.get(v["r"])
+        if "t" in v: return tuple(self._dec(x) for x in v["t"])
+        if "e" in v: return v["e"]
+        if "a" in v: return rv.Array.from_rows(v["a"], lower=v.get("lo", 0))
+        return None
+
+    def _out(self, out, v, op):
+        if isinstance(out, dict) and "r" in out:
+            self.objs[out["r"]] = v
+            return
+        if not _same(out, _plain(v)):
+            st = self._stat()
+            st["diff"] += 1
+            if len(self.samples) < 200: self.samples.append((self.block, op[:3], out, _plain(v)))
+
+    def _stat(self):
+        st = self.stats.get(self.block)
+        if st is None:
+            st = self.stats[self.block] = {"ops": 0, "ms": 0.0, "diff": 0, "errors": 0}
+            self.blocks.append(self.block)
+        return st
+
+    def _open(self, op):
+        rid, path, sheets = op[1], op[2], op[3]
+        book = xs.Workbook(path or u"replay_%d.xlsx" % rid)
+        for name, vis, r0, c0, vals in sheets:
+            sh = book.sheet(name)
+            if isinstance(vis, dict): vis = vis.get("e", vis)
+            sh.Visible = vis
+            if isinstance(vals, dict) and "a" in vals:
+                for i, row in enumerate(vals["a"]):
+                    for j, v in enumerate(row): sh._set(r0 + i, c0 + j, v)
+            else:
+                sh._set(r0, c0, vals)
+        xs.REGISTRY[book.FullName] = book
+        self.books.append(book)
+        self.objs[rid] = book
+
+    # ---- esecuzione ----
+    def step(self, op):
+        kind = op[0]
+        if kind == "b":
+            self.block = op[1]; self._stat(); return
+        if kind == "o":
+            self._open(op); return
+        obj = self.objs.get(op[1])
+        if kind == "g":
+            v = getattr(obj, op[2]); self._out(op[3], v, op)
+        elif kind == "s":
+            setattr(obj, op[2], self._dec(op[3]))
+        elif kind == "c":
+            kw = dict((k, self._dec(x)) for k, x in op[3].items())
+            v = obj(*self._dec(op[2]), **kw); self._out(op[4], v, op)
+        elif kind == "i":
+            v = obj[self._dec(op[2])]; self._out(op[3], v, op)
+        elif kind == "n":
+            for out, v in zip(op[2], list(obj)): self._out(out, v, op)
+
+    def run(self, until=None):
+        """Riesegue fino alla fine (o fino al primo blocco il cui nome contiene `until`)."""
+        while self.pos < len(self.ops):
+            op = self.ops[self.pos]
+            if until and op[0] == "b" and op[1] and until in op[1]:
+                return self
+            self.pos += 1
+            t0 = _now()
+            try:
+                self.step(op)
+            except Exception:
+                self._stat()["errors"] += 1
+            st = self._stat()
+            st["ms"] += (_now() - t0) * 1000.0
+            if op[0] not in ("b", "o"): st["ops"] += 1
+        return self
+
+    def table(self):
+        lines = ["{:<40} {:>10} {:>10} {:>8} {:>7}".format("blocco", "operazioni", "ms", "diverse", "errori")]
+        for b in self.blocks:
+            st = self.stats[b]
+            lines.append("{:<40} {:>10} {:>10.1f} {:>8} {:>7}".format(
+                b or "(fuori blocco)", st["ops"], st["ms"], st["diff"], st["errors"]))
+        return lines
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Riesegue una registrazione COM Manens sul workbook finto")
+    ap.add_argument("path")
+    ap.add_argument("--until", default=None, help="ferma all'inizio del blocco (es. PIPE)")
+    ap.add_argument("--dump", default=None, help="prefisso dei workbook risultanti (.json.gz)")
+    ap.add_argument("--show", type=int, default=10, help="letture diverse da mostrare")
+    a = ap.parse_args(argv)
+
+    t0 = _now()
+    ops = load(a.path)
+    print("[REPLAY] {} operazioni lette in {:.1f} s".format(len(ops), _now() - t0))
+    rp = Replay(ops).run(until=a.until)
+    for line in rp.table(): print(line)
+    for blk, op, rec, got in rp.samples[:a.show]:
+        print("[DIFF] {} {}: registrato {!r}, stand-in {!r}".format(blk, op, rec, got))
+    if a.dump:
+        for i, book in enumerate(rp.books):
+            p = "%s_%d.json.gz" % (a.dump, i)
+            xs.dump(book, p)
+            print("[REPLAY] {}".format(p))
+    return 1 if any(st["diff"] or st["errors"] for st in rp.stats.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,626 @@
+# -*- coding: utf-8 -*-
+"""
+Stand-in in memoria dell'interop Excel (Microsoft.Office.Interop.Excel).
+
+Modella solo quello che usano gli script Manens: Cells/Range/Rows, Value2 con
+array 2D (base 1 in lettura, come COM), End(xlToLeft/xlUp), EntireRow.Delete,
+Sort con SortFields (testo nell'ordine di manens.collate, come Excel), Worksheets.Item/Add,
+Workbooks.Open/Save/Close.
+
+I workbook vivono in `REGISTRY` (percorso -> dati); se il percorso termina in
+`.json`/`.json.gz` vengono anche letti/scritti su disco. Ogni chiamata COM
+"costosa" viene contata in `STATS` per i benchmark.
+"""
+import gzip
+import json
+import os
+import types
+
+from manens import collate
+from manens_dev import revit_standin as _rv
+
+MAX_ROWS = 1048576
+MAX_COLS = 16384
+
+REGISTRY = {}
+STATS = {}
+
+
+def _count(name, n=1):
+    STATS[name] = STATS.get(name, 0) + n
+
+
+def reset_stats():
+    STATS.clear()
+
+
+# ==================== enum ====================
+class _Ns(object):
+    def __init__(self, **kw):
+        self.__dict__.update(kw)
+
+
+XlDirection = _Ns(xlToLeft=-4159, xlToRight=-4161, xlUp=-4162, xlDown=-4121)
+XlSortOn = _Ns(xlSortOnValues=0)
+XlSortOrder = _Ns(xlAscending=1, xlDescending=2)
+XlSortDataOption = _Ns(xlSortNormal=0, xlSortTextAsNumbers=1)
+XlSortOrientation = _Ns(xlSortColumns=1, xlSortRows=2)
+XlYesNoGuess = _Ns(xlGuess=0, xlYes=1, xlNo=2)
+XlSheetVisibility = _Ns(xlSheetVisible=-1, xlSheetHidden=0, xlSheetVeryHidden=2)
+XlCalculation = _Ns(xlCalculationAutomatic=-4105, xlCalculationManual=-4135)
+
+
+def _col_letters(c):
+    s = ""
+    while c > 0:
+        c, r = divmod(c - 1, 26)
+        s = chr(65 + r) + s
+    return s
+
+
+def _parse_a1(ref):
+    ref = ref.replace("$", "").upper()
+    i = 0
+    while i < len(ref) and ref[i].isalpha():
+        i += 1
+    col = 0
+    for ch in ref[:i]:
+        col = col * 26 + (ord(ch) - 64)
+    return int(ref[i:]), col
+
+
+# ==================== Range ====================
+class Range(object):
+    def __init__(self, sheet, r0, c0, r1=None, c1=None):
+        self._sh = sheet
+        self.r0 = r0; self.c0 = c0
+        self.r1 = r0 if r1 is None else r1
+        self.c1 = c0 if c1 is None else c1
+        if self.r1 < self.r0: self.r0, self.r1 = self.r1, self.r0
+        if self.c1 < self.c0: self.c0, self.c1 = self.c1, self.c0
+
+    # --- geometria ---
+    @property
+    def Row(self):
+        return self.r0
+
+    @property
+    def Column(self):
+        return self.c0
+
+    @property
+    def Count(self):
+        return (self.r1 - self.r0 + 1) * (self.c1 - self.c0 + 1)
+
+    @property
+    def Rows(self):
+        return _Counter(self.r1 - self.r0 + 1)
+
+    @property
+    def Columns(self):
+        return _Counter(self.c1 - self.c0 + 1)
+
+    @property
+    def EntireRow(self):
+        return Range(self._sh, self.r0, 1, self.r1, MAX_COLS)
+
+    @property
+    def Address(self):
+        return "$%s$%d:$%s$%d" % (_col_letters(self.c0), self.r0, _col_letters(self.c1), self.r1)
+
+    def Cells(self, r, c):
+        return Range(self._sh, self.r0 + r - 1, self.c0 + c - 1)
+
+    def Resize(self, nr, nc):
+        return Range(self._sh, self.r0, self.c0, self.r0 + nr - 1, self.c0 + nc - 1)
+
+    def Offset(self, dr, dc):
+        return Range(self._sh, self.r0 + dr, self.c0 + dc, self.r1 + dr, self.c1 + dc)
+
+    # --- valori ---
+    def _get_value(self):
+        sh = self._sh
+        if self.r0 == self.r1 and self.c0 == self.c1:
+            _count("cell_read")
+            return sh._get(self.r0, self.c0)
+        _count("range_read"); _count("range_read_cells", self.Count)
+        rows = []
+        data = sh._rows
+        for r in range(self.r0, self.r1 + 1):
+            rd = data.get(r)
+            if rd is None:
+                rows.append([None] * (self.c1 - self.c0 + 1))
+            else:
+                rows.append([rd.get(c) for c in range(self.c0, self.c1 + 1)])
+        return _rv.Array.from_rows(rows, lower=1)
+
+    def _set_value(self, v):
+        sh = self._sh
+        if isinstance(v, _rv.Array):
+            _count("range_write"); _count("range_write_cells", self.Count)
+            n0 = min(v.GetLength(0), self.r1 - self.r0 + 1)
+            n1 = min(v.GetLength(1), self.c1 - self.c0 + 1)
+            lo = v._lo
+            for i in range(n0):
+                for j in range(n1):
+                    sh._set(self.r0 + i, self.c0 + j, v._data[i][j])
+            return
+        if self.r0 == self.r1 and self.c0 == self.c1:
+            _count("cell_write")
+        else:
+            _count("range_write"); _count("range_write_cells", self.Count)
+        for r in range(self.r0, self.r1 + 1):
+            for c in range(self.c0, self.c1 + 1):
+                sh._set(r, c, v)
+
+    Value2 = property(_get_value, _set_value)
+    Value = property(_get_value, _set_value)
+
+    @property
+    def Text(self):
+        v = self._sh._get(self.r0, self.c0)
+        _count("cell_read")
+        if v is None:
+            return u""
+        if isinstance(v, float) and v == int(v):
+            return u"%d" % int(v)
+        return u"%s" % v
+
+    def _get_formula(self):
+        v = self._get_value()
+        return v
+
+    def _set_formula(self, v):
+        _count("formula_write")
+        self._set_value(v)
+
+    Formula = property(_get_formula, _set_formula)
+    FormulaR1C1 = property(_get_formula, _set_formula)
+
+    # --- navigazione ---
+    def End(self, direction):
+        _count("end")
+        sh = self._sh
+        r, c = self.r0, self.c0
+        if direction in (XlDirection.xlToLeft, XlDirection.xlToRight):
+            step = -1 if direction == XlDirection.xlToLeft else 1
+            limit = 1 if step < 0 else MAX_COLS
+            cols = sorted(sh._rows.get(r, {}).keys())
+            filled = set(c2 for c2 in cols if sh._get(r, c2) is not None)
+            return Range(sh, r, _end_scan(c, step, limit, filled))
+        step = -1 if direction == XlDirection.xlUp else 1
+        limit = 1 if step < 0 else MAX_ROWS
+        filled = set(r2 for r2, rd in sh._rows.items() if rd.get(c) is not None)
+        return Range(sh, _end_scan(r, step, limit, filled), c)
+
+    # --- modifiche ---
+    def Delete(self, shift=None):
+        _count("delete")
+        if self.c0 == 1 and self.c1 == MAX_COLS:
+            self._sh._delete_rows(self.r0, self.r1)
+        else:
+            self.ClearContents()
+
+    def ClearContents(self):
+        _count("clear")
+        sh = self._sh
+        for r in range(self.r0, self.r1 + 1):
+            rd = sh._rows.get(r)
+            if rd is None:
+                continue
+            for c in list(rd.keys()):
+                if self.c0 <= c <= self.c1:
+                    del rd[c]
+            if not rd:
+                del sh._rows[r]
+
+    Clear = ClearContents
+
+    def Insert(self, shift=None):
+        _count("insert")
+        if self.c0 == 1 and self.c1 == MAX_COLS:
+            self._sh._insert_rows(self.r0, self.r1 - self.r0 + 1)
+
+
+def _end_scan(pos, step, limit, filled):
+    """Semantica di Ctrl+freccia: fine del blocco contiguo o prossima cella piena."""
+    nxt = pos + step
+    if pos in filled and nxt in filled:
+        while (nxt + step) in filled and nxt != limit:
+            nxt += step
+        return nxt
+    if step < 0:
+        cands = [p for p in filled if p < pos]
+        return max(cands) if cands else limit
+    cands = [p for p in filled if p > pos]
+    return min(cands) if cands else limit
+
+
+class _Counter(object):
+    def __init__(self, n):
+        self.Count = n
+
+
+# ==================== Sort ====================
+class _SortFields(object):
+    def __init__(self):
+        self._fields = []
+
+    def Clear(self):
+        self._fields = []
+
+    def Add(self, Key=None, SortOn=None, Order=None, DataOption=None, **kw):
+        self._fields.append((Key, Order if Order is not None else XlSortOrder.xlAscending))
+
+    @property
+    def Count(self):
+        return len(self._fields)
+
+
+class _Sort(object):
+    def __init__(self, sheet):
+        self._sh = sheet
+        self.SortFields = _SortFields()
+        self._rng = None
+        self.Header = XlYesNoGuess.xlNo
+        self.MatchCase = False
+        self.Orientation = XlSortOrientation.xlSortColumns
+        self.SortMethod = None
+
+    def SetRange(self, rng):
+        self._rng = rng
+
+    def Apply(self):
+        _count("sort")
+        rng = self._rng
+        sh = self._sh
+        if rng is None:
+            return
+        r0 = rng.r0 + (1 if self.Header == XlYesNoGuess.xlYes else 0)
+        r1 = rng.r1
+        rows = []
+        for r in range(r0, r1 + 1):
+            rd = sh._rows.get(r) or {}
+            rows.append(dict(rd))
+
+        def sort_val(v):
+            # Excel: numeri < testo (collazione di Windows) < vuoti (gli ultimi restano in fondo)
+            if v is None or v == "":
+                return (2, 0)
+            if isinstance(v, (int, float)) and not isinstance(v, bool):
+                return (0, float(v))
+            return (1, collate.key(u"%s" % v))
+
+        for key, order in reversed(self.SortFields._fields):
+            col = key.c0
+            blanks = [rw for rw in rows if rw.get(col) in (None, "")]
+            vals = [rw for rw in rows if rw.get(col) not in (None, "")]
+            vals.sort(key=lambda rw: sort_val(rw.get(col)), reverse=(order == XlSortOrder.xlDescending))
+            rows = vals + blanks
+        for i, rd in enumerate(rows):
+            r = r0 + i
+            old = sh._rows.get(r) or {}
+            new = dict((c, v) for c, v in old.items() if not (rng.c0 <= c <= rng.c1))
+            for c, v in rd.items():
+                if rng.c0 <= c <= rng.c1:
+                    new[c] = v
+            if new:
+                sh._rows[r] = new
+            else:
+                sh._rows.pop(r, None)
+
+
+# ==================== Worksheet ====================
+class _RowsAccessor(object):
+    def __init__(self, sheet):
+        self._sh = sheet
+        self.Count = MAX_ROWS
+
+    def __getitem__(self, r):
+        return Range(self._sh, r, 1, r, MAX_COLS)
+
+    def __call__(self, r):
+        return self[r]
+
+
+class _ColsAccessor(object):
+    def __init__(self, sheet):
+        self._sh = sheet
+        self.Count = MAX_COLS
+
+    def __getitem__(self, c):
+        return Range(self._sh, 1, c, MAX_ROWS, c)
+
+    def __call__(self, c):
+        return self[c]
+
+
+class _RangeAccessor(object):
+    """Supporta sia sheet.Range[a, b] che sheet.Range(a, b) e riferimenti A1."""
+
+    def __init__(self, sheet):
+        self._sh = sheet
+
+    def _make(self, a, b=None):
+        if isinstance(a, str):
+            if ":" in a and b is None:
+                a, b = a.split(":", 1)
+            r0, c0 = _parse_a1(a)
+            a = Range(self._sh, r0, c0)
+        if isinstance(b, str):
+            r1, c1 = _parse_a1(b)
+            b = Range(self._sh, r1, c1)
+        if b is None:
+            return a
+        return Range(self._sh, min(a.r0, b.r0), min(a.c0, b.c0), max(a.r1, b.r1), max(a.c1, b.c1))
+
+    def __getitem__(self, ab):
+        if isinstance(ab, tuple):
+            return self._make(*ab)
+        return self._make(ab)
+
+    def __call__(self, a, b=None):
+        return self._make(a, b)
+
+
+class _CellsAccessor(object):
+    def __init__(self, sheet):
+        self._sh = sheet
+
+    def __call__(self, r, c):
+        return Range(self._sh, int(r), int(c))
+
+    def __getitem__(self, rc):
+        return self(*rc)
+
+
+class Worksheet(object):
+    def __init__(self, book, name):
+        self._book = book
+        self.Name = name
+        self._rows = {}
+        self.Visible = XlSheetVisibility.xlSheetVisible
+        self.Cells = _CellsAccessor(self)
+        self.Range = _RangeAccessor(self)
+        self.Rows = _RowsAccessor(self)
+        self.Columns = _ColsAccessor(self)
+        self.Sort = _Sort(self)
+
+    @property
+    def UsedRange(self):
+        if not self._rows:
+            return Range(self, 1, 1)
+        rmax = max(self._rows)
+        cmax = max(max(rd) for rd in self._rows.values() if rd)
+        return Range(self, 1, 1, rmax, cmax)
+
+    def _get(self, r, c):
+        rd = self._rows.get(r)
+        return None if rd is None else rd.get(c)
+
+    def _set(self, r, c, v):
+        if v is None or (isinstance(v, str) and v == ""):
+            rd = self._rows.get(r)
+            if rd is not None:
+                rd.pop(c, None)
+                if not rd:
+                    del self._rows[r]
+            return
+        rd = self._rows.get(r)
+        if rd is None:
+            rd = {}; self._rows[r] = rd
+        rd[c] = v
+
+    def _delete_rows(self, r0, r1):
+        n = r1 - r0 + 1
+        new = {}
+        for r, rd in self._rows.items():
+            if r < r0:
+                new[r] = rd
+            elif r > r1:
+                new[r - n] = rd
+        self._rows = new
+
+    def _insert_rows(self, r0, n):
+        new = {}
+        for r, rd in self._rows.items():
+            new[r + n if r >= r0 else r] = rd
+        self._rows = new
+
+    def Delete(self):
+        self._book._sheets.remove(self)
+
+    def Activate(self):
+        pass
+
+    # --- helper per test/harness ---
+    def to_rows(self, r0=1, r1=None, c1=None):
+        if not self._rows:
+            return []
+        r1 = r1 or max(self._rows)
+        c1 = c1 or max(max(rd) for rd in self._rows.values() if rd)
+        return [[self._get(r, c) for c in range(1, c1 + 1)] for r in range(r0, r1 + 1)]
+
+    def load_rows(self, rows, r0=1):
+        for i, row in enumerate(rows):
+            for j, v in enumerate(row):
+                self._set(r0 + i, j + 1, v)
+
+
+class _ItemAccessor(object):
+    def __init__(self, sheets):
+        self._sheets = sheets
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return self._sheets._sheets[key - 1]
+        for sh in self._sheets._sheets:
+            if sh.Name == key:
+                return sh
+        raise Exception("Invalid index. (Exception from HRESULT: 0x8002000B (DISP_E_BADINDEX))")
+
+    def __call__(self, key):
+        return self[key]
+
+
+class Worksheets(object):
+    def __init__(self, book):
+        self._book = book
+        self._sheets = book._sheets
+        self.Item = _ItemAccessor(self)
+
+    @property
+    def Count(self):
+        return len(self._sheets)
+
+    def __getitem__(self, key):
+        return self.Item[key]
+
+    def __iter__(self):
+        return iter(list(self._sheets))
+
+    def Add(self, Before=None, After=None):
+        _count("sheet_add")
+        n = len(self._sheets) + 1
+        names = set(s.Name for s in self._sheets)
+        while "Foglio%d" % n in names:
+            n += 1
+        sh = Worksheet(self._book, "Foglio%d" % n)
+        if After is not None:
+            self._sheets.insert(self._sheets.index(After) + 1, sh)
+        elif Before is not None:
+            self._sheets.insert(self._sheets.index(Before), sh)
+        else:
+            self._sheets.insert(0, sh)
+        return sh
+
+
+class Workbook(object):
+    def __init__(self, path):
+        self.FullName = path
+        self.Path = os.path.dirname(path)
+        self.Name = os.path.basename(path)
+        self._sheets = []
+        self.Worksheets = Worksheets(self)
+        self.Sheets = self.Worksheets
+        self.Saved = True
+        self.closed = False
+
+    def sheet(self, name):
+        for sh in self._sheets:
+            if sh.Name == name:
+                return sh
+        sh = Worksheet(self, name)
+        self._sheets.append(sh)
+        return sh
+
+    def Save(self):
+        _count("save")
+        self.Saved = True
+        if self.FullName.endswith((".json", ".json.gz")):
+            dump(self, self.FullName)
+
+    def SaveAs(self, path, *a):
+        self.FullName = path
+        self.Save()
+
+    def Close(self, SaveChanges=False, *a):
+        if SaveChanges:
+            self.Save()
+        self.closed = True
+
+
+def dump(book, path):
+    data = {"sheets": [{"name": sh.Name, "visible": sh.Visible,
+                        "cells": [[r, c, v] for r, rd in sorted(sh._rows.items()) for c, v in sorted(rd.items())]}
+                       for sh in book._sheets]}
+    op = gzip.open if path.endswith(".gz") else open
+    with op(path, "wt") as f:
+        json.dump(data, f)
+
+
+def load(path):
+    op = gzip.open if path.endswith(".gz") else open
+    with op(path, "rt") as f:
+        data = json.load(f)
+    book = Workbook(path)
+    for s in data["sheets"]:
+        sh = book.sheet(s["name"])
+        sh.Visible = s.get("visible", XlSheetVisibility.xlSheetVisible)
+        for r, c, v in s["cells"]:
+            sh._set(r, c, v)
+    return book
+
+
+def new_workbook(path, sheet_names=("Foglio1",)):
+    book = Workbook(path)
+    for n in sheet_names:
+        book.sheet(n)
+    REGISTRY[path] = book
+    return book
+
+
+class _Workbooks(object):
+    def __init__(self, app):
+        self._app = app
+
+    def Open(self, path, *a, **k):
+        _count("open")
+        book = REGISTRY.get(path)
+        if book is None:
+            if os.path.exists(path) and path.endswith((".json", ".json.gz")):
+                book = load(path)
+            else:
+                book = Workbook(path)
+                book.sheet("Foglio1")
+            REGISTRY[path] = book
+        book.closed = False
+        return book
+
+    def Add(self):
+        return new_workbook("Cartel%d.xlsx" % (len(REGISTRY) + 1))
+
+
+class ApplicationClass(object):
+    def __init__(self):
+        self.Visible = False
+        self.DisplayAlerts = True
+        self.ScreenUpdating = True
+        self.EnableEvents = True
+        self.Calculation = XlCalculation.xlCalculationAutomatic
+        self.Workbooks = _Workbooks(self)
+        self.quit = False
+
+    def Quit(self):
+        self.quit = True
+
+
+def interop_module():
+    m = types.ModuleType("Microsoft.Office.Interop.Excel")
+    for k in ("XlDirection", "XlSortOn", "XlSortOrder", "XlSortDataOption", "XlSortOrientation",
+              "XlYesNoGuess", "XlSheetVisibility", "XlCalculation", "ApplicationClass", "Range",
+              "Worksheet", "Workbook"):
+        setattr(m, k, globals()[k])
+    return m
+
+
+def fill_boq(book, header_row=3, seed=0, fraction=1.0):
+    """Aggiunge/compila MAN_ProductCode e MAN_BoQ_Units su ogni foglio esportato."""
+    import random
+    rnd = random.Random(seed)
+    for sh in book._sheets:
+        hdr = sh._rows.get(header_row) or {}
+        if not hdr:
+            continue
+        cols = dict((v, c) for c, v in hdr.items())
+        nxt = max(hdr) + 1
+        for h in ("MAN_ProductCode", "MAN_BoQ_Units"):
+            if h not in cols:
+                sh._set(header_row, nxt, h); cols[h] = nxt; nxt += 1
+        for r in sorted(sh._rows):
+            if r <= header_row + 1:
+                continue
+            if rnd.random() > fraction:
+                continue
+            sh._set(r, cols["MAN_ProductCode"], u"PC-%s-%05d" % (sh.Name[:3].upper(), r))
+            sh._set(r, cols["MAN_BoQ_Units"], rnd.choice([u"m", u"nr", u"kg", u"m2"]))
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+Generatore di modelli Revit sintetici (deterministico dato il seed).
+
+`build_model(n)` crea circa `n` istanze distribuite tra le categorie lette dai
+pushbutton (tubazioni, isolanti, raccordi, canali, passerelle, cavidotti,
+apparecchiature, generale), con tipi/famiglie/parametri MAN_* realistici:
+- isolanti ospitati da tubazioni e canali esistenti;
+- quadri elettrici (anche MAN_EEQ_PNB_SwitchBoard) su livelli diversi;
+- apparecchiature MAN_SEQ_ e raccordi cavidotti ThermoCable / AirSampling (SPE);
+- n_types limita (o estende) il numero di tipi per categoria: N tubazioni su K tipi.
+"""
+import random
+
+from manens_dev import revit_standin as rv
+
+SD = rv.StorageType
+FT = 1.0 / rv.FEET_TO_MM
+
+PIPE_TYPES = [u"Acciaio nero", u"Acciaio zincato", u"PPR", u"Multistrato", u"PE-AD", u"Rame"]
+PIPE_DIAMS = [15, 20, 25, 32, 40, 50, 63, 75, 90, 110, 125, 160, 200]
+INS_TYPES = [u"Elastomero", u"Lana di roccia", u"Poliuretano"]
+INS_THICK = [9, 13, 19, 25, 32, 40.5]
+DUCT_TYPES = [u"Canale rettangolare", u"Canale circolare", u"Canale ovale"]
+DUCT_SIZES = [100, 150, 200, 250, 300, 400, 500, 600, 800, 1000]
+FLEX_TYPES = [u"Flessibile isolato", u"Flessibile alluminio"]
+TRAY_TYPES = [u"Passerella forata", u"Passerella a filo", u"Canala chiusa"]
+TRAY_SIZES = [(100, 60), (200, 60), (300, 104), (400, 104), (500, 104), (600, 150)]
+COND_TYPES = [u"Tubo rigido PVC", u"Guaina corrugata", u"ThermoCable 2x1", u"AirSampling tubo"]
+COND_DIAMS = [16, 20, 25, 32, 40, 50, 63]
+FIT_FAMILIES = [u"Curva", u"Tee", u"Riduzione", u"Manicotto"]
+MEQ_FAMILIES = [u"UTA", u"Pompa di calore", u"Fan coil", u"Caldaia", u"Ventilconvettore"]
+GEN_HVAC_BIC = ["OST_DuctTerminal", "OST_DuctAccessory", "OST_PipeAccessory", "OST_PlumbingFixtures", "OST_Sprinklers"]
+GEN_ELE_BIC = ["OST_ElectricalFixtures", "OST_LightingDevices", "OST_LightingFixtures"]
+GEN_SPE_BIC = ["OST_CommunicationDevices", "OST_DataDevices", "OST_FireAlarmDevices",
+               "OST_NurseCallDevices", "OST_SecurityDevices"]
+SEQ_FAMILIES = [u"MAN_SEQ_Centrale rivelazione", u"MAN_SEQ_Armadio rack", u"MAN_SEQ_Alimentatore"]
+CFIT_TYPES = [u"Curva PVC", u"Manicotto PVC", u"ThermoCable giunto", u"AirSampling raccordo"]
+LEVELS = [u"Piano terra", u"Piano primo", u"Piano secondo", u"Copertura"]
+
+DEFAULT_MIX = {
+    "pipe": 0.22, "pipe_ins": 0.10, "pfit": 0.15, "meq": 0.03, "gen": 0.10,
+    "duct": 0.08, "duct_ins": 0.04, "dfit": 0.05, "flex": 0.03,
+    "tray": 0.06, "cond": 0.08, "eeq": 0.01, "gen_ele": 0.03, "gen_spe": 0.02,
+    "seq": 0.005, "cfit": 0.01,
+}
+
+
+class Model(object):
+    def __init__(self, doc):
+        self.doc = doc
+        self.types = {}
+        self.symbols = {}
+        self.families = {}
+        self.levels = []
+        self.by_kind = {}
+
+    def add(self, kind, e):
+        self.by_kind.setdefault(kind, []).append(e)
+        return e
+
+
+def _type(m, cls_bic, name, desc=None, prefix=None, extra=None):
+    key = (cls_bic, name)
+    t = m.types.get(key)
+    if t is None:
+        t = rv.ElementType(m.doc, name, getattr(rv.BuiltInCategory, cls_bic))
+        t.set_named("MAN_TypeDescription_IT", SD.String, desc or (u"Descrizione " + name))
+        if prefix:
+            t.set_named("MAN_FamilyTypePrefix", SD.String, prefix)
+        for k, v in (extra or {}).items():
+            t.set_named(k, v[0], v[1])
+        m.types[key] = t
+    return t
+
+
+def _symbol(m, bic, fam_name, type_name, prefix=None, extra=None):
+    key = (bic, fam_name, type_name)
+    s = m.symbols.get(key)
+    if s is None:
+        fam = m.families.get(fam_name)
+        if fam is None:
+            fam = rv.Family(m.doc, fam_name)
+            m.families[fam_name] = fam
+        s = rv.FamilySymbol(m.doc, fam, type_name, getattr(rv.BuiltInCategory, bic))
+        s.set_named("MAN_TypeDescription_IT", SD.String, u"%s - %s" % (fam_name, type_name))
+        if prefix:
+            s.set_named("MAN_FamilyTypePrefix", SD.String, prefix)
+        for k, v in (extra or {}).items():
+            s.set_named(k, v[0], v[1])
+        m.symbols[key] = s
+    return s
+
+
+def _names(base, k):
+    """k nomi di tipo: i primi k di base, oppure base ripetuta con suffisso numerico."""
+    if not k: return list(base)
+    return [base[i] if i < len(base) else u"%s %d" % (base[i % len(base)], i // len(base) + 1)
+            for i in range(k)]
+
+
+def _boq(e):
+    e.set_named("MAN_ProductCode", SD.String, None)
+    e.set_named("MAN_BoQ_Units", SD.String, None)
+    return e
+
+
+def _length(e, rnd):
+    e.set_bip("CURVE_ELEM_LENGTH", SD.Double, rnd.uniform(0.3, 12.0) * 1000.0 * FT)
+
+
+def build_model(n=1000, seed=1, mix=None, path=None, n_types=None):
+    rnd = random.Random(seed)
+    pipe_types, ins_types = _names(PIPE_TYPES, n_types), _names(INS_TYPES, n_types)
+    duct_types, flex_types = _names(DUCT_TYPES, n_types), _names(FLEX_TYPES, n_types)
+    tray_types, cond_types = _names(TRAY_TYPES, n_types), _names(COND_TYPES, n_types)
+    doc = rv.Document(path or u"C:\\Progetti\\Synthetic_%d.rvt" % n)
+    doc.epoch = seed
+    m = Model(doc)
+    mix = mix or DEFAULT_MIX
+    tot = float(sum(mix.values()))
+    counts = dict((k, int(round(n * v / tot))) for k, v in mix.items())
+
+    for i, lv in enumerate(LEVELS):
+        m.levels.append(rv.Level(doc, lv, i * 12.0))
+
+    # --- tubazioni + isolanti ---
+    pipes = []
+    for _ in range(counts.get("pipe", 0)):
+        tn = rnd.choice(pipe_types)
+        d = rnd.choice(PIPE_DIAMS)
+        e = rv.Pipe(doc, _type(m, "OST_PipeCurves", tn))
+        e.set_bip("RBS_PIPE_DIAMETER_PARAM", SD.Double, d * FT, display=u"%d mm" % d)
+        _length(e, rnd)
+        pipes.append(m.add("pipe", _boq(e)))
+    for _ in range(counts.get("pipe_ins", 0)):
+        if not pipes:
+            break
+        host = rnd.choice(pipes)
+        th = rnd.choice(INS_THICK)
+        e = rv.PipeInsulation(doc, _type(m, "OST_PipeInsulations", rnd.choice(ins_types)), host)
+        e.set_bip("RBS_INSULATION_THICKNESS_FOR_PIPE", SD.Double, th * FT)
+        d = host.get_Parameter(rv.BuiltInParameter.RBS_PIPE_DIAMETER_PARAM).AsValueString()
+        e.set_bip("RBS_PIPE_CALCULATED_SIZE", SD.String, d + u"ø")
+        _length(e, rnd)
+        m.add("pipe_ins", _boq(e))
+
+    # --- raccordi tubazioni / canali ---
+    for kind, bic, sizes in (("pfit", "OST_PipeFitting", PIPE_DIAMS), ("dfit", "OST_DuctFitting", DUCT_SIZES)):
+        for _ in range(counts.get(kind, 0)):
+            fam = rnd.choice(FIT_FAMILIES) + (u" tubo" if kind == "pfit" else u" canale")
+            s = _symbol(m, bic, fam, u"Standard")
+            e = rv.FamilyInstance(doc, s, getattr(rv.BuiltInCategory, bic))
+            e.set_named("MAN_Fittings_MaxSize", SD.Double, rnd.choice(sizes) * FT)
+            m.add(kind, _boq(e))
+
+    # --- apparecchiature meccaniche ---
+    for _ in range(counts.get("meq", 0)):
+        fam = rnd.choice(MEQ_FAMILIES)
+        tn = u"Taglia %d" % rnd.randint(1, 6)
+        s = _symbol(m, "OST_MechanicalEquipment", fam, tn, prefix=u"MEQ_" + fam.split()[0].upper())
+        e = rv.FamilyInstance(doc, s, rv.BuiltInCategory.OST_MechanicalEquipment)
+        e.set_named("MAN_Type_Code", SD.String, u"T%02d" % rnd.randint(1, 20))
+        m.add("meq", _boq(e))
+
+    # --- generale (HVAC / ELE / SPE) ---
+    for kind, bics in (("gen", GEN_HVAC_BIC), ("gen_ele", GEN_ELE_BIC), ("gen_spe", GEN_SPE_BIC)):
+        for _ in range(counts.get(kind, 0)):
+            bic = rnd.choice(bics)
+            fam = u"%s %d" % (bic[4:], rnd.randint(1, 8))
+            prefix = (u"MAN_SEQ_" + bic[4:8].upper()) if kind == "gen_spe" else None
+            s = _symbol(m, bic, fam, u"Tipo %d" % rnd.randint(1, 4), prefix=prefix)
+            e = rv.FamilyInstance(doc, s, getattr(rv.BuiltInCategory, bic))
+            m.add(kind, _boq(e))
+
+    # --- canali rigidi + isolanti + flessibili ---
+    ducts = []
+    for _ in range(counts.get("duct", 0)):
+        tn = rnd.choice(duct_types)
+        e = rv.Duct(doc, _type(m, "OST_DuctCurves", tn))
+        if u"circolare" in tn:
+            d = rnd.choice(DUCT_SIZES)
+            e.set_bip("RBS_CURVE_DIAMETER_PARAM", SD.Double, d * FT)
+        else:
+            e.set_bip("RBS_CURVE_WIDTH_PARAM", SD.Double, rnd.choice(DUCT_SIZES) * FT)
+            e.set_bip("RBS_CURVE_HEIGHT_PARAM", SD.Double, rnd.choice(DUCT_SIZES) * FT)
+        _length(e, rnd)
+        ducts.append(m.add("duct", _boq(e)))
+    for _ in range(counts.get("duct_ins", 0)):
+        if not ducts:
+            break
+        e = rv.DuctInsulation(doc, _type(m, "OST_DuctInsulations", rnd.choice(ins_types)), rnd.choice(ducts))
+        e.set_bip("RBS_INSULATION_THICKNESS_FOR_DUCT", SD.Double, rnd.choice(INS_THICK) * FT)
+        _length(e, rnd)
+        m.add("duct_ins", _boq(e))
+    for _ in range(counts.get("flex", 0)):
+        d = rnd.choice([100, 125, 160, 200, 250])
+        e = rv.FlexDuct(doc, _type(m, "OST_FlexDuctCurves", rnd.choice(flex_types)))
+        e.set_bip("RBS_CURVE_DIAMETER_PARAM", SD.Double, d * FT, display=u"%d mm" % d)
+        _length(e, rnd)
+        m.add("flex", _boq(e))
+
+    # --- passerelle / cavidotti / quadri ---
+    for _ in range(counts.get("tray", 0)):
+        w, h = rnd.choice(TRAY_SIZES)
+        extra = {"MAN_Dividers": (SD.Integer, rnd.choice([0, 0, 1, 2]))}
+        e = rv.CableTray(doc, _type(m, "OST_CableTray", rnd.choice(tray_types), extra=extra))
+        e.set_bip("RBS_CALCULATED_SIZE", SD.String, u"%d mmx%d mm" % (w, h))
+        e.set_bip("RBS_CABLETRAY_WIDTH_PARAM", SD.Double, w * FT)
+        e.set_bip("RBS_CABLETRAY_HEIGHT_PARAM", SD.Double, h * FT)
+        _length(e, rnd)
+        m.add("tray", _boq(e))
+    for _ in range(counts.get("cond", 0)):
+        d = rnd.choice(COND_DIAMS)
+        e = rv.Conduit(doc, _type(m, "OST_Conduit", rnd.choice(cond_types)))
+        e.set_bip("RBS_CONDUIT_OUTER_DIAM_PARAM", SD.Double, d * FT)
+        _length(e, rnd)
+        m.add("cond", _boq(e))
+    for _ in range(counts.get("eeq", 0)):
+        fam = rnd.choice([u"MAN_EEQ_Quadro BT", u"MAN_EEQ_Quadro distribuzione", u"MAN_EEQ_PNB_SwitchBoard"])
+        s = _symbol(m, "OST_ElectricalEquipment", fam, u"Tipo %d" % rnd.randint(1, 3))
+        e = rv.FamilyInstance(doc, s, rv.BuiltInCategory.OST_ElectricalEquipment)
+        lv = rnd.choice(m.levels)
+        e.set_bip("FAMILY_LEVEL_PARAM", SD.ElementId, lv.Id, display=lv.Name)
+        e.set_named("Panel Name", SD.String, u"Q%03d" % rnd.randint(1, 200))
+        m.add("eeq", _boq(e))
+    for _ in range(counts.get("seq", 0)):
+        s = _symbol(m, "OST_ElectricalEquipment", rnd.choice(SEQ_FAMILIES), u"Tipo %d" % rnd.randint(1, 3))
+        e = rv.FamilyInstance(doc, s, rv.BuiltInCategory.OST_ElectricalEquipment)
+        lv = rnd.choice(m.levels)
+        e.set_bip("FAMILY_LEVEL_PARAM", SD.ElementId, lv.Id, display=lv.Name)
+        m.add("seq", _boq(e))
+    for _ in range(counts.get("cfit", 0)):
+        s = _symbol(m, "OST_ConduitFitting", u"Raccordo cavidotto", rnd.choice(CFIT_TYPES))
+        e = rv.FamilyInstance(doc, s, rv.BuiltInCategory.OST_ConduitFitting)
+        m.add("cfit", _boq(e))
+    return m
+
+
+def install_model(n=1000, seed=1, mix=None, n_types=None):
+    """Costruisce il modello e lo rende il documento attivo (`__revit__`)."""
+    m = build_model(n, seed, mix, n_types=n_types)
+    rv.install(m.doc)
+    return m
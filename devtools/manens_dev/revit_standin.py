@@ -0,0 +1,1002 @@
+# -*- coding: utf-8 -*-
+"""
+Stand-in dell'API Revit (e dei moduli .NET importati dagli script) per CPython.
+
+Copre solo il sottoinsieme usato dai pushbutton Manens:
+FilteredElementCollector, BuiltInParameter/BuiltInCategory, Parameter
+(AsDouble/AsString/AsValueString/AsInteger/AsElementId/Set), ElementId,
+Document.GetElement, LookupParameter, Transaction/TransactionGroup, UnitUtils,
+Application.DocumentChanged (alla Commit, con Id aggiunti / modificati / eliminati
+e i filtri per categoria / classe), Document.Delete, ElementTransformUtils.MoveElement.
+
+`install(doc)` registra i moduli finti in sys.modules (clr, System, Autodesk.Revit.DB,
+Microsoft.Office.Interop.Excel, System.Windows.Forms, ...) e `__revit__` nei builtins,
+cosi' gli script possono essere caricati con `load_script`.
+"""
+import sys
+import types
+import uuid
+import builtins
+
+FEET_TO_MM = 304.8
+
+
+# ==================== .NET: System ====================
+class Object(object):
+    pass
+
+
+class Array(object):
+    """Array .NET minimale: solo 2D, come quelli usati per Range.Value2."""
+    Rank = 2
+
+    def __init__(self, n0, n1, lower=0):
+        self._n0 = n0; self._n1 = n1; self._lo = lower
+        self._data = [[None] * n1 for _ in range(n0)]
+
+    @staticmethod
+    def CreateInstance(elem_type, n0, n1=None):
+        if n1 is None:
+            raise NotImplementedError("solo array 2D")
+        return Array(n0, n1, lower=0)
+
+    @classmethod
+    def from_rows(cls, rows, lower=1):
+        n0 = len(rows); n1 = max([len(r) for r in rows] or [0])
+        arr = cls(n0, n1, lower=lower)
+        for i, r in enumerate(rows):
+            for j, v in enumerate(r):
+                arr._data[i][j] = v
+        return arr
+
+    def GetLength(self, dim):
+        return self._n0 if dim == 0 else self._n1
+
+    def GetLowerBound(self, dim):
+        return self._lo
+
+    def _ij(self, i, j):
+        ii = i - self._lo; jj = j - self._lo
+        if ii < 0 or jj < 0 or ii >= self._n0 or jj >= self._n1:
+            raise IndexError("Index was outside the bounds of the array.")
+        return ii, jj
+
+    def GetValue(self, i, j):
+        ii, jj = self._ij(i, j)
+        return self._data[ii][jj]
+
+    def SetValue(self, v, i, j):
+        ii, jj = self._ij(i, j)
+        self._data[ii][jj] = v
+
+    def __getitem__(self, ij):
+        ii, jj = self._ij(*ij)
+        return self._data[ii][jj]
+
+    def __setitem__(self, ij, v):
+        ii, jj = self._ij(*ij)
+        self._data[ii][jj] = v
+
+    def rows(self):
+        return [list(r) for r in self._data]
+
+
+class Guid(object):
+    _n = [0]
+
+    def __init__(self, s=None):
+        if s is None:
+            Guid._n[0] += 1
+            s = "00000000-0000-0000-0000-%012d" % Guid._n[0]
+        self._s = s
+
+    @staticmethod
+    def NewGuid():
+        return Guid()
+
+    def ToString(self):
+        return self._s
+
+    def __str__(self):
+        return self._s
+
+    def __eq__(self, o):
+        return isinstance(o, Guid) and o._s == self._s
+
+    def __hash__(self):
+        return hash(self._s)
+
+
+class Marshal(object):
+    released = [0]
+
+    @staticmethod
+    def ReleaseComObject(o):
+        Marshal.released[0] += 1
+        return 0
+
+
+class _Stub(object):
+    """Controllo WinForms finto: accetta qualsiasi attributo."""
+    def __init__(self, *a, **k):
+        self.Controls = _Controls()
+
+    def __getattr__(self, name):
+        return _Stub()
+
+    def __or__(self, other):
+        return self
+
+    def __call__(self, *a, **k):
+        return _Stub()
+
+
+class _Controls(list):
+    def Add(self, c):
+        self.append(c)
+
+
+class Size(object):
+    def __init__(self, w=0, h=0):
+        self.Width = w; self.Height = h
+
+
+class Point(Size):
+    def __init__(self, x=0, y=0):
+        self.X = x; self.Y = y
+
+
+class _DialogResult(object):
+    OK = "OK"
+    Cancel = "Cancel"
+
+
+class Form(object):
+    """Form finta: ShowDialog restituisce `Form.next_result` (default OK)."""
+    next_result = "OK"
+
+    def __init__(self):
+        self.Controls = _Controls()
+        self.Font = None
+
+    def ShowDialog(self):
+        return Form.next_result
+
+
+class CheckBox(object):
+    def __init__(self):
+        self.Checked = False
+        self.Text = ""
+
+
+class OpenFileDialog(object):
+    next_path = None
+    next_paths = None   # Multiselect: lista di percorsi (default [next_path])
+
+    def __init__(self):
+        self.FileName = OpenFileDialog.next_path
+        paths = OpenFileDialog.next_paths
+        if paths is None: paths = [self.FileName] if self.FileName else []
+        self.FileNames = list(paths)
+        if paths and not self.FileName: self.FileName = paths[0]
+
+    def ShowDialog(self):
+        return _DialogResult.OK if self.FileName else _DialogResult.Cancel
+
+
+# ==================== Revit: enum e id ====================
+class _EnumMember(object):
+    def __init__(self, owner, name, value):
+        self.owner = owner; self.name = name; self.value = value
+
+    def __int__(self):
+        return self.value
+
+    def __index__(self):
+        return self.value
+
+    def __eq__(self, o):
+        return isinstance(o, _EnumMember) and o.owner == self.owner and o.value == self.value
+
+    def __hash__(self):
+        return hash((self.owner, self.value))
+
+    def __repr__(self):
+        return "%s.%s" % (self.owner, self.name)
+
+    def ToString(self):
+        return self.name
+
+
+def _make_enum(name, members):
+    ns = {}
+    for i, m in enumerate(members):
+        if isinstance(m, tuple):
+            ns[m[0]] = _EnumMember(name, m[0], m[1])
+        else:
+            ns[m] = _EnumMember(name, m, i + 1)
+    return type(name, (object,), ns)
+
+
+BuiltInParameter = _make_enum("BuiltInParameter", [
+    "ELEM_TYPE_PARAM", "ELEM_CATEGORY_PARAM", "ALL_MODEL_TYPE_NAME", "SYMBOL_NAME_PARAM",
+    "FAMILY_LEVEL_PARAM", "RBS_PIPE_DIAMETER_PARAM", "RBS_PIPE_CALCULATED_SIZE",
+    "RBS_INSULATION_THICKNESS_FOR_PIPE", "RBS_INSULATION_THICKNESS_FOR_DUCT",
+    "RBS_CURVE_DIAMETER_PARAM", "RBS_CURVE_WIDTH_PARAM", "RBS_CURVE_HEIGHT_PARAM",
+    "RBS_CALCULATED_SIZE", "RBS_CABLETRAY_HEIGHT_PARAM", "RBS_CABLETRAY_WIDTH_PARAM",
+    "RBS_CONDUIT_OUTER_DIAM_PARAM", "CURVE_ELEM_LENGTH", "RBS_INSULATION_LINING_VOLUME",
+])
+
+_BIC = [
+    ("OST_PipeCurves", -2008044), ("OST_PipeInsulations", -2008123), ("OST_PipeFitting", -2008049),
+    ("OST_PipeAccessory", -2008055), ("OST_PlumbingFixtures", -2001160), ("OST_Sprinklers", -2008099),
+    ("OST_MechanicalEquipment", -2001140), ("OST_DuctCurves", -2008000), ("OST_DuctInsulations", -2008124),
+    ("OST_DuctFitting", -2008010), ("OST_DuctAccessory", -2008016), ("OST_DuctTerminal", -2008013),
+    ("OST_FlexDuctCurves", -2008020), ("OST_CableTray", -2008130), ("OST_CableTrayFitting", -2008126),
+    ("OST_Conduit", -2008132), ("OST_ConduitFitting", -2008128), ("OST_ElectricalEquipment", -2001040),
+    ("OST_ElectricalFixtures", -2001060), ("OST_LightingDevices", -2008087), ("OST_LightingFixtures", -2001120),
+    ("OST_CommunicationDevices", -2008081), ("OST_DataDevices", -2008083), ("OST_FireAlarmDevices", -2008085),
+    ("OST_NurseCallDevices", -2008077), ("OST_SecurityDevices", -2008079), ("OST_Levels", -2000240),
+]
+BuiltInCategory = _make_enum("BuiltInCategory", _BIC)
+_BIC_LABEL = {
+    "OST_PipeCurves": "Pipes", "OST_PipeInsulations": "Pipe Insulations", "OST_PipeFitting": "Pipe Fittings",
+    "OST_PipeAccessory": "Pipe Accessories", "OST_PlumbingFixtures": "Plumbing Fixtures",
+    "OST_Sprinklers": "Sprinklers", "OST_MechanicalEquipment": "Mechanical Equipment",
+    "OST_DuctCurves": "Ducts", "OST_DuctInsulations": "Duct Insulations", "OST_DuctFitting": "Duct Fittings",
+    "OST_DuctAccessory": "Duct Accessories", "OST_DuctTerminal": "Air Terminals",
+    "OST_FlexDuctCurves": "Flex Ducts", "OST_CableTray": "Cable Trays",
+    "OST_CableTrayFitting": "Cable Tray Fittings", "OST_Conduit": "Conduits",
+    "OST_ConduitFitting": "Conduit Fittings", "OST_ElectricalEquipment": "Electrical Equipment",
+    "OST_ElectricalFixtures": "Electrical Fixtures", "OST_LightingDevices": "Lighting Devices",
+    "OST_LightingFixtures": "Lighting Fixtures", "OST_CommunicationDevices": "Communication Devices",
+    "OST_DataDevices": "Data Devices", "OST_FireAlarmDevices": "Fire Alarm Devices",
+    "OST_NurseCallDevices": "Nurse Call Devices", "OST_SecurityDevices": "Security Devices",
+    "OST_Levels": "Levels",
+}
+
+StorageType = _make_enum("StorageType", ["None_", "Integer", "Double", "String", "ElementId"])
+setattr(StorageType, "None", StorageType.None_)
+
+
+class ElementId(object):
+    __slots__ = ("IntegerValue",)
+
+    def __init__(self, v):
+        self.IntegerValue = int(v)
+
+    @property
+    def Value(self):
+        return self.IntegerValue
+
+    def __eq__(self, o):
+        return isinstance(o, ElementId) and o.IntegerValue == self.IntegerValue
+
+    def __ne__(self, o):
+        return not self.__eq__(o)
+
+    def __hash__(self):
+        return hash(self.IntegerValue)
+
+    def __repr__(self):
+        return "ElementId(%d)" % self.IntegerValue
+
+    def ToString(self):
+        return str(self.IntegerValue)
+
+
+ElementId.InvalidElementId = ElementId(-1)
+
+
+class UnitTypeId(object):
+    Millimeters = "autodesk.unit.unit:millimeters"
+    Meters = "autodesk.unit.unit:meters"
+
+
+class DisplayUnitType(object):
+    DUT_MILLIMETERS = "DUT_MILLIMETERS"
+
+
+class UnitUtils(object):
+    @staticmethod
+    def ConvertFromInternalUnits(v, unit):
+        if unit in (UnitTypeId.Millimeters, DisplayUnitType.DUT_MILLIMETERS):
+            return float(v) * FEET_TO_MM
+        if unit == UnitTypeId.Meters:
+            return float(v) * FEET_TO_MM / 1000.0
+        return float(v)
+
+    @staticmethod
+    def ConvertToInternalUnits(v, unit):
+        if unit in (UnitTypeId.Millimeters, DisplayUnitType.DUT_MILLIMETERS):
+            return float(v) / FEET_TO_MM
+        return float(v)
+
+
+# ==================== Revit: Parameter / Element ====================
+class _Definition(object):
+    def __init__(self, name):
+        self.Name = name
+
+
+class Parameter(object):
+    """Parametro con StorageType e rappresentazione testuale opzionale."""
+
+    def __init__(self, doc, name, storage, value=None, display=None, read_only=False):
+        self._doc = doc
+        self.Definition = _Definition(name)
+        self.StorageType = storage
+        self._value = value
+        self._display = display
+        self.IsReadOnly = read_only
+        self._owner = None
+
+    @property
+    def HasValue(self):
+        return self._value is not None
+
+    def AsDouble(self):
+        if self.StorageType == StorageType.Double:
+            return float(self._value or 0.0)
+        return 0.0
+
+    def AsInteger(self):
+        if self.StorageType == StorageType.Integer:
+            return int(self._value or 0)
+        return 0
+
+    def AsString(self):
+        if self.StorageType == StorageType.String:
+            return self._value
+        return None
+
+    def AsElementId(self):
+        if self.StorageType == StorageType.ElementId:
+            return self._value or ElementId.InvalidElementId
+        return ElementId.InvalidElementId
+
+    def AsValueString(self):
+        d = self._display
+        if callable(d):
+            return d()
+        if d is not None:
+            return d
+        st = self.StorageType
+        if st == StorageType.Double:
+            if self._value is None:
+                return None
+            return u"%g mm" % round(float(self._value) * FEET_TO_MM, 3)
+        if st == StorageType.Integer:
+            return None if self._value is None else u"%d" % int(self._value)
+        if st == StorageType.String:
+            return self._value
+        if st == StorageType.ElementId:
+            e = self._doc.GetElement(self._value) if self._value else None
+            return getattr(e, "Name", None) if e else None
+        return None
+
+    def _check_tx(self):
+        if self._doc is not None and not self._doc.IsModifiable:
+            raise Exception("Modification of the document is forbidden (no open transaction)")
+        if self.IsReadOnly:
+            raise Exception("Parameter is read-only")
+
+    def Set(self, v):
+        self._check_tx()
+        st = self.StorageType
+        if st == StorageType.String:
+            self._value = u"%s" % v
+        elif st == StorageType.Double:
+            self._value = float(v)
+        elif st == StorageType.Integer:
+            self._value = int(v)
+        elif st == StorageType.ElementId:
+            self._value = v
+        self._display = None if st != StorageType.ElementId else self._display
+        if self._doc is not None:
+            self._doc._touch(self)
+        return True
+
+    def SetValueString(self, s):
+        return self.Set(s)
+
+
+class Category(object):
+    def __init__(self, bic):
+        self.BuiltInCategory = bic
+        self.Id = ElementId(int(bic))
+        self.Name = _BIC_LABEL.get(bic.name, bic.name)
+
+
+class Element(object):
+    _category = None
+
+    def __init__(self, doc, name=u"", bic=None):
+        self.Document = doc
+        self.Id = doc._new_id(self)
+        self.Name = name
+        bic = bic or self._category
+        self.Category = Category(bic) if bic is not None else None
+        self._bip = {}
+        self._named = {}
+        self.owner_element = None
+        self.VersionGuid = doc._version_guid(self.Id)
+        if self.Category is not None:
+            self.set_bip("ELEM_CATEGORY_PARAM", StorageType.ElementId, self.Category.Id,
+                         display=self.Category.Name)
+
+    # -- costruzione --
+    def set_bip(self, bip_name, storage, value, display=None, read_only=True):
+        p = self._bip[bip_name] = Parameter(self.Document, bip_name, storage, value, display, read_only)
+        p._owner = self
+        return p
+
+    def set_named(self, name, storage, value, display=None, read_only=False):
+        p = self._named[name] = Parameter(self.Document, name, storage, value, display, read_only)
+        p._owner = self
+        return p
+
+    # -- API --
+    def get_Parameter(self, bip):
+        try:
+            return self._bip.get(bip.name)
+        except AttributeError:
+            return None
+
+    def LookupParameter(self, name):
+        return self._named.get(name)
+
+    def GetTypeId(self):
+        p = self._bip.get("ELEM_TYPE_PARAM")
+        return p._value if p else ElementId.InvalidElementId
+
+
+class ElementType(Element):
+    def __init__(self, doc, name, bic=None):
+        Element.__init__(self, doc, name, bic)
+        self.set_bip("ALL_MODEL_TYPE_NAME", StorageType.String, name)
+        self.set_bip("SYMBOL_NAME_PARAM", StorageType.String, name)
+
+
+class Family(Element):
+    pass
+
+
+class FamilySymbol(ElementType):
+    def __init__(self, doc, family, name, bic=None):
+        ElementType.__init__(self, doc, name, bic)
+        self.Family = family
+        self.FamilyName = family.Name
+
+
+class Level(Element):
+    _category = BuiltInCategory.OST_Levels
+
+    def __init__(self, doc, name, elevation_ft=0.0):
+        Element.__init__(self, doc, name)
+        self.Elevation = elevation_ft
+
+
+class _Instance(Element):
+    """Istanza con tipo: imposta ELEM_TYPE_PARAM come fa Revit."""
+
+    def __init__(self, doc, etype, bic=None):
+        Element.__init__(self, doc, u"", bic)
+        self.set_bip("ELEM_TYPE_PARAM", StorageType.ElementId, etype.Id, display=etype.Name)
+        self.Name = etype.Name
+        self._type = etype
+
+
+class FamilyInstance(_Instance):
+    def __init__(self, doc, symbol, bic):
+        _Instance.__init__(self, doc, symbol, bic)
+        self.Symbol = symbol
+
+
+class MEPCurve(_Instance):
+    pass
+
+
+class Pipe(MEPCurve):
+    _category = BuiltInCategory.OST_PipeCurves
+
+
+class Duct(MEPCurve):
+    _category = BuiltInCategory.OST_DuctCurves
+
+
+class FlexDuct(MEPCurve):
+    _category = BuiltInCategory.OST_FlexDuctCurves
+
+
+class CableTray(MEPCurve):
+    _category = BuiltInCategory.OST_CableTray
+
+
+class Conduit(MEPCurve):
+    _category = BuiltInCategory.OST_Conduit
+
+
+class InsulationLiningBase(_Instance):
+    def __init__(self, doc, etype, host):
+        _Instance.__init__(self, doc, etype)
+        self.HostElementId = host.Id if host is not None else ElementId.InvalidElementId
+
+
+class PipeInsulation(InsulationLiningBase):
+    _category = BuiltInCategory.OST_PipeInsulations
+
+
+class DuctInsulation(InsulationLiningBase):
+    _category = BuiltInCategory.OST_DuctInsulations
+
+
+# ==================== Revit: Document / Transaction ====================
+class Document(object):
+    def __init__(self, path=u"C:\\Progetti\\Synthetic.rvt", title=None):
+        self.PathName = path
+        self.Title = title or path.replace("\\", "/").split("/")[-1].rsplit(".", 1)[0]
+        self._by_id = {}
+        self._next = 100000
+        self._tx_depth = 0
+        self.modified_params = 0
+        self.IsFamilyDocument = False
+        self.epoch = 0              # modelgen: seed (VersionGuid diverso per modello)
+        self._changes = None        # transazione aperta: (aggiunti, modificati, eliminati)
+
+    @property
+    def IsModifiable(self):
+        return self._tx_depth > 0
+
+    def _new_id(self, elem):
+        self._next += 1
+        eid = ElementId(self._next)
+        self._by_id[self._next] = elem
+        if self._changes is not None:
+            self._changes[0].add(self._next)
+        return eid
+
+    def _modified(self, elem):
+        elem.VersionGuid = Guid(str(uuid.uuid4()))
+        if self._changes is not None:
+            i = elem.Id.IntegerValue
+            if i not in self._changes[0]:
+                self._changes[1].add(i)
+
+    def _version_guid(self, eid):
+        """VersionGuid iniziale: stabile tra processi a parita' di modello (snapshot)."""
+        return Guid("%08x-0000-0000-0000-%012d" % (self.epoch, eid.IntegerValue))
+
+    def _touch(self, param):
+        self.modified_params += 1
+        if param._owner is not None:
+            self._modified(param._owner)
+
+    def GetElement(self, eid):
+        if eid is None:
+            return None
+        try:
+            k = eid.IntegerValue
+        except AttributeError:
+            k = int(eid)
+        return self._by_id.get(k)
+
+    def elements(self):
+        return list(self._by_id.values())
+
+    def Delete(self, eid):
+        """Come Revit: elimina anche gli isolanti ospitati; restituisce gli Id eliminati."""
+        if not self.IsModifiable:
+            raise InvalidOperationException("Modification of the document is forbidden (no open transaction)")
+        i = eid.IntegerValue
+        if i not in self._by_id: return []
+        gone = [i] + [k for k, e in self._by_id.items()
+                      if getattr(e, "HostElementId", None) is not None and e.HostElementId.IntegerValue == i]
+        for k in gone:
+            del self._by_id[k]
+            if self._changes is not None:
+                self._changes[0].discard(k); self._changes[1].discard(k); self._changes[2].add(k)
+        return [ElementId(k) for k in gone]
+
+    def _begin(self):
+        self._changes = (set(), set(), set())
+
+    def _commit(self, name):
+        ch, self._changes = self._changes, None
+        if ch and ch[1]:
+            # come Revit: gli isolanti si rigenerano con l'host e risultano modificati
+            for k, e in self._by_id.items():
+                h = getattr(e, "HostElementId", None)
+                if h is not None and h.IntegerValue in ch[1] and k not in ch[0]:
+                    e.VersionGuid = Guid(str(uuid.uuid4()))
+                    ch[1].add(k)
+        if ch and any(ch):
+            APPLICATION.DocumentChanged.fire(APPLICATION, DocumentChangedEventArgs(self, ch, [name]))
+
+    def _rollback(self):
+        self._changes = None
+
+
+class DocumentChangedEventArgs(object):
+    def __init__(self, doc, changes, names):
+        self._doc = doc
+        self._added, self._modified, self._deleted = changes
+        self._names = names
+
+    def _ids(self, ids, filt):
+        out = [ElementId(i) for i in sorted(ids)]
+        return out if filt is None else [i for i in out if filt.PassesFilter(self._doc, i)]
+
+    def GetDocument(self):
+        return self._doc
+
+    def GetAddedElementIds(self, filt=None):
+        return self._ids(self._added, filt)
+
+    def GetModifiedElementIds(self, filt=None):
+        return self._ids(self._modified, filt)
+
+    def GetDeletedElementIds(self):
+        return self._ids(self._deleted, None)
+
+    def GetTransactionNames(self):
+        return list(self._names)
+
+
+class ElementFilter(object):
+    def PassesFilter(self, doc, eid=None):
+        e = doc.GetElement(eid) if eid is not None else doc
+        return e is not None and self._passes(e)
+
+
+class ElementMulticategoryFilter(ElementFilter):
+    def __init__(self, categories, inverted=False):
+        self._cats = set(int(c) for c in categories)
+        self._inv = inverted
+
+    def _passes(self, e):
+        ok = e.Category is not None and e.Category.Id.IntegerValue in self._cats
+        return ok != self._inv
+
+
+class ElementClassFilter(ElementFilter):
+    def __init__(self, cls, inverted=False):
+        self._cls = cls; self._inv = inverted
+
+    def _passes(self, e):
+        return isinstance(e, self._cls) != self._inv
+
+
+class ElementIsElementTypeFilter(ElementFilter):
+    def __init__(self, inverted=False):
+        self._inv = inverted
+
+    def _passes(self, e):
+        return isinstance(e, (ElementType, Family)) != self._inv
+
+
+class LogicalOrFilter(ElementFilter):
+    def __init__(self, *filters):
+        self._fs = list(filters[0]) if len(filters) == 1 else list(filters)
+
+    def _passes(self, e):
+        return any(f._passes(e) for f in self._fs)
+
+
+class LogicalAndFilter(LogicalOrFilter):
+    def _passes(self, e):
+        return all(f._passes(e) for f in self._fs)
+
+
+class XYZ(object):
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.X, self.Y, self.Z = x, y, z
+
+
+class ElementTransformUtils(object):
+    @staticmethod
+    def MoveElement(doc, eid, translation):
+        if not doc.IsModifiable:
+            raise InvalidOperationException("Modification of the document is forbidden (no open transaction)")
+        doc._modified(doc.GetElement(eid))
+
+
+class InvalidOperationException(Exception):
+    pass
+
+
+class TransactionStatus(object):
+    Uninitialized = "Uninitialized"
+    Started = "Started"
+    Committed = "Committed"
+    RolledBack = "RolledBack"
+
+
+class Transaction(object):
+    log = []
+
+    def __init__(self, doc, name=u""):
+        self._doc = doc; self.Name = name
+        self._status = TransactionStatus.Uninitialized
+
+    def Start(self):
+        if self._doc._tx_depth > 0:
+            raise InvalidOperationException("Transaction gia' aperta: usare SubTransaction")
+        self._doc._tx_depth += 1
+        self._doc._begin()
+        self._status = TransactionStatus.Started
+        Transaction.log.append(self.Name)
+        return self._status
+
+    def _end(self, status):
+        if self._status == TransactionStatus.Started:
+            self._doc._tx_depth -= 1
+        self._status = status
+        return status
+
+    def Commit(self):
+        started = self._status == TransactionStatus.Started
+        st = self._end(TransactionStatus.Committed)
+        if started: self._doc._commit(self.Name)
+        return st
+
+    def RollBack(self):
+        started = self._status == TransactionStatus.Started
+        st = self._end(TransactionStatus.RolledBack)
+        if started: self._doc._rollback()
+        return st
+
+    def GetStatus(self):
+        return self._status
+
+    def HasStarted(self):
+        return self._status == TransactionStatus.Started
+
+    def Dispose(self):
+        pass
+
+
+class SubTransaction(Transaction):
+    """Come in Revit: valida solo dentro una Transaction gia' aperta."""
+    def __init__(self, doc):
+        Transaction.__init__(self, doc, u"<sub>")
+
+    def Start(self):
+        if self._doc._tx_depth < 1:
+            raise InvalidOperationException("SubTransaction fuori da una Transaction")
+        self._doc._tx_depth += 1
+        self._status = TransactionStatus.Started
+        return self._status
+
+    def Commit(self):
+        return self._end(TransactionStatus.Committed)
+
+    def RollBack(self):
+        return self._end(TransactionStatus.RolledBack)
+
+
+class TransactionGroup(Transaction):
+    def Start(self):
+        self._status = TransactionStatus.Started
+        return self._status
+
+    def _end(self, status):
+        self._status = status
+        return status
+
+    def Assimilate(self):
+        return self._end(TransactionStatus.Committed)
+
+    def Commit(self):
+        return self._end(TransactionStatus.Committed)
+
+    def RollBack(self):
+        return self._end(TransactionStatus.RolledBack)
+
+
+class FilteredElementCollector(object):
+    """Collector in memoria con gli stessi metodi concatenabili di Revit."""
+    calls = [0]
+
+    def __init__(self, doc, *args):
+        FilteredElementCollector.calls[0] += 1
+        self._doc = doc
+        self._items = None
+        self._filters = []
+
+    def _apply(self, fn):
+        self._filters.append(fn)
+        return self
+
+    def OfClass(self, cls):
+        return self._apply(lambda e: isinstance(e, cls))
+
+    def OfCategory(self, bic):
+        v = int(bic)
+        return self._apply(lambda e: e.Category is not None and e.Category.Id.IntegerValue == v)
+
+    def OfCategoryId(self, cid):
+        return self._apply(lambda e: e.Category is not None and e.Category.Id == cid)
+
+    def WhereElementIsNotElementType(self):
+        return self._apply(lambda e: not isinstance(e, (ElementType, Family)))
+
+    def WhereElementIsElementType(self):
+        return self._apply(lambda e: isinstance(e, ElementType))
+
+    def _result(self):
+        out = []
+        fs = self._filters
+        for e in self._doc._by_id.values():
+            ok = True
+            for f in fs:
+                if not f(e):
+                    ok = False; break
+            if ok:
+                out.append(e)
+        return out
+
+    def ToElements(self):
+        return self._result()
+
+    def ToElementIds(self):
+        return [e.Id for e in self._result()]
+
+    def GetElementCount(self):
+        return len(self._result())
+
+    def __iter__(self):
+        return iter(self._result())
+
+
+# ==================== UI application ====================
+class _UIDocument(object):
+    def __init__(self, doc):
+        self.Document = doc
+
+
+class _Event(object):
+    """Evento .NET: handler += / -=, fire(sender, args)."""
+    def __init__(self):
+        self.handlers = []
+
+    def __iadd__(self, fn):
+        self.handlers.append(fn)
+        return self
+
+    def __isub__(self, fn):
+        if fn in self.handlers: self.handlers.remove(fn)
+        return self
+
+    def fire(self, sender, args):
+        for fn in list(self.handlers):
+            fn(sender, args)
+
+
+class Application(object):
+    """Autodesk.Revit.ApplicationServices.Application: unico per processo, come in Revit."""
+    def __init__(self):
+        self.DocumentChanged = _Event()
+        self.DocumentOpened = _Event()
+        self.DocumentClosing = _Event()
+        self.DocumentSynchronizedWithCentral = _Event()
+        self.DocumentReloadedLatest = _Event()
+
+
+APPLICATION = Application()
+
+
+class UIApplication(object):
+    def __init__(self, doc):
+        self.ActiveUIDocument = _UIDocument(doc)
+        self.Application = APPLICATION
+
+
+# ==================== installazione moduli ====================
+def _module(name, **attrs):
+    m = types.ModuleType(name)
+    for k, v in attrs.items():
+        setattr(m, k, v)
+    sys.modules[name] = m
+    return m
+
+
+def install(doc=None):
+    """Registra i moduli finti e imposta `__revit__` sul documento dato."""
+    from manens_dev import excel_standin
+
+    builtins.unicode = str
+    builtins.basestring = str
+    builtins.long = int
+    if doc is None:
+        doc = Document()
+    builtins.__revit__ = UIApplication(doc)
+
+    _module("clr", AddReference=lambda *a: None, AddReferenceByPartialName=lambda *a: None,
+            GetClrType=lambda t: t, Reference=None)
+    interop = _module("System.Runtime.InteropServices", Marshal=Marshal)
+    runtime = _module("System.Runtime", InteropServices=interop)
+    forms = _module("System.Windows.Forms", OpenFileDialog=OpenFileDialog, SaveFileDialog=OpenFileDialog,
+                    DialogResult=_DialogResult, Form=Form, CheckBox=CheckBox, Button=_Stub, Label=_Stub,
+                    AnchorStyles=_Stub(), FormStartPosition=_Stub(), FormBorderStyle=_Stub(),
+                    Control=_Stub(), Keys=_Stub(), MessageBox=_Stub())
+    windows = _module("System.Windows", Forms=forms)
+    drawing = _module("System.Drawing", Point=Point, Size=Size, Font=_Stub, FontStyle=_Stub())
+    generic = _module("System.Collections.Generic", List=_Generic())
+    collections = _module("System.Collections", Generic=generic)
+    _module("System", String=str, Array=Array, Object=Object, Guid=Guid, Runtime=runtime,
+            Windows=windows, Drawing=drawing, DateTime=_Stub(), Environment=_Stub(),
+            AppDomain=_AppDomain, Collections=collections)
+
+    excel_mod = excel_standin.interop_module()
+    office_interop = _module("Microsoft.Office.Interop", Excel=excel_mod)
+    office = _module("Microsoft.Office", Interop=office_interop)
+    _module("Microsoft", Office=office)
+    sys.modules["Microsoft.Office.Interop.Excel"] = excel_mod
+
+    db_attrs = dict(
+        FilteredElementCollector=FilteredElementCollector, BuiltInParameter=BuiltInParameter,
+        BuiltInCategory=BuiltInCategory, FamilyInstance=FamilyInstance, FamilySymbol=FamilySymbol,
+        Family=Family, Element=Element, ElementType=ElementType, ElementId=ElementId, Level=Level,
+        Transaction=Transaction, SubTransaction=SubTransaction, TransactionGroup=TransactionGroup, TransactionStatus=TransactionStatus,
+        StorageType=StorageType, UnitUtils=UnitUtils, UnitTypeId=UnitTypeId,
+        DisplayUnitType=DisplayUnitType, Parameter=Parameter, Document=Document, MEPCurve=MEPCurve,
+        Category=Category, ElementFilter=ElementFilter, ElementMulticategoryFilter=ElementMulticategoryFilter,
+        ElementClassFilter=ElementClassFilter, ElementIsElementTypeFilter=ElementIsElementTypeFilter,
+        LogicalOrFilter=LogicalOrFilter, LogicalAndFilter=LogicalAndFilter, XYZ=XYZ,
+        ElementTransformUtils=ElementTransformUtils,
+    )
+    plumbing = _module("Autodesk.Revit.DB.Plumbing", Pipe=Pipe, PipeInsulation=PipeInsulation)
+    mechanical = _module("Autodesk.Revit.DB.Mechanical", Duct=Duct, FlexDuct=FlexDuct, DuctInsulation=DuctInsulation)
+    electrical = _module("Autodesk.Revit.DB.Electrical", CableTray=CableTray, Conduit=Conduit)
+    db = _module("Autodesk.Revit.DB", Plumbing=plumbing, Mechanical=mechanical, Electrical=electrical, **db_attrs)
+    ui = _module("Autodesk.Revit.UI", UIApplication=UIApplication)
+    revit = _module("Autodesk.Revit", DB=db, UI=ui)
+    _module("Autodesk", Revit=revit)
+    return doc
+
+
+class _List(list):
+    def Add(self, x):
+        self.append(x)
+
+    @property
+    def Count(self):
+        return len(self)
+
+
+class _Generic(object):
+    """List[T](iterabile) -> list con Add / Count."""
+    def __getitem__(self, t):
+        return _List
+
+
+class _AppDomain(object):
+    """AppDomain.CurrentDomain.GetData/SetData: stato condiviso tra script."""
+    class _Domain(object):
+        def __init__(self):
+            self._data = {}
+
+        def GetData(self, k):
+            return self._data.get(k)
+
+        def SetData(self, k, v):
+            self._data[k] = v
+
+    CurrentDomain = _Domain()
+
+
+def set_document(doc):
+    builtins.__revit__ = UIApplication(doc)
+    return doc
+
+
+def load_script(path, name=None):
+    """Carica uno script pushbutton come modulo (senza eseguire main())."""
+    import importlib.util
+    import os
+    name = name or "manens_script_" + os.path.basename(os.path.dirname(path)).split(".")[0].replace(" ", "_").replace("-", "_")
+    spec = importlib.util.spec_from_file_location(name, path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
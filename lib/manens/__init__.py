@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""
+Libreria condivisa Manens Toolbar.
+
+pyRevit aggiunge automaticamente la cartella `lib` dell'estensione al sys.path,
+quindi i pushbutton possono fare `from manens.<modulo> import ...`.
+I moduli restano compatibili IronPython 2.7 (pyRevit) e CPython 3.
+"""
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Export Revit -> Excel di molti modelli senza dialog (es. i BoQ di notte).
+
+Un job e' (documento, workbook, blocchi):
+    documento   Document Revit gia' aperto
+    workbook    percorso del file Excel di destinazione
+    blocchi     ["HVAC", "ELE:PASSERELLE", "ELE:CAVIDOTTI"]: disciplina intera
+                o disciplina:blocco (nomi di BLOCKS negli script di export)
+
+run(jobs) raggruppa i job per workbook: ogni file viene aperto una volta,
+riceve i blocchi di tutti i job che lo riguardano (anche da modelli diversi),
+viene salvato e chiuso una volta. Per ogni file un'esecuzione di manens.timing
+(record JSON in %APPDATA%\\Manens\\runs, tool "Revit to Excel BATCH").
+
+Gli script di export vengono caricati come moduli, come gli import nel MULTI,
+una volta per documento; i blocchi (manens.blocks) sono condivisi e a ogni
+esecuzione vengono agganciati al `doc` dello script (bind).
+Usato dal pulsante Revit to Excel BATCH (file di job JSON) e, fuori da Revit,
+da devtools/manens_dev/batch sul modello finto.
+"""
+import io
+import json
+import os
+
+from manens import comprobe, timing
+
+TOOL = u"Revit to Excel BATCH"
+
+# (disciplina, cartella del pulsante di export)
+EXPORTERS = [
+    ("HVAC",    "Revit to Excel HVAC.pushbutton"),
+    ("PLU-FFS", "Revit to Excel PLU-FFS.pushbutton"),
+    ("ELE",     "Revit to Excel ELE.pushbutton"),
+    ("SPE",     "Revit to Excel SPE.pushbutton"),
+]
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PANEL_DIR = os.path.join(_ROOT, "Manens.tab", "Revit to Excel.panel")
+
+
+def _load_source(name, path):
+    try:
+        import imp
+    except ImportError:
+        imp = None
+    if imp is not None: return imp.load_source(name, path)
+    import importlib.util, sys
+    spec = importlib.util.spec_from_file_location(name, path)
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[name] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+def load_exporter(disc, document=None, n=0):
+    """Carica lo script di export della disciplina come modulo (main() non viene eseguito)
+       e lo aggancia al documento."""
+    folder = dict(EXPORTERS).get(disc)
+    if folder is None: raise ValueError(u"Disciplina sconosciuta: {}".format(disc))
+    mod = _load_source("manens_export_{}_{}".format(disc.replace("-", "_").lower(), n),
+                       os.path.join(PANEL_DIR, folder, "script.py"))
+    if document is not None: mod.doc = document
+    return mod
+
+
+def parse_blocks(spec):
+    """["HVAC", "ELE:PASSERELLE"] -> [(disciplina, [blocchi] o None = tutti)] nell'ordine di EXPORTERS."""
+    if isinstance(spec, (list, tuple)):
+        items = spec
+    else:
+        items = (spec or u"").split(u",")
+    want = {}
+    for it in items:
+        it = it.strip()
+        if not it: continue
+        disc, _, blk = it.partition(u":")
+        disc = disc.strip().upper(); blk = blk.strip()
+        if disc not in dict(EXPORTERS): raise ValueError(u"Disciplina sconosciuta: {}".format(disc))
+        if not blk: want[disc] = None
+        elif disc not in want: want[disc] = [blk]
+        elif want[disc] is not None: want[disc].append(blk)
+    return [(d, want[d]) for d, _ in EXPORTERS if d in want]
+
+def group_jobs(jobs):
+    """[(workbook, [(documento, [(disciplina, blocchi)])])] nell'ordine del primo job di ogni file."""
+    order = []; by_path = {}
+    for document, path, blocks in jobs:
+        key = os.path.normcase(os.path.abspath(path))
+        if key not in by_path:
+            by_path[key] = (path, [])
+            order.append(key)
+        by_path[key][1].append((document, parse_blocks(blocks)))
+    return [by_path[k] for k in order]
+
+def load_jobs(path):
+    """File di job JSON: [{"model": ..., "workbook": ..., "blocks": [...]}, ...]."""
+    with io.open(path, "r", encoding="utf-8") as f:
+        jobs = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    for j in jobs:
+        for k in ("model", "workbook"):
+            if j.get(k) and not os.path.isabs(j[k]): j[k] = os.path.join(base, j[k])
+    return jobs
+
+
+def _release(obj):
+    try:
+        from System.Runtime.InteropServices import Marshal
+        Marshal.ReleaseComObject(obj)
+    except: pass
+
+def _title(document):
+    try: return document.Title
+    except: return u"?"
+
+def run_workbook(excel, path, docs, modules, show=False):
+    """Un file: apre, esegue i blocchi di ogni documento, salva e chiude.
+       Ritorna {"workbook", "run", "errors"}."""
+    errors = []
+    timing.begin(TOOL, path)
+    workbook = None
+    try:
+        workbook = excel.Workbooks.Open(path)
+        timing.lap("open")
+        book = comprobe.wrap(workbook)
+        for document, plan in docs:
+            for disc, blocks in plan:
+                label = disc if len(docs) == 1 else u"{} | {}".format(_title(document), disc)
+                timing.scope(label)
+                try:
+                    key = (disc, id(document))
+                    mod = modules.get(key)
+                    if mod is None:
+                        mod = modules[key] = load_exporter(disc, document, len(modules))
+                    unknown = [b for b in blocks or [] if b not in [n for n, m, f in mod.BLOCKS]]
+                    if unknown:
+                        errors.append(u"{}: blocchi sconosciuti {}".format(label, unknown))
+                        print("[BATCH] {} | Blocchi sconosciuti: {}".format(label, u", ".join(unknown)))
+                    mod.run_workbook(book, blocks)
+                except Exception as ex:
+                    errors.append(u"{}: {}".format(label, ex))
+                    print("[BATCH] {} | Errore: {}".format(label, ex))
+        timing.scope(u"")
+        from manens.blocks import sync
+        sync.flush_changelog(book)
+        timing.lap("changelog")
+        workbook.Save()
+        timing.lap("save")
+        workbook.Close(True)
+    except Exception as ex:
+        errors.append(u"{}".format(ex))
+        print("[BATCH] {} | Errore: {}".format(path, ex))
+    finally:
+        if workbook is not None: _release(workbook)
+        run = timing.end(show=show)
+        comprobe.finish()
+    return {"workbook": path, "run": run.path(u".json") if run is not None else None, "errors": errors}
+
+def run(jobs, show=False):
+    """Esegue i job [(documento, workbook, blocchi)]: un'apertura per file di destinazione.
+       Ritorna un risultato per file (vedi run_workbook)."""
+    import clr
+    clr.AddReference("Microsoft.Office.Interop.Excel")
+    from Microsoft.Office.Interop import Excel
+
+    groups = group_jobs(jobs)
+    results = []
+    modules = {}
+    excel = Excel.ApplicationClass()
+    try:
+        excel.Visible = False
+        excel.DisplayAlerts = False
+        for path, docs in groups:
+            results.append(run_workbook(excel, path, docs, modules, show))
+    finally:
+        try: excel.Quit()
+        except: pass
+        _release(excel)
+    return results
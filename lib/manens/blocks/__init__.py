@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""
+Blocchi degli export Revit -> Excel, un modulo per blocco.
+
+Gli script di export (HVAC, PLU-FFS, ELE, SPE) contengono solo il dialog e
+main(): i blocchi stanno qui, nella lib/ dell'estensione, cosi' i blocchi
+comuni (PIPE, FITTINGS, DUCTS...) esistono una volta sola, il dialog compare
+senza compilare migliaia di righe e un blocco viene importato solo quando la
+sua checkbox e' selezionata. Una volta importato il modulo resta in
+sys.modules per i clic successivi.
+
+    mod = blocks.load("pipe", doc)
+    mod.run_pipe_into_workbook(workbook)
+
+Ogni modulo ha `doc` e le proprie cache dei tipi: bind(document), chiamato da
+load() a ogni clic, aggancia il blocco al documento dello script (o del job
+dell'export batch) e svuota le cache, perche' tra un clic e l'altro i tipi
+possono cambiare anche nello stesso documento.
+
+Un modulo contiene solo la parte Revit del blocco (lettura dei parametri) e il
+suo SPEC (sync.BlockSpec: foglio, colonne, chiave); lettura del foglio, diff,
+scritture e ordinamento sono in manens.blocks.sync, uguali per tutti i blocchi.
+"""
+import sys
+
+
+def load(name, document=None):
+    """Importa manens.blocks.<name> (alla prima richiesta) e lo aggancia al documento."""
+    full = "manens.blocks." + name
+    mod = sys.modules.get(full)
+    if mod is None:
+        __import__(full)
+        mod = sys.modules[full]
+    mod.bind(document)
+    return mod
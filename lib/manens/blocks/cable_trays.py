@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Blocco PASSERELLE (Cable Trays) degli export Revit to Excel (ELE).
+Caricato da manens.blocks.load() solo se il blocco e' selezionato.
+"""
+import clr, re
+
+# Revit
+clr.AddReference("RevitAPI")
+from Autodesk.Revit.DB import FilteredElementCollector, BuiltInParameter, BuiltInCategory
+
+from manens.keys import wh_key, wh_text
+from manens.blocks import sync
+
+doc = None
+
+def bind(document):
+    """Aggancia il blocco al documento e svuota le cache dei tipi (valgono per un clic)."""
+    global doc
+    doc = document
+    _PAS_type_desc_cache.clear()
+
+
+PAS_SHEET_NAME = "Passerelle"
+PAS_HEADERS = [
+    "Category",
+    "Type Name",
+    "MAN_TypeDescription_IT",
+    "MAN_FamilyTypePrefix",
+    "Size",
+]
+
+def PAS_u(s):
+    if s is None: return u""
+    try: return s if isinstance(s, unicode) else unicode(s)
+    except: return unicode(str(s))
+
+def PAS_norm_text(s):
+    return PAS_u(s).strip()
+
+def PAS_norm_text_strong(s):
+    return u" ".join(PAS_norm_text(s).split())
+
+def PAS_category_name(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_CATEGORY_PARAM)
+        if p:
+            vs = p.AsValueString()
+            if vs: return vs
+    except: pass
+    try:
+        if elem.Category and elem.Category.Name:
+            return elem.Category.Name
+    except: pass
+    return ""
+
+def PAS_type_name(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if p:
+            s = p.AsValueString()
+            if s: return s
+            tid = p.AsElementId()
+            if tid and tid.IntegerValue > 0:
+                t = doc.GetElement(tid)
+                if t:
+                    q = t.get_Parameter(BuiltInParameter.ALL_MODEL_TYPE_NAME)
+                    if q:
+                        qs = q.AsString()
+                        if qs: return qs
+                    q2 = t.get_Parameter(BuiltInParameter.SYMBOL_NAME_PARAM)
+                    if q2:
+                        q2s = q2.AsString()
+                        if q2s: return q2s
+                    try: return t.Name or ""
+                    except: pass
+    except: pass
+    return ""
+
+_PAS_type_desc_cache = {}
+def PAS_type_desc(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if not p: return ""
+        tid = p.AsElementId()
+        if not tid or tid.IntegerValue <= 0: return ""
+        tid_i = tid.IntegerValue
+        if tid_i in _PAS_type_desc_cache: return _PAS_type_desc_cache[tid_i]
+        t = doc.GetElement(tid)
+        val = ""
+        if t:
+            pp = t.LookupParameter("MAN_TypeDescription_IT")
+            if pp: val = (pp.AsString() or "") or (pp.AsValueString() or "")
+        _PAS_type_desc_cache[tid_i] = val
+        return val
+    except:
+        return ""
+
+def PAS_type_param_text(elem, param_name):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if not p: return ""
+        tid = p.AsElementId()
+        if not tid or tid.IntegerValue <= 0: return ""
+        t = doc.GetElement(tid)
+        if not t: return ""
+        q = t.LookupParameter(param_name)
+        if not q: return ""
+        s = q.AsString()
+        if s: return PAS_norm_text(s)
+        vs = q.AsValueString()
+        if vs: return PAS_norm_text(vs)
+        return ""
+    except:
+        return ""
+
+def PAS_instance_size_raw(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.RBS_CALCULATED_SIZE)
+        if not p: return ""
+        s = p.AsString()
+        if s: return PAS_norm_text(s)
+        vs = p.AsValueString()
+        if vs: return PAS_norm_text(vs)
+        return ""
+    except:
+        return ""
+
+# Esempi accettati: "300 mmx104 mmϕ", "300x104", "300mm x 104mm", "300 Ø x 104"
+# Output chiave: (300000, 104000) in micrometri; testo "300x104"
+def PAS_size_key_and_display(raw):
+    if not raw: return "", ""
+    txt = PAS_u(raw)
+    # rimuove simboli diametro e spazi attaccati
+    txt = re.sub(u"[ΦφØø⌀ϕ]", u"", txt)
+    # sostituisce separatori come ' x ' o 'X' con 'x' semplice per parsing robusto
+    txt = re.sub(u"[×X]", u"x", txt)
+    # primi due numeri (con eventuali decimali) -> chiave numerica W x H
+    key = wh_key(txt)
+    if key:
+        return key, wh_text(key)
+    # fallback: rimuovi unità "mm", spazi
+    t = PAS_norm_text(re.sub(u"[ ]*mm", u"", txt, flags=re.IGNORECASE))
+    t = t.replace(" ", "")
+    return t, t
+
+def PAS_size_sort_tuple(size_key):
+    # (300000, 104000) per ordinamento stabile; le size non numeriche in coda
+    if isinstance(size_key, tuple): return size_key
+    return (9999999999, 9999999999)
+
+# ---------------------- blocco (manens.blocks.sync) -----------------------
+def PAS_collect(document):
+    # categoria "Cable Trays"
+    return FilteredElementCollector(document)\
+        .OfCategory(BuiltInCategory.OST_CableTray)\
+        .WhereElementIsNotElementType()\
+        .ToElements()
+
+def PAS_key(e):
+    t_key = PAS_norm_text_strong(PAS_type_name(e) or "")
+    s_key, s_disp = PAS_size_key_and_display(PAS_instance_size_raw(e) or "")
+    if not t_key and not s_key: return None
+    return (t_key, s_key)
+
+def PAS_prefix(e):
+    return PAS_type_param_text(e, "MAN_FamilyTypePrefix")
+
+def PAS_row(e, key):
+    s_key, s_disp = PAS_size_key_and_display(PAS_instance_size_raw(e) or "")
+    return [PAS_category_name(e) or "Cable Trays", key[0], PAS_type_desc(e) or "", PAS_prefix(e) or "", s_disp]
+
+SPEC = sync.BlockSpec(
+    "PASSERELLE", PAS_SHEET_NAME, PAS_HEADERS,
+    keys=[("Type Name", PAS_norm_text_strong), ("Size", lambda v: PAS_size_key_and_display(v)[0])],
+    collect=PAS_collect, key=PAS_key, row=PAS_row,
+    fill={"MAN_TypeDescription_IT": PAS_type_desc, "MAN_FamilyTypePrefix": PAS_prefix},
+    added=lambda r: (r[1], PAS_size_key_and_display(r[4])[1]), categories=[BuiltInCategory.OST_CableTray],
+    quantities=[(sync.LENGTH_HEADER, sync.curve_length)])
+
+def run_cable_trays_into_workbook(workbook):
+    sync.run(SPEC, workbook, doc)
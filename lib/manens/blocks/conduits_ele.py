@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Blocco CAVIDOTTI (Conduits) degli export Revit to Excel (ELE).
+Caricato da manens.blocks.load() solo se il blocco e' selezionato.
+"""
+import clr, re
+
+# Revit
+clr.AddReference("RevitAPI")
+from Autodesk.Revit.DB import FilteredElementCollector, BuiltInParameter, BuiltInCategory
+
+# Unit conversion (Revit 2022+ / <=2021)
+try:
+    from Autodesk.Revit.DB import UnitUtils, UnitTypeId  # 2022+
+    _HAS_UTID = True
+except:
+    from Autodesk.Revit.DB import UnitUtils, DisplayUnitType  # <=2021
+    _HAS_UTID = False
+
+from manens.keys import mm_key, mm_value
+from manens.blocks import sync
+from manens.blocks import cable_trays
+from manens.blocks.cable_trays import (
+    PAS_u, PAS_norm_text_strong, PAS_category_name, PAS_type_name, PAS_type_desc, PAS_type_param_text
+)
+
+doc = None
+
+def bind(document):
+    """Aggancia il blocco al documento e svuota le cache dei tipi (valgono per un clic)."""
+    global doc
+    doc = document
+    cable_trays.bind(document)     # PAS_type_desc legge doc e cache di cable_trays
+
+
+COND_SHEET_NAME = "Cavidotti"
+COND_HEADERS = [
+    "Category",
+    "Type Name",
+    "MAN_TypeDescription_IT",
+    "MAN_FamilyTypePrefix",
+    "Outside Diameter",   # mm (numerico)
+]
+
+def COND_feet_to_mm(val_ft):
+    try:
+        if _HAS_UTID:
+            return float(UnitUtils.ConvertFromInternalUnits(float(val_ft), UnitTypeId.Millimeters))
+        else:
+            return float(UnitUtils.ConvertFromInternalUnits(float(val_ft), DisplayUnitType.DUT_MILLIMETERS))
+    except:
+        try: return float(val_ft) * 304.8
+        except: return 0.0
+
+def COND_to_float_mm(x):
+    if x is None or x == "": return 0.0
+    try: return float(x)
+    except:
+        try: return float(PAS_u(x).replace(",", ".").strip())
+        except:
+            m = re.search(r'(\d+(?:\.\d+)?)', PAS_u(x).replace(",", "."))
+            return float(m.group(1)) if m else 0.0
+
+def COND_outside_diam_mm_key(elem):
+    """Ritorna (key_mm, val_mm) per Outside Diameter del Conduit."""
+    p = None
+    try:
+        p = elem.get_Parameter(BuiltInParameter.RBS_CONDUIT_OUTER_DIAM_PARAM)
+    except:
+        p = None
+    if p:
+        # double interno (feet)
+        try:
+            ft = p.AsDouble()
+            if ft and ft > 0:
+                mm = COND_feet_to_mm(ft)
+                return (mm_key(mm), mm)
+        except: pass
+        # fallback string/value string
+        try:
+            s = (p.AsString() or p.AsValueString() or "").strip()
+            if s:
+                mm = COND_to_float_mm(s)
+                if mm > 0: return (mm_key(mm), mm)
+        except: pass
+    return (0, 0.0)
+
+# ---------------------- blocco (manens.blocks.sync) -----------------------
+def COND_collect(document):
+    return FilteredElementCollector(document) \
+        .OfCategory(BuiltInCategory.OST_Conduit) \
+        .WhereElementIsNotElementType() \
+        .ToElements()
+
+def COND_key(e):
+    tnm = PAS_type_name(e) or ""
+    if not tnm: return None
+    # escludi i "Cavidotti Speciali" gestiti dall'export SPE
+    tnlc = tnm.lower()
+    if ("thermocable" in tnlc) or ("airsampling" in tnlc): return None
+    d_key, d_val = COND_outside_diam_mm_key(e)
+    if d_key <= 0: return None
+    return (PAS_norm_text_strong(tnm), d_key)
+
+def COND_prefix(e):
+    return PAS_type_param_text(e, "MAN_FamilyTypePrefix")
+
+def COND_row(e, key):
+    return [PAS_category_name(e) or "Conduits", key[0], PAS_type_desc(e) or "", COND_prefix(e) or "",
+            mm_value(key[1])]
+
+SPEC = sync.BlockSpec(
+    "CAVIDOTTI", COND_SHEET_NAME, COND_HEADERS,
+    keys=[("Type Name", PAS_norm_text_strong), ("Outside Diameter", lambda v: mm_key(COND_to_float_mm(v)))],
+    collect=COND_collect, key=COND_key, row=COND_row,
+    fill={"MAN_TypeDescription_IT": PAS_type_desc, "MAN_FamilyTypePrefix": COND_prefix},
+    added=lambda r: (r[1], round(float(r[4]), 3)), categories=[BuiltInCategory.OST_Conduit],
+    quantities=[(sync.LENGTH_HEADER, sync.curve_length)])
+
+def run_conduits_into_workbook(workbook):
+    sync.run(SPEC, workbook, doc)
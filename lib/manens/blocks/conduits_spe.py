@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Blocco CAVIDOTTI (Conduits) degli export Revit to Excel (SPE).
+Caricato da manens.blocks.load() solo se il blocco e' selezionato.
+"""
+import clr, re
+
+# Revit
+clr.AddReference("RevitAPI")
+from Autodesk.Revit.DB import FilteredElementCollector, BuiltInParameter, BuiltInCategory
+
+# Unit conversion (Revit 2022+ / <=2021)
+try:
+    from Autodesk.Revit.DB import UnitUtils, UnitTypeId  # 2022+
+    _HAS_UTID = True
+except:
+    from Autodesk.Revit.DB import UnitUtils, DisplayUnitType  # <=2021
+    _HAS_UTID = False
+
+from manens.keys import mm_key, mm_value
+from manens.blocks import sync
+
+doc = None
+
+def bind(document):
+    """Aggancia il blocco al documento e svuota le cache dei tipi (valgono per un clic)."""
+    global doc
+    doc = document
+    _COND_type_desc_cache.clear()
+
+
+COND_SHEET_NAME = "Cavidotti"
+COND_HEADERS = [
+    "Category",
+    "Type Name",
+    "MAN_TypeDescription_IT",
+    "MAN_FamilyTypePrefix",
+    "Outside Diameter",   # mm (numerico)
+]
+
+# ----------------------- Utils base -------------------------
+def COND_u(s):
+    if s is None: return u""
+    try:
+        return s if isinstance(s, unicode) else unicode(s)
+    except:
+        return unicode(str(s))
+
+def COND_norm_text(s):
+    return COND_u(s).strip()
+
+def COND_norm_text_strong(s):
+    return u" ".join(COND_norm_text(s).split())
+
+def COND_category_name(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_CATEGORY_PARAM)
+        if p:
+            vs = p.AsValueString()
+            if vs: return vs
+    except: pass
+    try:
+        if elem.Category and elem.Category.Name:
+            return elem.Category.Name
+    except: pass
+    return ""
+
+def COND_type_name(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if p:
+            s = p.AsValueString()
+            if s: return s
+            tid = p.AsElementId()
+            if tid and tid.IntegerValue > 0:
+                t = doc.GetElement(tid)
+                if t:
+                    q = t.get_Parameter(BuiltInParameter.ALL_MODEL_TYPE_NAME)
+                    if q:
+                        qs = q.AsString()
+                        if qs: return qs
+                    q2 = t.get_Parameter(BuiltInParameter.SYMBOL_NAME_PARAM)
+                    if q2:
+                        q2s = q2.AsString()
+                        if q2s: return q2s
+                    try: return t.Name or ""
+                    except: pass
+    except: pass
+    return ""
+
+_COND_type_desc_cache = {}
+def COND_type_desc(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if not p: return ""
+        tid = p.AsElementId()
+        if not tid or tid.IntegerValue <= 0: return ""
+        tid_i = tid.IntegerValue
+        if tid_i in _COND_type_desc_cache: return _COND_type_desc_cache[tid_i]
+        t = doc.GetElement(tid)
+        val = ""
+        if t:
+            pp = t.LookupParameter("MAN_TypeDescription_IT")
+            if pp: val = (pp.AsString() or "") or (pp.AsValueString() or "")
+        _COND_type_desc_cache[tid_i] = val
+        return val
+    except:
+        return ""
+
+def COND_type_param_text(elem, param_name):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if not p: return ""
+        tid = p.AsElementId()
+        if not tid or tid.IntegerValue <= 0: return ""
+        t = doc.GetElement(tid)
+        if not t: return ""
+        q = t.LookupParameter(param_name)
+        if not q: return ""
+        s = q.AsString()
+        if s: return COND_norm_text(s)
+        vs = q.AsValueString()
+        if vs: return COND_norm_text(vs)
+        return ""
+    except:
+        return ""
+
+# --------------------- Unità / diametro ---------------------
+def COND_feet_to_mm(val_ft):
+    try:
+        if _HAS_UTID:
+            return float(UnitUtils.ConvertFromInternalUnits(float(val_ft), UnitTypeId.Millimeters))
+        else:
+            return float(UnitUtils.ConvertFromInternalUnits(float(val_ft), DisplayUnitType.DUT_MILLIMETERS))
+    except:
+        try: return float(val_ft) * 304.8
+        except: return 0.0
+
+def COND_to_float_mm(x):
+    if x is None or x == "": return 0.0
+    try: return float(x)
+    except:
+        try: return float(COND_u(x).replace(",", ".").strip())
+        except:
+            m = re.search(r'(\d+(?:\.\d+)?)', COND_u(x).replace(",", "."))
+            return float(m.group(1)) if m else 0.0
+
+def COND_outside_diam_mm_key(elem):
+    """Ritorna (key_mm, val_mm) per Outside Diameter del Conduit."""
+    p = None
+    try:
+        p = elem.get_Parameter(BuiltInParameter.RBS_CONDUIT_OUTER_DIAM_PARAM)
+    except:
+        p = None
+    if p:
+        # double interno (feet)
+        try:
+            ft = p.AsDouble()
+            if ft and ft > 0:
+                mm = COND_feet_to_mm(ft)
+                return (mm_key(mm), mm)
+        except: pass
+        # fallback string/value string
+        try:
+            s = (p.AsString() or p.AsValueString() or "").strip()
+            if s:
+                mm = COND_to_float_mm(s)
+                if mm > 0: return (mm_key(mm), mm)
+        except: pass
+    return (0, 0.0)
+
+# ---------------------- blocco (manens.blocks.sync) -----------------------
+def COND_collect(document):
+    return FilteredElementCollector(document) \
+        .OfCategory(BuiltInCategory.OST_Conduit) \
+        .WhereElementIsNotElementType() \
+        .ToElements()
+
+def COND_key(e):
+    # solo Type Name che contengono AirSampling o ThermoCable
+    tnm = COND_type_name(e) or ""
+    tnm_lc = tnm.lower()
+    if ("airsampling" not in tnm_lc) and ("thermocable" not in tnm_lc): return None
+    d_key, d_val = COND_outside_diam_mm_key(e)
+    if d_key <= 0: return None  # ignora senza diametro utile
+    return (COND_norm_text_strong(tnm), d_key)
+
+def COND_prefix(e):
+    return COND_type_param_text(e, "MAN_FamilyTypePrefix")
+
+def COND_row(e, key):
+    return [COND_category_name(e) or "Conduits", key[0], COND_type_desc(e) or "", COND_prefix(e) or "",
+            mm_value(key[1])]
+
+SPEC = sync.BlockSpec(
+    "CAVIDOTTI", COND_SHEET_NAME, COND_HEADERS,
+    keys=[("Type Name", COND_norm_text_strong), ("Outside Diameter", lambda v: mm_key(COND_to_float_mm(v)))],
+    collect=COND_collect, key=COND_key, row=COND_row,
+    fill={"MAN_TypeDescription_IT": COND_type_desc, "MAN_FamilyTypePrefix": COND_prefix},
+    added=lambda r: (r[1], round(float(r[4]), 3)), categories=[BuiltInCategory.OST_Conduit],
+    quantities=[(sync.LENGTH_HEADER, sync.curve_length)])
+
+def run_conduits_into_workbook(workbook):
+    sync.run(SPEC, workbook, doc)
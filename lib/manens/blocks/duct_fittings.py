@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Blocco DUCT FITTINGS (Family/Type → MaxSize) degli export Revit to Excel (HVAC, ELE).
+Caricato da manens.blocks.load() solo se il blocco e' selezionato.
+"""
+import clr
+
+# Revit
+clr.AddReference("RevitAPI")
+from Autodesk.Revit.DB import FilteredElementCollector, BuiltInParameter, BuiltInCategory, FamilyInstance
+
+# Unit conversion (Revit 2022+ / <=2021)
+try:
+    from Autodesk.Revit.DB import UnitUtils, UnitTypeId  # 2022+
+    _HAS_UTID = True
+except:
+    from Autodesk.Revit.DB import UnitUtils, DisplayUnitType  # <=2021
+    _HAS_UTID = False
+
+from manens.keys import mm_key, mm_value
+from manens.blocks import sync
+
+doc = None
+
+def bind(document):
+    """Aggancia il blocco al documento e svuota le cache dei tipi (valgono per un clic)."""
+    global doc
+    doc = document
+    _DFT_type_desc_cache.clear()
+
+
+DFT_SHEET_NAME = "Fitting canali"
+DFT_HEADERS = ["Category", "Family Name", "Type Name", "MAN_TypeDescription_IT", "MAN_Fittings_MaxSize"]
+
+def DFT_u(s):
+    if s is None: return u""
+    try: return s if isinstance(s, unicode) else unicode(s)
+    except: return unicode(str(s))
+
+def DFT_norm_text(s):
+    return DFT_u(s).strip()
+
+def DFT_norm_text_strong(s):
+    return u" ".join(DFT_norm_text(s).split())
+
+def DFT_to_float(x):
+    if x is None or x == "": return 0.0
+    try: return float(x)
+    except:
+        try: return float(DFT_u(x).replace(",", ".").strip())
+        except: return 0.0
+
+def DFT_norm_mm_key(v):
+    return mm_key(v)
+
+def DFT_category_name(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_CATEGORY_PARAM)
+        if p:
+            vs = p.AsValueString()
+            if vs: return vs
+    except: pass
+    try:
+        if elem.Category and elem.Category.Name:
+            return elem.Category.Name
+    except: pass
+    return ""
+
+def DFT_type_name(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if p:
+            s = p.AsValueString()
+            if s: return s
+            tid = p.AsElementId()
+            if tid and tid.IntegerValue > 0:
+                t = doc.GetElement(tid)
+                if t:
+                    q = t.get_Parameter(BuiltInParameter.ALL_MODEL_TYPE_NAME)
+                    if q:
+                        qs = q.AsString()
+                        if qs: return qs
+                    q2 = t.get_Parameter(BuiltInParameter.SYMBOL_NAME_PARAM)
+                    if q2:
+                        q2s = q2.AsString()
+                        if q2s: return q2s
+                    try: return t.Name or ""
+                    except: pass
+    except: pass
+    return ""
+
+def DFT_family_name(elem):
+    try:
+        if hasattr(elem, "Symbol") and elem.Symbol and elem.Symbol.Family and elem.Symbol.Family.Name:
+            return elem.Symbol.Family.Name
+    except: pass
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if p:
+            tid = p.AsElementId()
+            if tid and tid.IntegerValue > 0:
+                t = doc.GetElement(tid)
+                if t and hasattr(t, "Family") and t.Family and t.Family.Name:
+                    return t.Family.Name
+    except: pass
+    return ""
+
+_DFT_type_desc_cache = {}
+def DFT_type_desc(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if not p: return ""
+        tid = p.AsElementId()
+        if not tid or tid.IntegerValue <= 0: return ""
+        tid_i = tid.IntegerValue
+        if tid_i in _DFT_type_desc_cache: return _DFT_type_desc_cache[tid_i]
+        t = doc.GetElement(tid)
+        val = ""
+        if t:
+            pp = t.LookupParameter("MAN_TypeDescription_IT")
+            if pp: val = (pp.AsString() or "") or (pp.AsValueString() or "")
+        _DFT_type_desc_cache[tid_i] = val
+        return val
+    except:
+        return ""
+
+def DFT_feet_to_mm(val_ft):
+    try:
+        if _HAS_UTID:
+            return float(UnitUtils.ConvertFromInternalUnits(float(val_ft), UnitTypeId.Millimeters))
+        else:
+            return float(UnitUtils.ConvertFromInternalUnits(float(val_ft), DisplayUnitType.DUT_MILLIMETERS))
+    except:
+        try: return float(val_ft) * 304.8
+        except: return 0.0
+
+def DFT_maxsize_mm(elem):
+    try:
+        p = elem.LookupParameter("MAN_Fittings_MaxSize")
+        if not p: return 0.0
+        d_ft = None
+        try:
+            d_ft = p.AsDouble()
+        except:
+            s = (p.AsString() or p.AsValueString() or "").replace(",", ".").strip()
+            if not s: return 0.0
+            try: d_ft = float(s)
+            except: return 0.0
+        return DFT_feet_to_mm(d_ft)
+    except:
+        return 0.0
+
+# ---------------------- blocco (manens.blocks.sync) -----------------------
+def DFT_collect(document):
+    return FilteredElementCollector(document) \
+        .OfCategory(BuiltInCategory.OST_DuctFitting) \
+        .WhereElementIsNotElementType() \
+        .ToElements()
+
+def DFT_key(e):
+    if not isinstance(e, FamilyInstance): return None
+    return (DFT_norm_text_strong(DFT_family_name(e) or ""),
+            DFT_norm_text_strong(DFT_type_name(e) or ""),
+            DFT_norm_mm_key(DFT_maxsize_mm(e)))
+
+def DFT_row(e, key):
+    return [DFT_category_name(e) or "Duct Fittings", key[0], key[1],
+            DFT_type_desc(e) or "", mm_value(key[2])]
+
+SPEC = sync.BlockSpec(
+    "DUCT FIT", DFT_SHEET_NAME, DFT_HEADERS,
+    keys=[("Family Name", DFT_norm_text_strong), ("Type Name", DFT_norm_text_strong),
+          ("MAN_Fittings_MaxSize", lambda v: DFT_norm_mm_key(DFT_to_float(v)))],
+    collect=DFT_collect, key=DFT_key, row=DFT_row,
+    fill={"MAN_TypeDescription_IT": DFT_type_desc},
+    added=lambda r: (r[1], r[2], round(float(r[4]), 3)),
+    removed=lambda k: (k[0], k[1], mm_value(k[2])), categories=[BuiltInCategory.OST_DuctFitting])
+
+def run_duct_fittings_into_workbook(workbook):
+    sync.run(SPEC, workbook, doc)
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Blocco DUCT INSULATIONS (solo Duct come host) degli export Revit to Excel (HVAC).
+Caricato da manens.blocks.load() solo se il blocco e' selezionato.
+"""
+import clr
+
+# Revit
+clr.AddReference("RevitAPI")
+from Autodesk.Revit.DB import FilteredElementCollector, BuiltInParameter, BuiltInCategory
+from Autodesk.Revit.DB.Mechanical import DuctInsulation, Duct
+
+from manens.keys import mm_key, mm_text
+from manens.blocks import sync
+
+doc = None
+
+def bind(document):
+    """Aggancia il blocco al documento e svuota le cache dei tipi (valgono per un clic)."""
+    global doc
+    doc = document
+    _type_desc_cache_din.clear()
+
+
+DIN_SHEET_NAME = "Isolamento canali"
+DIN_HEADERS = ["Category", "Type Name", "MAN_TypeDescription_IT", "Insulation Thickness"]
+FEET_TO_MM_DIN = 304.8
+
+def _norm_text_din(s):
+    if s is None: return ""
+    try:
+        u = unicode(s) if not isinstance(s, unicode) else s
+    except:
+        u = str(s)
+    return u.strip()
+
+def _fmt_mm_din(x):
+    s = ("%.3f" % float(x)).rstrip("0").rstrip(".")
+    return s if s else "0"
+
+def _to_number_or_text_for_thickness_din(s):
+    if s is None: return ""
+    try:
+        ss = unicode(s) if not isinstance(s, unicode) else s
+    except:
+        ss = str(s)
+    ss = ss.replace(",", ".").strip()
+    try:
+        return float(ss)
+    except:
+        return ss
+
+def category_name_ui_en_din(elem):
+    try:
+        if elem.Category and elem.Category.Name:
+            return elem.Category.Name
+    except: pass
+    return ""
+
+def type_name_from_instance_din(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if p:
+            s = p.AsValueString()
+            if s: return s
+            tid = p.AsElementId()
+            if tid and tid.IntegerValue > 0:
+                t = doc.GetElement(tid)
+                if t:
+                    q = t.get_Parameter(BuiltInParameter.ALL_MODEL_TYPE_NAME)
+                    if q:
+                        qs = q.AsString()
+                        if qs: return qs
+                    q2 = t.get_Parameter(BuiltInParameter.SYMBOL_NAME_PARAM)
+                    if q2:
+                        q2s = q2.AsString()
+                        if q2s: return q2s
+                    try: return t.Name or ""
+                    except: pass
+    except: pass
+    return ""
+
+_type_desc_cache_din = {}
+def man_type_description_it_from_type_din(elem):
+    try:
+        tid_param = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if not tid_param: return ""
+        tid = tid_param.AsElementId()
+        if not tid or tid.IntegerValue <= 0: return ""
+        tid_int = tid.IntegerValue
+        if tid_int in _type_desc_cache_din: return _type_desc_cache_din[tid_int]
+        t = doc.GetElement(tid)
+        val = ""
+        if t:
+            p = t.LookupParameter("MAN_TypeDescription_IT")
+            if p: val = (p.AsString() or "") or (p.AsValueString() or "")
+        _type_desc_cache_din[tid_int] = val
+        return val
+    except:
+        return ""
+
+def as_string_or_valuestring_din(p):
+    if not p: return ""
+    try:
+        s = p.AsString()
+        if s: return s
+    except: pass
+    try:
+        vs = p.AsValueString()
+        if vs: return vs
+    except: pass
+    return ""
+
+def is_duct_hosted_din(ins_elem):
+    try:
+        hid = ins_elem.HostElementId
+        if hid and hid.IntegerValue > 0:
+            host = doc.GetElement(hid)
+            return isinstance(host, Duct)
+    except: pass
+    return False
+
+def thickness_only_din(elem):
+    """Ritorna (thick_key, thick_disp): chiave in micrometri interi, testo in mm."""
+    thick_key = 0; thick_disp = ""
+    pth = None
+    # prendiamo il parametro spessore con fallback
+    try:
+        pth = elem.get_Parameter(getattr(BuiltInParameter, "RBS_INSULATION_THICKNESS_FOR_DUCT"))
+    except: pass
+    if not pth:
+        try:
+            pth = elem.get_Parameter(getattr(BuiltInParameter, "RBS_INSULATION_THICKNESS"))
+        except: pass
+    if not pth:
+        try:
+            pth = elem.get_Parameter(getattr(BuiltInParameter, "RBS_INSULATION_THICKNESS_FOR_PIPE"))
+        except: pass
+
+    if pth:
+        # prova come double (internal feet)
+        try:
+            d_ft = pth.AsDouble()
+            if d_ft is not None:
+                d_mm = d_ft * FEET_TO_MM_DIN
+                thick_key  = mm_key(d_mm)
+                thick_disp = _fmt_mm_din(d_mm)
+                return thick_key, thick_disp
+        except:
+            pass
+        # fallback a ValueString
+        disp = as_string_or_valuestring_din(pth)
+        thick_key = mm_key(disp)
+        if thick_key:
+            return thick_key, mm_text(thick_key)
+    return 0, ""
+
+# ---------------------- blocco (manens.blocks.sync) -----------------------
+def DIN_collect(document):
+    return FilteredElementCollector(document).OfClass(DuctInsulation).WhereElementIsNotElementType().ToElements()
+
+def DIN_key(ins):
+    if not is_duct_hosted_din(ins): return None
+    th_key, th_disp = thickness_only_din(ins)
+    if not th_key: return None
+    return (type_name_from_instance_din(ins) or "", th_key)
+
+def DIN_row(ins, key):
+    th_key, th_disp = thickness_only_din(ins)
+    return [category_name_ui_en_din(ins) or "Duct Insulations", key[0],
+            man_type_description_it_from_type_din(ins) or "", th_disp or ""]
+
+SPEC = sync.BlockSpec(
+    "DUCT INS", DIN_SHEET_NAME, DIN_HEADERS,
+    keys=[("Type Name", _norm_text_din), ("Insulation Thickness", mm_key)],
+    collect=DIN_collect, key=DIN_key, row=DIN_row,
+    fill={"MAN_TypeDescription_IT": man_type_description_it_from_type_din},
+    cells={"Insulation Thickness": _to_number_or_text_for_thickness_din},
+    added=lambda r: (r[1], r[3]), categories=[BuiltInCategory.OST_DuctInsulations],
+    quantities=[(sync.LENGTH_HEADER, sync.curve_length)])
+
+def run_duct_ins_into_workbook(workbook):
+    sync.run(SPEC, workbook, doc)
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+Blocco CANALI RIGIDI (Type → Max Dim) degli export Revit to Excel (HVAC, ELE).
+Caricato da manens.blocks.load() solo se il blocco e' selezionato.
+"""
+import clr
+
+# Revit
+clr.AddReference("RevitAPI")
+from Autodesk.Revit.DB import FilteredElementCollector, BuiltInParameter, BuiltInCategory
+from Autodesk.Revit.DB.Mechanical import Duct
+
+# Unit conversion (Revit 2022+ / <=2021)
+try:
+    from Autodesk.Revit.DB import UnitUtils, UnitTypeId  # 2022+
+    _HAS_UTID = True
+except:
+    from Autodesk.Revit.DB import UnitUtils, DisplayUnitType  # <=2021
+    _HAS_UTID = False
+
+from manens.keys import mm_key, mm_value
+from manens.blocks import sync
+
+doc = None
+
+def bind(document):
+    """Aggancia il blocco al documento e svuota le cache dei tipi (valgono per un clic)."""
+    global doc
+    doc = document
+    _duct_type_desc_cache.clear()
+
+
+# Sheet: "Canali Rigidi"
+# Colonne: Category | Type Name | MAN_TypeDescription_IT | Width/Height - Diameter
+SHEET_NAME_DUCT = "Canali Rigidi"
+OUR_HEADERS_DUCT = ["Category", "Type Name", "MAN_TypeDescription_IT", "Width/Height - Diameter"]
+
+# -------- utils base --------
+def _u_duct(s):
+    if s is None: return u""
+    try: return s if isinstance(s, unicode) else unicode(s)
+    except: return unicode(str(s))
+
+def _norm_text_duct(s):
+    return _u_duct(s).strip()
+
+def _category_name_duct(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_CATEGORY_PARAM)
+        if p:
+            vs = p.AsValueString()
+            if vs: return vs
+    except: pass
+    try:
+        if elem.Category and elem.Category.Name:
+            return elem.Category.Name
+    except: pass
+    return ""
+
+def _type_name_duct(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if p:
+            s = p.AsValueString()
+            if s: return s
+            tid = p.AsElementId()
+            if tid and tid.IntegerValue > 0:
+                t = doc.GetElement(tid)
+                if t:
+                    q = t.get_Parameter(BuiltInParameter.ALL_MODEL_TYPE_NAME)
+                    if q:
+                        qs = q.AsString()
+                        if qs: return qs
+                    q2 = t.get_Parameter(BuiltInParameter.SYMBOL_NAME_PARAM)
+                    if q2:
+                        q2s = q2.AsString()
+                        if q2s: return q2s
+                    try: return t.Name or ""
+                    except: pass
+    except: pass
+    return ""
+
+_duct_type_desc_cache = {}
+def _man_type_description_it_duct(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if not p: return ""
+        tid = p.AsElementId()
+        if not tid or tid.IntegerValue <= 0: return ""
+        tid_i = tid.IntegerValue
+        if tid_i in _duct_type_desc_cache: return _duct_type_desc_cache[tid_i]
+        t = doc.GetElement(tid)
+        val = ""
+        if t:
+            pp = t.LookupParameter("MAN_TypeDescription_IT")
+            if pp: val = (pp.AsString() or "") or (pp.AsValueString() or "")
+        _duct_type_desc_cache[tid_i] = val
+        return val
+    except:
+        return ""
+
+def _feet_to_mm_duct(val_ft):
+    try:
+        if _HAS_UTID:
+            return float(UnitUtils.ConvertFromInternalUnits(float(val_ft), UnitTypeId.Millimeters))
+        else:
+            return float(UnitUtils.ConvertFromInternalUnits(float(val_ft), DisplayUnitType.DUT_MILLIMETERS))
+    except:
+        try: return float(val_ft) * 304.8
+        except: return 0.0
+
+def _size_mm_key_duct(elem):
+    """Restituisce (size_key, size_val_mm): chiave in micrometri interi, valore in mm.
+       Se circolare usa Diameter; altrimenti max(Width, Height)."""
+    d = None; w = None; h = None
+    try:
+        p = elem.get_Parameter(BuiltInParameter.RBS_CURVE_DIAMETER_PARAM)
+        if p: d = p.AsDouble()
+    except: pass
+    if d and d > 0:
+        mm = _feet_to_mm_duct(d)
+        return (mm_key(mm), mm)
+
+    try:
+        pw = elem.get_Parameter(BuiltInParameter.RBS_CURVE_WIDTH_PARAM)
+        if pw: w = pw.AsDouble()
+    except: pass
+    try:
+        ph = elem.get_Parameter(BuiltInParameter.RBS_CURVE_HEIGHT_PARAM)
+        if ph: h = ph.AsDouble()
+    except: pass
+
+    mx = 0.0
+    try:
+        if w: mx = max(mx, w)
+        if h: mx = max(mx, h)
+    except: pass
+    mm = _feet_to_mm_duct(mx)
+    return (mm_key(mm), mm)
+
+# ---------------------- blocco (manens.blocks.sync) -----------------------
+def _collect_duct(document):
+    return FilteredElementCollector(document).OfClass(Duct).WhereElementIsNotElementType().ToElements()
+
+def _to_float_duct(v):
+    if v is None or v == "": return 0.0
+    try: return float(v)
+    except:
+        try: return float(_u_duct(v).replace(",", "."))
+        except: return 0.0
+
+def _key_duct(d):
+    tname = _type_name_duct(d) or ""
+    if not tname: return None
+    size_key, size_val = _size_mm_key_duct(d)
+    if size_key <= 0: return None  # ignora elementi senza dimensioni utili
+    return (tname, size_key)
+
+def _row_duct(d, key):
+    return [_category_name_duct(d) or "Ducts", key[0], _man_type_description_it_duct(d) or "", mm_value(key[1])]
+
+SPEC = sync.BlockSpec(
+    "DUCTS", SHEET_NAME_DUCT, OUR_HEADERS_DUCT,
+    keys=[("Type Name", _norm_text_duct), ("Width/Height - Diameter", lambda v: mm_key(_to_float_duct(v)))],
+    collect=_collect_duct, key=_key_duct, row=_row_duct,
+    fill={"MAN_TypeDescription_IT": _man_type_description_it_duct},
+    added=lambda r: (r[1], r[3]), categories=[BuiltInCategory.OST_DuctCurves],
+    quantities=[(sync.LENGTH_HEADER, sync.curve_length)])
+
+def run_ducts_into_workbook(workbook):
+    sync.run(SPEC, workbook, doc)
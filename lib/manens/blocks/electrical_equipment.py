@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Blocco QUADRI ELETTRICI (Electrical Equipment) degli export Revit to Excel (ELE).
+Caricato da manens.blocks.load() solo se il blocco e' selezionato.
+"""
+import clr
+
+# Revit
+clr.AddReference("RevitAPI")
+from Autodesk.Revit.DB import FilteredElementCollector, BuiltInParameter, BuiltInCategory
+
+from manens.blocks import sync
+
+doc = None
+
+def bind(document):
+    """Aggancia il blocco al documento e svuota le cache dei tipi (valgono per un clic)."""
+    global doc
+    doc = document
+    _EEQ_type_desc_cache.clear()
+
+
+EEQ_SHEET_NAME = "Quadri elettrici"
+EEQ_HEADERS = [
+    "Category",
+    "Family Name",
+    "Type Name",
+    "MAN_TypeDescription_IT",
+    "Panel Name",
+    "Level",
+]
+
+def EEQ_u(s):
+    if s is None: return u""
+    try: return s if isinstance(s, unicode) else unicode(s)
+    except: return unicode(str(s))
+
+def EEQ_norm_text(s):
+    return EEQ_u(s).strip()
+
+def EEQ_norm_text_strong(s):
+    return u" ".join(EEQ_norm_text(s).split())
+
+def EEQ_category_name(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_CATEGORY_PARAM)
+        if p:
+            vs = p.AsValueString()
+            if vs: return vs
+    except: pass
+    try:
+        if elem.Category and elem.Category.Name:
+            return elem.Category.Name
+    except: pass
+    return ""
+
+def EEQ_type_name(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if p:
+            s = p.AsValueString()
+            if s: return s
+            tid = p.AsElementId()
+            if tid and tid.IntegerValue > 0:
+                t = doc.GetElement(tid)
+                if t:
+                    q = t.get_Parameter(BuiltInParameter.ALL_MODEL_TYPE_NAME)
+                    if q:
+                        qs = q.AsString()
+                        if qs: return qs
+                    q2 = t.get_Parameter(BuiltInParameter.SYMBOL_NAME_PARAM)
+                    if q2:
+                        q2s = q2.AsString()
+                        if q2s: return q2s
+                    try: return t.Name or ""
+                    except: pass
+    except: pass
+    return ""
+
+def EEQ_family_name(elem):
+    try:
+        if hasattr(elem, "Symbol") and elem.Symbol and elem.Symbol.Family and elem.Symbol.Family.Name:
+            return elem.Symbol.Family.Name
+    except: pass
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if p:
+            tid = p.AsElementId()
+            if tid and tid.IntegerValue > 0:
+                t = doc.GetElement(tid)
+                if t and hasattr(t, "Family") and t.Family and t.Family.Name:
+                    return t.Family.Name
+    except: pass
+    return ""
+
+# cache per MAN_TypeDescription_IT
+_EEQ_type_desc_cache = {}
+def EEQ_type_desc(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if not p: return ""
+        tid = p.AsElementId()
+        if not tid or tid.IntegerValue <= 0: return ""
+        tid_i = tid.IntegerValue
+        if tid_i in _EEQ_type_desc_cache: return _EEQ_type_desc_cache[tid_i]
+        t = doc.GetElement(tid)
+        val = ""
+        if t:
+            pp = t.LookupParameter("MAN_TypeDescription_IT")
+            if pp: val = (pp.AsString() or "") or (pp.AsValueString() or "")
+        _EEQ_type_desc_cache[tid_i] = val
+        return val
+    except:
+        return ""
+
+def EEQ_panel_name(elem):
+    # Parametro istanza "Panel Name"
+    try:
+        p = elem.LookupParameter("Panel Name")
+        if p:
+            s = p.AsString()
+            if s: return EEQ_norm_text(s)
+            vs = p.AsValueString()
+            if vs: return EEQ_norm_text(vs)
+    except: pass
+    return ""
+
+def EEQ_level_name(elem):
+    # FAMILY_LEVEL_PARAM -> Level element name
+    try:
+        p = elem.get_Parameter(BuiltInParameter.FAMILY_LEVEL_PARAM)
+        if p:
+            try:
+                lid = p.AsElementId()
+                if lid and lid.IntegerValue > 0:
+                    lv = doc.GetElement(lid)
+                    if lv and hasattr(lv, "Name") and lv.Name:
+                        return EEQ_norm_text(lv.Name)
+            except: pass
+            vs = p.AsValueString()
+            if vs: return EEQ_norm_text(vs)
+    except: pass
+    return ""
+
+# ---------------------- blocco (manens.blocks.sync) -----------------------
+def EEQ_collect(document):
+    return FilteredElementCollector(document) \
+        .OfCategory(BuiltInCategory.OST_ElectricalEquipment) \
+        .WhereElementIsNotElementType() \
+        .ToElements()
+
+def EEQ_key(e):
+    # solo Family Name che iniziano per "MAN_EEQ_PNB_SwitchBoard"
+    fam = EEQ_family_name(e) or ""
+    if not fam or not fam.startswith("MAN_EEQ_PNB_SwitchBoard"): return None
+    return (EEQ_norm_text_strong(fam), EEQ_norm_text_strong(EEQ_type_name(e) or ""),
+            EEQ_norm_text_strong(EEQ_level_name(e) or ""), EEQ_norm_text_strong(EEQ_panel_name(e) or ""))
+
+def EEQ_row(e, key):
+    fam_k, typ_k, lvl_k, pnl_k = key
+    return [EEQ_category_name(e) or "Electrical Equipment", fam_k, typ_k, EEQ_type_desc(e) or "", pnl_k, lvl_k]
+
+SPEC = sync.BlockSpec(
+    "QUADRI ELETTRICI", EEQ_SHEET_NAME, EEQ_HEADERS,
+    keys=[("Family Name", EEQ_norm_text_strong), ("Type Name", EEQ_norm_text_strong),
+          ("Level", EEQ_norm_text_strong), ("Panel Name", EEQ_norm_text_strong)],
+    collect=EEQ_collect, key=EEQ_key, row=EEQ_row,
+    fill={"MAN_TypeDescription_IT": EEQ_type_desc},
+    added=lambda r: (r[1], r[2], r[5], r[4]),  # fam, type, level, panel
+    categories=[BuiltInCategory.OST_ElectricalEquipment])
+
+def run_electrical_equipment_into_workbook(workbook):
+    sync.run(SPEC, workbook, doc)
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Blocco FLEX DUCT (Type → Diameter) degli export Revit to Excel (HVAC).
+Caricato da manens.blocks.load() solo se il blocco e' selezionato.
+"""
+import clr
+
+# Revit
+clr.AddReference("RevitAPI")
+from Autodesk.Revit.DB import FilteredElementCollector, BuiltInParameter, BuiltInCategory
+from Autodesk.Revit.DB.Mechanical import FlexDuct
+
+from manens.keys import mm_key, mm_text
+from manens.blocks import sync
+
+doc = None
+
+def bind(document):
+    """Aggancia il blocco al documento e svuota le cache dei tipi (valgono per un clic)."""
+    global doc
+    doc = document
+    _fxd_type_desc_cache.clear()
+
+
+FXD_SHEET_NAME = "Canali Flessibili"
+FXD_HEADERS = ["Category", "Type Name", "MAN_TypeDescription_IT", "Diameter"]
+
+def _fxd_u(s):
+    if s is None: return u""
+    try: return s if isinstance(s, unicode) else unicode(s)
+    except: return unicode(str(s))
+
+def _fxd_norm_text(s):
+    return _fxd_u(s).strip()
+
+def _fxd_norm_diam_key(val):
+    return mm_key(val)
+
+def _fxd_to_number_or_text(s):
+    if s is None: return ""
+    ss = _fxd_u(s).replace(",", ".").strip()
+    try:
+        return float(ss)
+    except:
+        return ss
+
+def fxd_category(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_CATEGORY_PARAM)
+        if p:
+            vs = p.AsValueString()
+            if vs: return vs
+    except: pass
+    try:
+        if elem.Category and elem.Category.Name:
+            return elem.Category.Name
+    except: pass
+    return ""
+
+def fxd_type_name(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if p:
+            s = p.AsValueString()
+            if s: return s
+            tid = p.AsElementId()
+            if tid and tid.IntegerValue > 0:
+                t = doc.GetElement(tid)
+                if t:
+                    q = t.get_Parameter(BuiltInParameter.ALL_MODEL_TYPE_NAME)
+                    if q:
+                        qs = q.AsString()
+                        if qs: return qs
+                    q2 = t.get_Parameter(BuiltInParameter.SYMBOL_NAME_PARAM)
+                    if q2:
+                        q2s = q2.AsString()
+                        if q2s: return q2s
+                    try: return t.Name or ""
+                    except: pass
+    except: pass
+    return ""
+
+_fxd_type_desc_cache = {}
+def fxd_type_desc(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if not p: return ""
+        tid = p.AsElementId()
+        if not tid or tid.IntegerValue <= 0: return ""
+        tid_i = tid.IntegerValue
+        if tid_i in _fxd_type_desc_cache: return _fxd_type_desc_cache[tid_i]
+        t = doc.GetElement(tid)
+        val = ""
+        if t:
+            pp = t.LookupParameter("MAN_TypeDescription_IT")
+            if pp: val = (pp.AsString() or "") or (pp.AsValueString() or "")
+        _fxd_type_desc_cache[tid_i] = val
+        return val
+    except:
+        return ""
+
+def _fxd_as_str_or_vs(p):
+    if not p: return ""
+    try:
+        s = p.AsString()
+        if s: return s
+    except: pass
+    try:
+        vs = p.AsValueString()
+        if vs: return vs
+    except: pass
+    return ""
+
+def fxd_diameter_key_and_disp(elem):
+    raw = None
+    try:
+        p = elem.get_Parameter(BuiltInParameter.RBS_CURVE_DIAMETER_PARAM)
+        if not p: return None, None, raw
+        vs = _fxd_as_str_or_vs(p)
+        raw = vs
+        if vs:
+            key = _fxd_norm_diam_key(vs)
+            if key:
+                return key, mm_text(key), raw
+    except:
+        pass
+    return None, None, raw
+
+# ---------------------- blocco (manens.blocks.sync) -----------------------
+def fxd_collect(document):
+    return FilteredElementCollector(document).OfClass(FlexDuct).WhereElementIsNotElementType().ToElements()
+
+def fxd_key(e):
+    dkey, ddisp, _ = fxd_diameter_key_and_disp(e)
+    if not dkey: return None
+    return (fxd_type_name(e) or "", dkey)
+
+def fxd_row(e, key):
+    dkey, ddisp, _ = fxd_diameter_key_and_disp(e)
+    return [fxd_category(e) or "Flex Ducts", key[0], fxd_type_desc(e) or "", ddisp]
+
+SPEC = sync.BlockSpec(
+    "FLEX DUCT", FXD_SHEET_NAME, FXD_HEADERS,
+    keys=[("Type Name", _fxd_norm_text), ("Diameter", _fxd_norm_diam_key)],
+    collect=fxd_collect, key=fxd_key, row=fxd_row,
+    fill={"MAN_TypeDescription_IT": fxd_type_desc},
+    cells={"Diameter": _fxd_to_number_or_text},
+    added=lambda r: (r[1], r[3]), categories=[BuiltInCategory.OST_FlexDuctCurves],
+    quantities=[(sync.LENGTH_HEADER, sync.curve_length)])
+
+def run_flexduct_into_workbook(workbook):
+    sync.run(SPEC, workbook, doc)
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Blocco GENERALE (CD / SD / Devices) degli export Revit to Excel (SPE).
+Caricato da manens.blocks.load() solo se il blocco e' selezionato.
+"""
+import clr
+
+# Revit
+clr.AddReference("RevitAPI")
+from Autodesk.Revit.DB import FilteredElementCollector, BuiltInParameter, BuiltInCategory, FamilyInstance
+
+from manens.blocks import sync
+
+doc = None
+
+def bind(document):
+    """Aggancia il blocco al documento e svuota le cache dei tipi (valgono per un clic)."""
+    global doc
+    doc = document
+    _GEN_type_desc_cache.clear()
+
+
+GEN_SHEET_NAME = "Generale"
+GEN_HEADERS = [
+    "Category",
+    "Family Name",
+    "Type Name",
+    "MAN_TypeDescription_IT",
+    "MAN_FamilyTypePrefix",
+]
+
+# ----------------------- Utils testo ------------------------
+def GEN_u(s):
+    if s is None: return u""
+    try: return s if isinstance(s, unicode) else unicode(s)
+    except: return unicode(str(s))
+
+def GEN_norm_text(s):
+    v = GEN_u(s).strip()
+    if v == u"": 
+        return v
+    # se il valore è "numeric-like" (es. 101, 101.0, 101,0) rendilo testo canonico
+    vv = v.replace(",", ".")
+    try:
+        import re
+        if re.match(r'^\d+(?:\.\d+)?$', vv):
+            f = float(vv)
+            if f.is_integer():
+                return unicode(int(f))  # "101.0" -> "101"
+            else:
+                # rimuovi zeri finali e il punto se inutili: "101.50" -> "101.5"
+                return unicode(vv.rstrip("0").rstrip("."))
+    except:
+        pass
+    return v
+
+def GEN_norm_text_strong(s):
+    # compattazione spazi + normalizzazione numerica
+    return u" ".join(GEN_norm_text(s).split())
+
+# ----------------- Lettura proprietà Revit ------------------
+def GEN_category_name(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_CATEGORY_PARAM)
+        if p:
+            vs = p.AsValueString()
+            if vs: return vs
+    except: pass
+    try:
+        if elem.Category and elem.Category.Name:
+            return elem.Category.Name
+    except: pass
+    return ""
+
+def GEN_type_name(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if p:
+            s = p.AsValueString()
+            if s: return s
+            tid = p.AsElementId()
+            if tid and tid.IntegerValue > 0:
+                t = doc.GetElement(tid)
+                if t:
+                    q = t.get_Parameter(BuiltInParameter.ALL_MODEL_TYPE_NAME)
+                    if q:
+                        qs = q.AsString()
+                        if qs: return qs
+                    q2 = t.get_Parameter(BuiltInParameter.SYMBOL_NAME_PARAM)
+                    if q2:
+                        q2s = q2.AsString()
+                        if q2s: return q2s
+                    try: return t.Name or ""
+                    except: pass
+    except: pass
+    return ""
+
+def GEN_family_name(elem):
+    try:
+        if hasattr(elem, "Symbol") and elem.Symbol and elem.Symbol.Family and elem.Symbol.Family.Name:
+            return elem.Symbol.Family.Name
+    except: pass
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if p:
+            tid = p.AsElementId()
+            if tid and tid.IntegerValue > 0:
+                t = doc.GetElement(tid)
+                if t and hasattr(t, "Family") and t.Family and t.Family.Name:
+                    return t.Family.Name
+    except: pass
+    return ""
+
+# cache descrizione di tipo
+_GEN_type_desc_cache = {}
+def GEN_type_desc(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if not p: return ""
+        tid = p.AsElementId()
+        if not tid or tid.IntegerValue <= 0: return ""
+        tid_i = tid.IntegerValue
+        if tid_i in _GEN_type_desc_cache: return _GEN_type_desc_cache[tid_i]
+        t = doc.GetElement(tid)
+        val = ""
+        if t:
+            pp = t.LookupParameter("MAN_TypeDescription_IT")
+            if pp: val = (pp.AsString() or "") or (pp.AsValueString() or "")
+        _GEN_type_desc_cache[tid_i] = val
+        return val
+    except:
+        return ""
+
+def GEN_type_param_text(elem, param_name):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if not p: return ""
+        tid = p.AsElementId()
+        if not tid or tid.IntegerValue <= 0: return ""
+        t = doc.GetElement(tid)
+        if not t: return ""
+        q = t.LookupParameter(param_name)
+        if not q: return ""
+        s = q.AsString()
+        if s: return GEN_norm_text(s)
+        vs = q.AsValueString()
+        if vs: return GEN_norm_text(vs)
+        return ""
+    except:
+        return ""
+
+# ---------------------- blocco (manens.blocks.sync) -----------------------
+GEN_CATEGORIES = (BuiltInCategory.OST_CommunicationDevices,
+                  BuiltInCategory.OST_ConduitFitting,
+                  BuiltInCategory.OST_DataDevices,
+                  BuiltInCategory.OST_ElectricalEquipment,
+                  BuiltInCategory.OST_FireAlarmDevices,
+                  BuiltInCategory.OST_NurseCallDevices,
+                  BuiltInCategory.OST_SecurityDevices)
+
+def GEN_collect(document):
+    elems = []
+    for bic in GEN_CATEGORIES:
+        elems.extend(
+            list(FilteredElementCollector(document).OfCategory(bic).WhereElementIsNotElementType().ToElements())
+        )
+    return elems
+
+def GEN_key(e):
+    if not isinstance(e, FamilyInstance): return None
+    return (GEN_norm_text_strong(GEN_family_name(e) or ""), GEN_norm_text_strong(GEN_type_name(e) or ""))
+
+def GEN_key_spe(e):
+    # filtro per elemento (anche per gli Id dell'export incrementale)
+    try: cat = e.Category.Id.IntegerValue if e.Category else None
+    except: cat = None
+    if cat == int(BuiltInCategory.OST_ElectricalEquipment):
+        # SOLO family name che iniziano con "MAN_SEQ_"
+        if not (GEN_family_name(e) or "").strip().startswith("MAN_SEQ_"): return None
+    elif cat == int(BuiltInCategory.OST_ConduitFitting):
+        # SOLO type name che CONTENGONO "ThermoCable" o "AirSampling" (case-insensitive)
+        tlow = (GEN_type_name(e) or "").lower()
+        if ("thermocable" not in tlow) and ("airsampling" not in tlow): return None
+    # tutte le altre categorie: nessun prefiltro
+    return GEN_key(e)
+
+def GEN_prefix(e):
+    return GEN_type_param_text(e, "MAN_FamilyTypePrefix")
+
+def GEN_row(e, key):
+    return [GEN_category_name(e) or "", key[0], key[1], GEN_type_desc(e) or "", GEN_prefix(e) or ""]
+
+SPEC = sync.BlockSpec(
+    "GEN", GEN_SHEET_NAME, GEN_HEADERS,
+    keys=[("Family Name", GEN_norm_text_strong), ("Type Name", GEN_norm_text_strong)],
+    collect=GEN_collect, key=GEN_key_spe, row=GEN_row,
+    fill={"MAN_TypeDescription_IT": GEN_type_desc, "MAN_FamilyTypePrefix": GEN_prefix},
+    added=lambda r: (r[1], r[2]), categories=GEN_CATEGORIES)
+
+def run_general_into_workbook(workbook):
+    sync.run(SPEC, workbook, doc)
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Blocco MECHANICAL EQUIPMENT (Apparecchiature Mec) degli export Revit to Excel (HVAC, PLU-FFS).
+Caricato da manens.blocks.load() solo se il blocco e' selezionato.
+"""
+import clr
+
+# Revit
+clr.AddReference("RevitAPI")
+from Autodesk.Revit.DB import FilteredElementCollector, BuiltInParameter, BuiltInCategory, FamilyInstance
+
+from manens.blocks import sync
+
+doc = None
+
+def bind(document):
+    """Aggancia il blocco al documento e svuota le cache dei tipi (valgono per un clic)."""
+    global doc
+    doc = document
+    _MEQ_type_desc_cache.clear()
+
+
+MEQ_SHEET_NAME = "Apparecchiature Mec"
+MEQ_HEADERS = [
+    "Category",
+    "Family Name",
+    "Type Name",
+    "MAN_TypeDescription_IT",
+    "MAN_FamilyTypePrefix",
+    "MAN_Type_Code",
+]
+
+def MEQ_u(s):
+    if s is None: return u""
+    try: return s if isinstance(s, unicode) else unicode(s)
+    except: return unicode(str(s))
+
+def MEQ_norm_text(s):
+    return MEQ_u(s).strip()
+
+def MEQ_norm_text_strong(s):
+    return u" ".join(MEQ_norm_text(s).split())
+
+def MEQ_category_name(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_CATEGORY_PARAM)
+        if p:
+            vs = p.AsValueString()
+            if vs: return vs
+    except: pass
+    try:
+        if elem.Category and elem.Category.Name:
+            return elem.Category.Name
+    except: pass
+    return ""
+
+def MEQ_type_name(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if p:
+            s = p.AsValueString()
+            if s: return s
+            tid = p.AsElementId()
+            if tid and tid.IntegerValue > 0:
+                t = doc.GetElement(tid)
+                if t:
+                    q = t.get_Parameter(BuiltInParameter.ALL_MODEL_TYPE_NAME)
+                    if q:
+                        qs = q.AsString()
+                        if qs: return qs
+                    q2 = t.get_Parameter(BuiltInParameter.SYMBOL_NAME_PARAM)
+                    if q2:
+                        q2s = q2.AsString()
+                        if q2s: return q2s
+                    try: return t.Name or ""
+                    except: pass
+    except: pass
+    return ""
+
+def MEQ_family_name(elem):
+    try:
+        if hasattr(elem, "Symbol") and elem.Symbol and elem.Symbol.Family and elem.Symbol.Family.Name:
+            return elem.Symbol.Family.Name
+    except: pass
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if p:
+            tid = p.AsElementId()
+            if tid and tid.IntegerValue > 0:
+                t = doc.GetElement(tid)
+                if t and hasattr(t, "Family") and t.Family and t.Family.Name:
+                    return t.Family.Name
+    except: pass
+    return ""
+
+_MEQ_type_desc_cache = {}
+def MEQ_type_desc(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if not p: return ""
+        tid = p.AsElementId()
+        if not tid or tid.IntegerValue <= 0: return ""
+        tid_i = tid.IntegerValue
+        if tid_i in _MEQ_type_desc_cache: return _MEQ_type_desc_cache[tid_i]
+        t = doc.GetElement(tid)
+        val = ""
+        if t:
+            pp = t.LookupParameter("MAN_TypeDescription_IT")
+            if pp: val = (pp.AsString() or "") or (pp.AsValueString() or "")
+        _MEQ_type_desc_cache[tid_i] = val
+        return val
+    except:
+        return ""
+
+def MEQ_type_param_text(elem, param_name):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if not p: return ""
+        tid = p.AsElementId()
+        if not tid or tid.IntegerValue <= 0: return ""
+        t = doc.GetElement(tid)
+        if not t: return ""
+        q = t.LookupParameter(param_name)
+        if not q: return ""
+        s = q.AsString()
+        if s: return MEQ_norm_text(s)
+        vs = q.AsValueString()
+        if vs: return MEQ_norm_text(vs)
+        return ""
+    except:
+        return ""
+    
+def MEQ_instance_param_text(elem, param_name):
+    try:
+        q = elem.LookupParameter(param_name)
+        if not q: return ""
+        s = q.AsString()
+        if s: return MEQ_norm_text(s)
+        vs = q.AsValueString()
+        if vs: return MEQ_norm_text(vs)
+        return ""
+    except:
+        return ""
+
+# ---------------------- blocco (manens.blocks.sync) -----------------------
+def MEQ_collect(document):
+    return FilteredElementCollector(document)\
+        .OfCategory(BuiltInCategory.OST_MechanicalEquipment)\
+        .WhereElementIsNotElementType()\
+        .ToElements()
+
+def MEQ_key(e):
+    if not isinstance(e, FamilyInstance): return None
+    return (MEQ_norm_text_strong(MEQ_family_name(e) or ""),
+            MEQ_norm_text_strong(MEQ_type_name(e) or ""),
+            MEQ_norm_text_strong(MEQ_instance_param_text(e, "MAN_Type_Code") or ""))
+
+def MEQ_prefix(e):
+    return MEQ_type_param_text(e, "MAN_FamilyTypePrefix")
+
+def MEQ_row(e, key):
+    return [MEQ_category_name(e) or "Mechanical Equipment", key[0], key[1],
+            MEQ_type_desc(e) or "", MEQ_prefix(e) or "", key[2]]
+
+SPEC = sync.BlockSpec(
+    "MECH EQ", MEQ_SHEET_NAME, MEQ_HEADERS,
+    keys=[("Family Name", MEQ_norm_text_strong), ("Type Name", MEQ_norm_text_strong),
+          ("MAN_Type_Code", MEQ_norm_text_strong)],
+    collect=MEQ_collect, key=MEQ_key, row=MEQ_row,
+    fill={"MAN_TypeDescription_IT": MEQ_type_desc, "MAN_FamilyTypePrefix": MEQ_prefix},
+    added=lambda r: (r[1], r[2], r[5]), categories=[BuiltInCategory.OST_MechanicalEquipment])
+
+def run_mechanical_equipment_into_workbook(workbook):
+    sync.run(SPEC, workbook, doc)
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Blocco PIPE (Type → Diameter) degli export Revit to Excel (HVAC, PLU-FFS, ELE).
+Caricato da manens.blocks.load() solo se il blocco e' selezionato.
+"""
+import clr
+
+# Revit
+clr.AddReference("RevitAPI")
+from Autodesk.Revit.DB import FilteredElementCollector, BuiltInParameter, BuiltInCategory
+from Autodesk.Revit.DB.Plumbing import Pipe
+
+from manens.keys import mm_key, mm_text
+from manens.blocks import sync
+
+doc = None
+
+def bind(document):
+    """Aggancia il blocco al documento e svuota le cache dei tipi (valgono per un clic)."""
+    global doc
+    doc = document
+    _type_desc_cache_pipe.clear()
+
+
+SHEET_NAME_PIPE = "Tubazioni"
+OUR_HEADERS_PIPE = ["Category", "Type Name", "MAN_TypeDescription_IT", "Diameter"]
+
+def _norm_text_pipe(s):
+    if s is None: return ""
+    try:
+        u = unicode(s) if not isinstance(s, unicode) else s
+    except:
+        u = str(s)
+    return u.strip()
+
+def _norm_diam_key_from_text_pipe(val):
+    return mm_key(val)
+
+def _to_number_or_text_pipe(s):
+    try:
+        if s is None: return ""
+        ss = unicode(s) if not isinstance(s, unicode) else s
+    except:
+        ss = str(s)
+    ss = ss.strip().replace(",", ".")
+    try:
+        return float(ss)
+    except:
+        return ss
+
+def category_name_ui_en_pipe(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_CATEGORY_PARAM)
+        if p:
+            vs = p.AsValueString()
+            if vs: return vs
+    except: pass
+    try:
+        if elem.Category and elem.Category.Name:
+            return elem.Category.Name
+    except: pass
+    return ""
+
+def type_name_from_instance_pipe(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if p:
+            s = p.AsValueString()
+            if s: return s
+            tid = p.AsElementId()
+            if tid and tid.IntegerValue > 0:
+                t = doc.GetElement(tid)
+                if t:
+                    q = t.get_Parameter(BuiltInParameter.ALL_MODEL_TYPE_NAME)
+                    if q:
+                        qs = q.AsString()
+                        if qs: return qs
+                    q2 = t.get_Parameter(BuiltInParameter.SYMBOL_NAME_PARAM)
+                    if q2:
+                        q2s = q2.AsString()
+                        if q2s: return q2s
+                    try: return t.Name or ""
+                    except: pass
+    except: pass
+    return ""
+
+_type_desc_cache_pipe = {}
+def man_type_description_it_from_type_pipe(elem):
+    try:
+        tid_param = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if not tid_param: return ""
+        tid = tid_param.AsElementId()
+        if not tid or tid.IntegerValue <= 0: return ""
+        tid_int = tid.IntegerValue
+        if tid_int in _type_desc_cache_pipe: return _type_desc_cache_pipe[tid_int]
+        t = doc.GetElement(tid)
+        val = ""
+        if t:
+            p = t.LookupParameter("MAN_TypeDescription_IT")
+            if p: val = (p.AsString() or "") or (p.AsValueString() or "")
+        _type_desc_cache_pipe[tid_int] = val
+        return val
+    except:
+        return ""
+
+def as_string_or_valuestring_pipe(p):
+    if not p: return ""
+    try:
+        s = p.AsString()
+        if s: return s
+    except: pass
+    try:
+        vs = p.AsValueString()
+        if vs: return vs
+    except: pass
+    return ""
+
+def diameter_key_and_display_pipe(elem):
+    raw = None
+    try:
+        p = elem.get_Parameter(BuiltInParameter.RBS_PIPE_DIAMETER_PARAM)
+        if not p: return None, None, raw
+        vs = as_string_or_valuestring_pipe(p)
+        raw = vs
+        if not vs: return None, None, raw
+        key = _norm_diam_key_from_text_pipe(vs)
+        if key:
+            return key, mm_text(key), raw
+    except: pass
+    return None, None, raw
+
+# ---------------------- blocco (manens.blocks.sync) -----------------------
+def _collect_pipe(document):
+    return FilteredElementCollector(document).OfClass(Pipe).WhereElementIsNotElementType().ToElements()
+
+def _key_pipe(p):
+    dkey, ddisp, _ = diameter_key_and_display_pipe(p)
+    if not dkey: return None
+    return (type_name_from_instance_pipe(p) or "", dkey)
+
+def _row_pipe(p, key):
+    return [category_name_ui_en_pipe(p) or "PipeCurves", key[0],
+            man_type_description_it_from_type_pipe(p) or "", mm_text(key[1])]
+
+SPEC = sync.BlockSpec(
+    "PIPE", SHEET_NAME_PIPE, OUR_HEADERS_PIPE,
+    keys=[("Type Name", _norm_text_pipe), ("Diameter", _norm_diam_key_from_text_pipe)],
+    collect=_collect_pipe, key=_key_pipe, row=_row_pipe,
+    fill={"MAN_TypeDescription_IT": man_type_description_it_from_type_pipe},
+    cells={"Diameter": _to_number_or_text_pipe},
+    added=lambda r: (r[1], r[3]), categories=[BuiltInCategory.OST_PipeCurves],
+    quantities=[(sync.LENGTH_HEADER, sync.curve_length)])
+
+def run_pipe_into_workbook(workbook):
+    sync.run(SPEC, workbook, doc)
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Blocco PIPE FITTINGS (Family/Type → MaxSize) degli export Revit to Excel (HVAC, PLU-FFS, ELE).
+Caricato da manens.blocks.load() solo se il blocco e' selezionato.
+"""
+import clr
+
+# Revit
+clr.AddReference("RevitAPI")
+from Autodesk.Revit.DB import FilteredElementCollector, BuiltInParameter, BuiltInCategory, FamilyInstance
+
+# Unit conversion (Revit 2022+ / <=2021)
+try:
+    from Autodesk.Revit.DB import UnitUtils, UnitTypeId  # 2022+
+    _HAS_UTID = True
+except:
+    from Autodesk.Revit.DB import UnitUtils, DisplayUnitType  # <=2021
+    _HAS_UTID = False
+
+from manens.keys import mm_key, mm_value
+from manens.blocks import sync
+
+doc = None
+
+def bind(document):
+    """Aggancia il blocco al documento e svuota le cache dei tipi (valgono per un clic)."""
+    global doc
+    doc = document
+    _type_desc_cache_fit.clear()
+
+
+SHEET_NAME_FIT = "Raccordi Tubi"
+OUR_HEADERS_FIT = ["Category", "Family Name", "Type Name", "MAN_TypeDescription_IT", "MAN_Fittings_MaxSize"]
+
+def _u_fit(s):
+    if s is None: return u""
+    try: return s if isinstance(s, unicode) else unicode(s)
+    except: return unicode(str(s))
+
+def _norm_text_fit(s):
+    return _u_fit(s).strip()
+
+def _norm_text_strong_fit(s):
+    return u" ".join(_norm_text_fit(s).split())
+
+def _to_float_fit(x):
+    if x is None or x == "": return 0.0
+    try: return float(x)
+    except:
+        try: return float(_u_fit(x).replace(",", ".").strip())
+        except: return 0.0
+
+def _norm_mm_key_fit(v):
+    return mm_key(v)
+
+def _category_name_fit(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_CATEGORY_PARAM)
+        if p:
+            vs = p.AsValueString()
+            if vs: return vs
+    except: pass
+    try:
+        if elem.Category and elem.Category.Name:
+            return elem.Category.Name
+    except: pass
+    return ""
+
+def _type_name_fit(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if p:
+            s = p.AsValueString()
+            if s: return s
+            tid = p.AsElementId()
+            if tid and tid.IntegerValue > 0:
+                t = doc.GetElement(tid)
+                if t:
+                    q = t.get_Parameter(BuiltInParameter.ALL_MODEL_TYPE_NAME)
+                    if q:
+                        qs = q.AsString()
+                        if qs: return qs
+                    q2 = t.get_Parameter(BuiltInParameter.SYMBOL_NAME_PARAM)
+                    if q2:
+                        q2s = q2.AsString()
+                        if q2s: return q2s
+                    try: return t.Name or ""
+                    except: pass
+    except: pass
+    return ""
+
+def _family_name_fit(elem):
+    try:
+        if hasattr(elem, "Symbol") and elem.Symbol and elem.Symbol.Family and elem.Symbol.Family.Name:
+            return elem.Symbol.Family.Name
+    except: pass
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if p:
+            tid = p.AsElementId()
+            if tid and tid.IntegerValue > 0:
+                t = doc.GetElement(tid)
+                if t and hasattr(t, "Family") and t.Family and t.Family.Name:
+                    return t.Family.Name
+    except: pass
+    return ""
+
+_type_desc_cache_fit = {}
+def _man_type_description_it_fit(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if not p: return ""
+        tid = p.AsElementId()
+        if not tid or tid.IntegerValue <= 0: return ""
+        tid_i = tid.IntegerValue
+        if tid_i in _type_desc_cache_fit: return _type_desc_cache_fit[tid_i]
+        t = doc.GetElement(tid)
+        val = ""
+        if t:
+            pp = t.LookupParameter("MAN_TypeDescription_IT")
+            if pp: val = (pp.AsString() or "") or (pp.AsValueString() or "")
+        _type_desc_cache_fit[tid_i] = val
+        return val
+    except:
+        return ""
+
+def _feet_to_mm_fit(val_ft):
+    try:
+        if _HAS_UTID:
+            return float(UnitUtils.ConvertFromInternalUnits(float(val_ft), UnitTypeId.Millimeters))
+        else:
+            return float(UnitUtils.ConvertFromInternalUnits(float(val_ft), DisplayUnitType.DUT_MILLIMETERS))
+    except:
+        try: return float(val_ft) * 304.8
+        except: return 0.0
+
+def _maxsize_mm_fit(elem):
+    try:
+        p = elem.LookupParameter("MAN_Fittings_MaxSize")
+        if not p: return 0.0
+        d_ft = None
+        try:
+            d_ft = p.AsDouble()
+        except:
+            s = (p.AsString() or p.AsValueString() or "").replace(",", ".").strip()
+            if not s: return 0.0
+            try: d_ft = float(s)
+            except: return 0.0
+        return _feet_to_mm_fit(d_ft)
+    except:
+        return 0.0
+
+# ---------------------- blocco (manens.blocks.sync) -----------------------
+def _collect_fit(document):
+    return FilteredElementCollector(document)\
+        .OfCategory(BuiltInCategory.OST_PipeFitting)\
+        .WhereElementIsNotElementType()\
+        .ToElements()
+
+def _key_fit(e):
+    if not isinstance(e, FamilyInstance): return None
+    return (_norm_text_strong_fit(_family_name_fit(e) or ""),
+            _norm_text_strong_fit(_type_name_fit(e) or ""),
+            _norm_mm_key_fit(_maxsize_mm_fit(e)))
+
+def _row_fit(e, key):
+    return [_category_name_fit(e) or "Pipe Fittings", key[0], key[1],
+            _man_type_description_it_fit(e) or "", mm_value(key[2])]
+
+SPEC = sync.BlockSpec(
+    "FITTINGS", SHEET_NAME_FIT, OUR_HEADERS_FIT,
+    keys=[("Family Name", _norm_text_strong_fit), ("Type Name", _norm_text_strong_fit),
+          ("MAN_Fittings_MaxSize", lambda v: _norm_mm_key_fit(_to_float_fit(v)))],
+    collect=_collect_fit, key=_key_fit, row=_row_fit,
+    fill={"MAN_TypeDescription_IT": _man_type_description_it_fit},
+    added=lambda r: (r[1], r[2], round(float(r[4]), 3)),
+    removed=lambda k: (k[0], k[1], mm_value(k[2])), categories=[BuiltInCategory.OST_PipeFitting])
+
+def run_fittings_into_workbook(workbook):
+    sync.run(SPEC, workbook, doc)
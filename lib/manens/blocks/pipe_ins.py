@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+Blocco PIPE INSULATIONS (solo Pipe host) degli export Revit to Excel (HVAC, PLU-FFS).
+Caricato da manens.blocks.load() solo se il blocco e' selezionato.
+"""
+import clr, re
+
+# Revit
+clr.AddReference("RevitAPI")
+from Autodesk.Revit.DB import FilteredElementCollector, BuiltInParameter, BuiltInCategory
+from Autodesk.Revit.DB.Plumbing import Pipe, PipeInsulation
+
+from manens.keys import mm_key, mm_text
+from manens.blocks import sync
+
+doc = None
+
+def bind(document):
+    """Aggancia il blocco al documento e svuota le cache dei tipi (valgono per un clic)."""
+    global doc
+    doc = document
+    _type_desc_cache_ins.clear()
+
+
+SHEET_NAME_INS = "Isolante Tubazioni"
+OUR_HEADERS_INS = ["Category", "Type Name", "MAN_TypeDescription_IT", "Insulation Thickness", "Pipe Size"]
+FEET_TO_MM_INS = 304.8
+
+def _norm_text_ins(s):
+    if s is None: return ""
+    try:
+        u = unicode(s) if not isinstance(s, unicode) else s
+    except:
+        u = str(s)
+    return u.strip()
+
+def _fmt_mm_ins(x):
+    s = ("%.3f" % float(x)).rstrip("0").rstrip(".")
+    return s if s else "0"
+
+def _strip_phi_ins(s):
+    if s is None: return ""
+    try:
+        u = unicode(s) if not isinstance(s, unicode) else s
+    except:
+        u = str(s)
+    u = u.strip()
+    u = re.sub(u"[ \t]*(?:[ΦφØø⌀])$", "", u)
+    u = re.sub(u"^(?:[ΦφØø⌀])[ \t]*", "", u)
+    return u.strip()
+
+def _number_from_text_ins(s):
+    return mm_key(s)
+
+def _to_number_or_text_for_thickness_ins(s):
+    if s is None: return ""
+    try:
+        ss = unicode(s) if not isinstance(s, unicode) else s
+    except:
+        ss = str(s)
+    ss = ss.replace(",", ".").strip()
+    try:
+        return float(ss)
+    except:
+        return ss
+
+def category_name_ui_en_ins(elem):
+    try:
+        if elem.Category and elem.Category.Name:
+            return elem.Category.Name
+    except: pass
+    return ""
+
+def type_name_from_instance_ins(elem):
+    try:
+        p = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if p:
+            s = p.AsValueString()
+            if s: return s
+            tid = p.AsElementId()
+            if tid and tid.IntegerValue > 0:
+                t = doc.GetElement(tid)
+                if t:
+                    q = t.get_Parameter(BuiltInParameter.ALL_MODEL_TYPE_NAME)
+                    if q:
+                        qs = q.AsString()
+                        if qs: return qs
+                    q2 = t.get_Parameter(BuiltInParameter.SYMBOL_NAME_PARAM)
+                    if q2:
+                        q2s = q2.AsString()
+                        if q2s: return q2s
+                    try: return t.Name or ""
+                    except: pass
+    except: pass
+    return ""
+
+_type_desc_cache_ins = {}
+def man_type_description_it_from_type_ins(elem):
+    try:
+        tid_param = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        if not tid_param: return ""
+        tid = tid_param.AsElementId()
+        if not tid or tid.IntegerValue <= 0: return ""
+        tid_int = tid.IntegerValue
+        if tid_int in _type_desc_cache_ins: return _type_desc_cache_ins[tid_int]
+        t = doc.GetElement(tid)
+        val = ""
+        if t:
+            p = t.LookupParameter("MAN_TypeDescription_IT")
+            if p: val = (p.AsString() or "") or (p.AsValueString() or "")
+        _type_desc_cache_ins[tid_int] = val
+        return val
+    except:
+        return ""
+
+def as_string_or_valuestring_ins(p):
+    if not p: return ""
+    try:
+        s = p.AsString()
+        if s: return s
+    except: pass
+    try:
+        vs = p.AsValueString()
+        if vs: return vs
+    except: pass
+    return ""
+
+def is_pipe_hosted_ins(ins_elem):
+    try:
+        hid = ins_elem.HostElementId
+        if hid and hid.IntegerValue > 0:
+            host = doc.GetElement(hid)
+            return isinstance(host, Pipe)
+    except: pass
+    return False
+
+def thickness_and_size_ins(elem):
+    thick_key = 0; thick_disp = ""
+    size_key = 0; size_disp = ""
+    try:
+        pth = elem.get_Parameter(BuiltInParameter.RBS_INSULATION_THICKNESS_FOR_PIPE)
+        if pth:
+            try:
+                d_ft = pth.AsDouble()
+                if d_ft is not None:
+                    d_mm = d_ft * FEET_TO_MM_INS
+                    thick_key  = mm_key(d_mm)
+                    thick_disp = _fmt_mm_ins(d_mm)
+            except:
+                disp = as_string_or_valuestring_ins(pth)
+                thick_key  = _number_from_text_ins(disp)
+                thick_disp = mm_text(thick_key)
+    except: pass
+    try:
+        psz = elem.get_Parameter(BuiltInParameter.RBS_PIPE_CALCULATED_SIZE)
+        if psz:
+            raw = as_string_or_valuestring_ins(psz)
+            size_disp = _strip_phi_ins(raw)
+            size_key  = _number_from_text_ins(size_disp)
+    except: pass
+    return thick_key, thick_disp, size_key, size_disp
+
+# ---------------------- blocco (manens.blocks.sync) -----------------------
+def _collect_ins(document):
+    return FilteredElementCollector(document).OfClass(PipeInsulation).WhereElementIsNotElementType().ToElements()
+
+def _key_ins(ins):
+    if not is_pipe_hosted_ins(ins): return None
+    th_key, th_disp, sz_key, sz_disp = thickness_and_size_ins(ins)
+    if not th_key and not sz_key: return None
+    return (type_name_from_instance_ins(ins) or "", th_key, sz_key)
+
+def _row_ins(ins, key):
+    th_key, th_disp, sz_key, sz_disp = thickness_and_size_ins(ins)
+    return [category_name_ui_en_ins(ins) or "Pipe Insulations", key[0],
+            man_type_description_it_from_type_ins(ins) or "", th_disp or "", sz_disp or ""]
+
+SPEC = sync.BlockSpec(
+    "INS", SHEET_NAME_INS, OUR_HEADERS_INS,
+    keys=[("Type Name", _norm_text_ins),
+          ("Insulation Thickness", _number_from_text_ins),
+          ("Pipe Size", lambda s: _number_from_text_ins(_strip_phi_ins(s)))],
+    collect=_collect_ins, key=_key_ins, row=_row_ins,
+    fill={"MAN_TypeDescription_IT": man_type_description_it_from_type_ins},
+    cells={"Insulation Thickness": _to_number_or_text_for_thickness_ins, "Pipe Size": _strip_phi_ins},
+    added=lambda r: (r[1], r[3], r[4]), categories=[BuiltInCategory.OST_PipeInsulations],
+    quantities=[(sync.LENGTH_HEADER, sync.curve_length)])
+
+def run_ins_into_workbook(workbook):
+    sync.run(SPEC, workbook, doc)
@@ -0,0 +1,844 @@
+# -*- coding: utf-8 -*-
+"""
+Motore unico dei blocchi Revit -> Excel.
+
+Ogni blocco di manens.blocks si descrive con un BlockSpec (foglio, colonne,
+chiave, lettura degli elementi) e chiama run(SPEC, workbook, doc). Il resto e'
+uguale per tutte le discipline e sta qui, una volta sola:
+
+  extract   un gruppo per spec.key(elem), riga dal primo elemento (spec.row);
+            i campi di spec.fill vuoti si completano con gli elementi successivi.
+            Chiave, riga e campi letti restano in manens.snapshot: al clic
+            successivo si rileggono solo gli elementi nuovi o modificati.
+            Con manens.dirty attivo e spec.categories il blocco non raccoglie
+            nemmeno la categoria: rilegge gli Id cambiati dall'ultimo export e
+            riprende gli altri dallo snapshot
+  group     righe ordinate per chiave normalizzata (numeri prima del testo), con
+            il numero di istanze; con MANENS_SIDECAR anche in un file CSV /
+            Parquet accanto al workbook (manens.sidecar)
+  quantita' con MANENS_QUANTITIES=1 (o sync.QUANTITIES = True) colonne nostre in
+            piu' in coda: istanze (COUNT_HEADER) e somme di spec.quantities (es.
+            lunghezza in metri di tubi, canali, passerelle, isolanti), sommate nello
+            stesso giro del raggruppamento e tenute nello snapshot. Tolta
+            l'opzione le colonne restano nel foglio ma non vengono piu' aggiornate
+  read      riga di intestazione in una lettura; colonne nostre a blocchi di
+            CHUNK righe (una lettura per blocco) fino all'ultima riga piena delle
+            colonne chiave o a EMPTY_RUN righe senza chiave
+  index     chiave -> riga dal foglio nascosto INDEX_SHEET (chiave normalizzata
+            di ogni riga) se il controllo delle celle chiave torna; altrimenti
+            si rinormalizzano le colonne chiave lette
+  diff      chiave -> riga esistente; si riscrivono solo le celle diverse
+  write     celle cambiate, una scrittura per colonna e run di righe consecutive
+  delete    righe non piu' nel modello, una Delete per run, dal basso; oltre
+            COMPACT_RUNS run le righe da eliminare vanno in fondo con un sort
+            stabile su una colonna di appoggio e si eliminano con una Delete
+  merge     se le righe rimaste sono gia' in ordine (dopo un export lo sono) le
+            righe nuove entrano al loro posto: una Insert e una scrittura per
+            punto di inserimento, dal basso; senza righe nuove non si ordina nulla
+  append    altrimenti righe nuove in una scrittura (per colonna se le colonne non
+            sono contigue), subito sotto i dati rimasti, e
+  sort      ordinamento Excel della regione (tutte le colonne) sulle colonne chiave;
+            anche con piu' di MERGE_MAX punti di inserimento o righe con chiave
+            oltre la fine dei dati letti
+  meta      impronta delle righe del modello nel foglio nascosto META_SHEET;
+            chiavi e controllo del foglio dopo l'export in INDEX_SHEET, calcolati
+            senza rileggerlo (ordine del sort di Excel secondo manens.collate: se
+            Excel ordina in altro modo il controllo non torna e l'indice si
+            ricostruisce al clic dopo)
+  changelog righe aggiunte, eliminate e celle cambiate dal diff nel foglio
+            CHANGELOG_SHEET (blocco, chiave, azione, colonna, valore precedente e
+            nuovo, data e ora), accodate nell'esecuzione e scritte in una volta da
+            flush_changelog dopo l'ultimo blocco; il foglio tiene solo l'ultima
+            esecuzione. MANENS_CHANGELOG=0 (o sync.CHANGELOG = False) lo spegne
+
+Impronta: hash delle righe del modello (chiave e valori delle celle) e delle
+intestazioni, una per foglio. Se al clic successivo l'impronta e' quella
+dell'ultimo export di quel foglio e il foglio ha ancora le intestazioni e il
+numero di righe dati registrati in META_SHEET (sheet_intact: una lettura e una
+End(xlUp) per colonna chiave), il blocco non legge e non scrive il foglio:
+una riesportazione dopo poche modifiche tocca solo i fogli che cambiano. Il
+foglio conta una sola impronta, quindi due blocchi sullo stesso foglio (GEN
+di HVAC e PLU-FFS) si invalidano a vicenda. Righe eliminate o aggiunte a mano
+fanno rifare la sincronizzazione; modifiche a mano alle celle delle colonne
+nostre non cambiano ne' l'impronta ne' il conteggio: MANENS_FULL_SYNC=1 (o sync.FULL = True) forza
+la sincronizzazione completa.
+
+Chiave: spec.keys = [(intestazione, normalizzatore)]. Lo stesso normalizzatore
+si applica al testo della cella e al valore della riga, quindi "50", 50.0 e
+"Φ50" finiscono sulla stessa riga se il normalizzatore e' mm_key.
+"""
+import bisect
+import copy
+import hashlib
+import os
+import time
+
+import clr
+from System import Array, Object
+from System.Runtime.InteropServices import Marshal
+
+# Excel Interop
+clr.AddReference("Microsoft.Office.Interop.Excel")
+from Microsoft.Office.Interop import Excel
+
+from Autodesk.Revit.DB import BuiltInParameter, ElementId
+
+from manens import collate, dirty, report, sidecar, snapshot, timing
+
+HEADER_ROW = 3      # riga delle intestazioni
+FIRST_ROW = 5       # prima riga dati
+EMPTY_RUN = 20      # righe consecutive senza chiave = fine dei dati
+CHUNK = 2000        # righe per lettura
+SPAN_GAP = 8        # colonne non nostre tollerate in una lettura unica
+MERGE_MAX = 16      # punti di inserimento oltre i quali conviene il sort di Excel
+COMPACT_RUNS = 16   # run di righe da eliminare oltre i quali conviene compattare
+
+META_SHEET = u"_MAN_Meta"   # foglio nascosto: foglio | impronta | blocco | indice | controllo | righe
+INDEX_SHEET = u"_MAN_Index" # foglio nascosto: una colonna per foglio, chiave normalizzata per riga dati
+META_VERSION = 1            # cambia se cambia il modo di scrivere i fogli
+FULL = None                 # None = variabile d'ambiente MANENS_FULL_SYNC
+QUANTITIES = None           # None = variabile d'ambiente MANENS_QUANTITIES
+CHANGELOG = None            # None = variabile d'ambiente MANENS_CHANGELOG (attivo se non e' 0)
+CHANGELOG_SHEET = u"Registro modifiche"
+CHANGELOG_HEADERS = [u"Blocco", u"Chiave", u"Azione", u"Colonna", u"Valore precedente", u"Valore nuovo", u"Data e ora"]
+LENGTH_HEADER = u"Length (m)"
+
+try:
+    _text_types = (str, unicode)
+    _int_types = (int, long)
+except NameError:
+    _text_types = (str,)
+    _int_types = (int,)
+    unicode = str
+
+
+class BlockSpec(object):
+    """Descrizione dichiarativa di un blocco di export.
+
+    name      nome del blocco (manens.timing, report, job dell'export batch)
+    sheet     nome del foglio
+    headers   intestazioni nostre, nell'ordine dei valori di row()
+    keys      [(intestazione, normalizzatore)]: colonne chiave e di ordinamento
+    collect   collect(doc) -> elementi
+    key       key(elem) -> chiave di raggruppamento; None = elemento scartato
+    row       row(elem, key) -> valori del gruppo (uno per intestazione)
+    fill      {intestazione: funzione(elem)}: campi vuoti da completare con gli
+              elementi successivi dello stesso gruppo
+    cells     {intestazione: funzione(valore)}: valore da scrivere nella cella
+    added     formato delle righe aggiunte nel report
+    removed   formato delle chiavi eliminate nel report
+    categories  BuiltInCategory raccolte da collect (export incrementale con
+              manens.dirty); None = sempre collect
+    quantities  [(intestazione, funzione(elem) -> numero)]: somme per riga, colonne
+              in coda con MANENS_QUANTITIES (dopo quella delle istanze)
+    """
+    def __init__(self, name, sheet, headers, keys, collect, key, row,
+                 fill=None, cells=None, added=None, removed=None, categories=None, quantities=None):
+        self.name = name
+        self.sheet = sheet
+        self.headers = list(headers)
+        self.keys = list(keys)
+        self.collect = collect
+        self.key = key
+        self.row = row
+        self.fill = [(self.headers.index(h), fn) for h, fn in (fill or {}).items()]
+        self.cells = [(cells or {}).get(h) for h in self.headers]
+        self.added = added
+        self.removed = removed
+        self.key_index = [self.headers.index(h) for h, n in self.keys]
+        self.categories = list(categories) if categories else None
+        self.quantities = list(quantities or [])
+
+    def with_quantities(self):
+        """Copia del blocco con le colonne delle quantita' in coda (istanze, poi spec.quantities)."""
+        spec = copy.copy(self)
+        extra = [sidecar.COUNT_HEADER] + [h for h, fn in self.quantities]
+        spec.headers = self.headers + extra
+        spec.cells = self.cells + [None] * len(extra)
+        return spec
+
+
+# ------------------------- valori --------------------------
+def _text(v):
+    """Valore di cella -> testo senza spazi ai lati ("" se vuota)."""
+    if v is None: return u""
+    try: return (v if isinstance(v, unicode) else unicode(v)).strip()
+    except: return unicode(str(v)).strip()
+
+def _is_num(v):
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+def _same(old, new):
+    """Cella gia' uguale al valore da scrivere (stesso tipo: numero o testo)?"""
+    if old is None or old == u"": return new is None or new == u""
+    if _is_num(old) and _is_num(new): return float(old) == float(new)
+    if isinstance(old, _text_types) and isinstance(new, _text_types): return old == new
+    return False
+
+def _order(key):
+    """Ordine delle righe: None, numeri, tuple (es. W x H), testo (come gli script IronPython)."""
+    out = []
+    for k in key:
+        if k is None: out.append((0, 0))
+        elif _is_num(k): out.append((1, k))
+        elif isinstance(k, tuple): out.append((2, k))
+        else: out.append((3, k))
+    return tuple(out)
+
+def full_sync():
+    """Sincronizzazione completa anche se l'impronta non e' cambiata?"""
+    if FULL is not None: return bool(FULL)
+    return (os.environ.get("MANENS_FULL_SYNC") or "").strip().lower() in ("1", "true", "yes", "si")
+
+def quantities_on():
+    """Colonne delle quantita' (istanze, lunghezze) nei fogli?"""
+    if QUANTITIES is not None: return bool(QUANTITIES)
+    return (os.environ.get("MANENS_QUANTITIES") or "").strip().lower() in ("1", "true", "yes", "si")
+
+def changelog_on():
+    """Registro delle modifiche dell'export nel foglio CHANGELOG_SHEET?"""
+    if CHANGELOG is not None: return bool(CHANGELOG)
+    return (os.environ.get("MANENS_CHANGELOG") or "").strip().lower() not in ("0", "false", "no")
+
+def curve_length(e):
+    """CURVE_ELEM_LENGTH in metri (0 se manca): tubi, canali, passerelle, isolanti."""
+    try:
+        p = e.get_Parameter(BuiltInParameter.CURVE_ELEM_LENGTH)
+        return p.AsDouble() * 0.3048 if p is not None else 0.0
+    except:
+        return 0.0
+
+def fingerprint(spec, rows):
+    """Impronta delle righe ordinate [(chiave, valori, celle, istanze)] del blocco."""
+    h = hashlib.sha1()
+    h.update(repr((META_VERSION, spec.name, spec.sheet, spec.headers)).encode("utf-8"))
+    for key, vals, cells, count in rows:
+        h.update(repr((key, cells)).encode("utf-8"))
+    return h.hexdigest()
+
+def _int(v):
+    try: return int(float(v))
+    except: return 0
+
+def _cell(v):
+    """Valore scritto -> valore riletto da Excel (i numeri tornano double)."""
+    return float(v) if _is_num(v) else v
+
+def _excel_order(cells):
+    """Ordine del sort di Excel sulle celle: numeri, testo (manens.collate), vuote in fondo."""
+    out = []
+    for v in cells:
+        if v is None or v == u"": out.append((2, 0))
+        elif _is_num(v): out.append((0, float(v)))
+        else: out.append((1, collate.key(_text(v))))
+    return tuple(out)
+
+_KEY_SEP = u"\u241f"
+
+def _part(k):
+    if k is None: return u"n"
+    if isinstance(k, bool): return u"b%d" % k
+    if isinstance(k, _int_types): return u"i%d" % k
+    if isinstance(k, float): return u"f" + repr(k)
+    if isinstance(k, tuple): return u"(" + u",".join([_part(x) for x in k]) + u")"
+    return u"t" + (k if isinstance(k, unicode) else _text(k))
+
+def key_text(key):
+    """Chiave normalizzata -> testo della cella del foglio indice (u"" = riga senza chiave)."""
+    if not any(key): return u""
+    return _KEY_SEP.join([_part(k) for k in key])
+
+def row_key(spec, vals):
+    """Chiave normalizzata di una riga del foglio (valori delle colonne nostre)."""
+    return tuple(n(_text(vals[j])) for (h, n), j in zip(spec.keys, spec.key_index))
+
+def key_check(spec, values, texts):
+    """Controllo di celle chiave e testi dell'indice, riga per riga."""
+    h = hashlib.md5(u"{}".format(len(values)).encode("utf-8"))
+    kpos = spec.key_index
+    for vals, t in zip(values, texts):
+        h.update((u"\x1e".join([_text(vals[j]) for j in kpos]) + u"\x1d" + t + u"\x1c").encode("utf-8"))
+    return h.hexdigest()
+
+def final_index(spec, values, texts, changes, deleted, appends):
+    """Chiavi (testo) e controllo del foglio dopo write, delete, append e sort, senza rileggerlo."""
+    kpos = spec.key_index
+    kchg = [changes[j] for j in kpos if changes.get(j)]
+    rows = []
+    for i, vals in enumerate(values):
+        r = FIRST_ROW + i
+        if r in deleted: continue
+        t = texts[i]
+        if any(r in c for c in kchg):
+            vals = list(vals)
+            for j in kpos:
+                if r in changes.get(j, ()): vals[j] = _cell(changes[j][r])
+            t = None
+        rows.append((vals, t))
+    for cells in appends:
+        rows.append(([_cell(v) for v in cells], None))
+    rows = [(vals, t) for vals, t in rows if any(_text(vals[j]) for j in kpos)]
+    rows.sort(key=lambda x: _excel_order([x[0][j] for j in kpos]))
+    values = [vals for vals, t in rows]
+    texts = [key_text(row_key(spec, vals)) if t is None else t for vals, t in rows]
+    return texts, key_check(spec, values, texts)
+
+def _runs(rows):
+    """[righe crescenti] -> [(prima, ultima)] di righe consecutive."""
+    out = []
+    for r in rows:
+        if out and r == out[-1][1] + 1: out[-1][1] = r
+        else: out.append([r, r])
+    return [(a, b) for a, b in out]
+
+
+# ------------------------- Excel ---------------------------
+def _matrix(data, n_rows, n_cols):
+    """Value2 di un Range -> lista di righe di n_cols valori (array .NET base 0 o 1)."""
+    if n_rows == 1 and n_cols == 1 and not hasattr(data, "GetLowerBound"):
+        return [[data]]
+    lo0 = data.GetLowerBound(0); lo1 = data.GetLowerBound(1)
+    return [[data[lo0 + i, lo1 + j] for j in range(n_cols)] for i in range(n_rows)]
+
+def _array(rows, n_cols):
+    data = Array.CreateInstance(Object, len(rows), n_cols)
+    for i, r in enumerate(rows):
+        for j in range(n_cols):
+            data[i, j] = r[j]
+    return data
+
+def _range(sheet, r0, c0, r1, c1):
+    return sheet.Range[sheet.Cells(r0, c0), sheet.Cells(r1, c1)]
+
+def _sheet(workbook, name):
+    try:
+        return workbook.Worksheets.Item[name]
+    except:
+        sh = workbook.Worksheets.Add()
+        sh.Name = name
+        return sh
+
+def _last_col(sheet):
+    return sheet.Cells(HEADER_ROW, sheet.Columns.Count).End(Excel.XlDirection.xlToLeft).Column
+
+def _last_row(sheet, cols):
+    """Ultima riga con un valore in una delle colonne (una End(xlUp) per colonna)."""
+    last = 0
+    for col in cols:
+        lr = sheet.Cells(sheet.Rows.Count, col).End(Excel.XlDirection.xlUp).Row
+        if lr > last: last = lr
+    return last
+
+def _read_headers(sheet):
+    """({intestazione: colonna}, ultima colonna) dalla riga di intestazione, in una lettura."""
+    last_col = max(1, _last_col(sheet))
+    row = _matrix(_range(sheet, HEADER_ROW, 1, HEADER_ROW, last_col).Value2, 1, last_col)[0]
+    headers = {}
+    for c, v in enumerate(row):
+        if isinstance(v, _text_types):
+            nm = v.strip()
+            if nm: headers[nm] = c + 1
+    return headers, last_col
+
+def ensure_headers(sheet, spec):
+    """{intestazione: colonna}; le intestazioni nostre mancanti vanno in coda."""
+    headers, last_col = _read_headers(sheet)
+    missing = [h for h in spec.headers if h not in headers]
+    if missing:
+        c0 = last_col + 1
+        _range(sheet, HEADER_ROW, c0, HEADER_ROW, c0 + len(missing) - 1).Value2 = _array([missing], len(missing))
+        for i, h in enumerate(missing): headers[h] = c0 + i
+    return headers
+
+def _read_rows(sheet, cols, r0, r1):
+    """Valori delle colonne `cols` nelle righe r0..r1: una lettura se le colonne sono vicine."""
+    n = r1 - r0 + 1
+    lo = min(cols); hi = max(cols)
+    if hi - lo + 1 <= len(cols) + SPAN_GAP:
+        grid = _matrix(_range(sheet, r0, lo, r1, hi).Value2, n, hi - lo + 1)
+        return [[g[c - lo] for c in cols] for g in grid]
+    per_col = [[g[0] for g in _matrix(_range(sheet, r0, c, r1, c).Value2, n, 1)] for c in cols]
+    return [[col[i] for col in per_col] for i in range(n)]
+
+def read_table(sheet, spec, headers):
+    """Righe esistenti: (valori delle colonne nostre per riga, ultima riga dati, righe oltre).
+
+    Legge a blocchi di CHUNK righe da FIRST_ROW fino all'ultima riga piena delle
+    colonne chiave (End(xlUp)) e si ferma prima dopo EMPTY_RUN righe con le colonne
+    chiave vuote; righe oltre = celle chiave piene dopo l'ultima riga dati."""
+    cols = [headers[h] for h in spec.headers]
+    kpos = spec.key_index
+    max_rows = _last_row(sheet, [cols[j] for j in kpos])
+    values = []
+    last = FIRST_ROW - 1
+    empty = 0
+    r = FIRST_ROW
+    while r <= max_rows and empty < EMPTY_RUN:
+        r1 = min(max_rows, r + CHUNK - 1)
+        for vals in _read_rows(sheet, cols, r, r1):
+            if any(_text(vals[j]) for j in kpos):
+                last = r; empty = 0
+            else:
+                empty += 1
+                if empty >= EMPTY_RUN: break
+            values.append(vals)
+            r += 1
+    return values[:last - FIRST_ROW + 1], last, max_rows > last
+
+def key_texts(spec, values):
+    """Chiave (testo) di ogni riga letta: ricostruzione completa dell'indice."""
+    return [key_text(row_key(spec, vals)) for vals in values]
+
+def write_cells(sheet, headers, spec, changes):
+    """changes = {j: {riga: valore}} -> una scrittura per colonna e run di righe."""
+    for j in sorted(changes):
+        col = headers[spec.headers[j]]
+        by_row = changes[j]
+        for a, b in _runs(sorted(by_row)):
+            _range(sheet, a, col, b, col).Value2 = _array([[by_row[r]] for r in range(a, b + 1)], 1)
+
+def _free_col(sheet):
+    """Prima colonna a destra dell'area usata del foglio."""
+    used = sheet.UsedRange
+    return used.Column + used.Columns.Count
+
+def compact_rows(sheet, rows, last):
+    """Righe da eliminare in fondo alla regione FIRST_ROW..last, poi una sola Delete.
+
+    Una colonna di appoggio (0 = resta, 1 = eliminata) e un sort stabile su di
+    essa: come sort_region sposta righe intere con formati e colonne non nostre,
+    senza riscriverne le celle. False (niente di fatto) se non si puo'."""
+    col = _free_col(sheet)
+    if col > sheet.Columns.Count: return False
+    gone = set(rows)
+    keep = last - FIRST_ROW + 1 - len(gone)
+    try:
+        _range(sheet, FIRST_ROW, col, last, col).Value2 = \
+            _array([[1 if r in gone else 0] for r in range(FIRST_ROW, last + 1)], 1)
+        _apply_sort(sheet, FIRST_ROW, last, col, [col])
+    except Exception as ex:
+        print("[SYNC] Compattazione non riuscita, eliminazione per run: {}".format(ex))
+        try: _range(sheet, FIRST_ROW, col, last, col).ClearContents()
+        except: pass
+        return False
+    sheet.Range[sheet.Rows[FIRST_ROW + keep], sheet.Rows[last]].EntireRow.Delete()
+    if keep: _range(sheet, FIRST_ROW, col, FIRST_ROW + keep - 1, col).ClearContents()
+    return True
+
+def delete_rows(sheet, rows, last=None):
+    """Elimina le righe: una Delete per run di righe consecutive, dal basso, o
+    compact_rows se i run sono piu' di COMPACT_RUNS (last = ultima riga dati)."""
+    runs = _runs(sorted(rows))
+    if last is not None and len(runs) > COMPACT_RUNS and compact_rows(sheet, rows, last):
+        return len(rows)
+    for a, b in reversed(runs):
+        sheet.Range[sheet.Rows[a], sheet.Rows[b]].EntireRow.Delete()
+    return len(rows)
+
+def append_rows(sheet, headers, spec, start_row, rows):
+    if not rows: return 0
+    cols = [headers[h] for h in spec.headers]
+    n = len(rows)
+    if max(cols) - min(cols) + 1 == len(cols):
+        order = sorted(range(len(cols)), key=lambda j: cols[j])
+        _range(sheet, start_row, min(cols), start_row + n - 1, max(cols)).Value2 = \
+            _array([[r[j] for j in order] for r in rows], len(cols))
+    else:
+        for j, col in enumerate(cols):
+            _range(sheet, start_row, col, start_row + n - 1, col).Value2 = _array([[r[j]] for r in rows], 1)
+    return n
+
+def merge_plan(spec, values, changes, deleted, appends):
+    """Righe nuove nella regione gia' ordinata: [(riga, [righe])] dal basso.
+
+    None se le righe rimaste (celle chiave dopo le scritture) non sono
+    nell'ordine del sort di Excel o se i punti di inserimento sono piu' di
+    MERGE_MAX: allora append in fondo e sort_region."""
+    kpos = spec.key_index
+    keys = []
+    for i, vals in enumerate(values):
+        r = FIRST_ROW + i
+        if r in deleted: continue
+        k = _excel_order([_cell(changes[j][r]) if r in changes.get(j, ()) else vals[j] for j in kpos])
+        if keys and k < keys[-1]: return None
+        keys.append(k)
+    new = sorted([(_excel_order([_cell(cells[j]) for j in kpos]), cells) for cells in appends],
+                 key=lambda x: x[0])
+    groups = []
+    for k, cells in new:
+        pos = bisect.bisect_right(keys, k)
+        if groups and groups[-1][0] == pos: groups[-1][1].append(cells)
+        else: groups.append((pos, [cells]))
+    if len([g for g in groups if g[0] < len(keys)]) > MERGE_MAX: return None
+    return [(FIRST_ROW + pos, rows) for pos, rows in reversed(groups)]
+
+def insert_rows(sheet, headers, spec, plan, end_row):
+    """Righe nuove di merge_plan: sotto i dati in una scrittura, sopra con Insert + scrittura."""
+    n = 0
+    for r, rows in plan:
+        if r < end_row:
+            sheet.Range[sheet.Rows[r], sheet.Rows[r + len(rows) - 1]].EntireRow.Insert()
+        n += append_rows(sheet, headers, spec, r, rows)
+    return n
+
+def sort_region(sheet, headers, spec):
+    """Ordinamento Excel delle righe dati (tutte le colonne) sulle colonne chiave."""
+    kcols = [headers[h] for h, n in spec.keys]
+    last_row = _last_row(sheet, kcols)
+    if last_row < FIRST_ROW: return
+    _apply_sort(sheet, FIRST_ROW, last_row, _last_col(sheet), kcols)
+
+def _apply_sort(sheet, r0, r1, c1, kcols):
+    """Sort di Excel delle righe r0..r1 (colonne 1..c1) sulle colonne kcols, crescente."""
+    sort = sheet.Sort
+    sort.SortFields.Clear()
+    for col in kcols:
+        sort.SortFields.Add(Key=sheet.Range(sheet.Cells(r0, col), sheet.Cells(r1, col)),
+                            SortOn=Excel.XlSortOn.xlSortOnValues, Order=Excel.XlSortOrder.xlAscending,
+                            DataOption=Excel.XlSortDataOption.xlSortNormal)
+    sort.SetRange(sheet.Range(sheet.Cells(r0, 1), sheet.Cells(r1, c1)))
+    sort.Header = Excel.XlYesNoGuess.xlNo
+    sort.MatchCase = False
+    sort.Orientation = Excel.XlSortOrientation.xlSortColumns
+    sort.Apply()
+
+
+def _meta_sheet(workbook, create=False):
+    try:
+        return workbook.Worksheets.Item[META_SHEET]
+    except:
+        if not create: return None
+    sh = workbook.Worksheets.Add()
+    sh.Name = META_SHEET
+    _range(sh, 1, 1, 1, 6).Value2 = _array([[u"Foglio", u"Impronta", u"Blocco", u"Indice", u"Controllo", u"Righe"]], 6)
+    sh.Visible = Excel.XlSheetVisibility.xlSheetVeryHidden
+    return sh
+
+def _index_sheet(workbook, create=False):
+    try:
+        return workbook.Worksheets.Item[INDEX_SHEET]
+    except:
+        if not create: return None
+    sh = workbook.Worksheets.Add()
+    sh.Name = INDEX_SHEET
+    sh.Visible = Excel.XlSheetVisibility.xlSheetVeryHidden
+    return sh
+
+def read_meta(workbook):
+    """{foglio: (riga, impronta, colonna indice, controllo, righe)} dal foglio nascosto ({} se non c'e')."""
+    sh = _meta_sheet(workbook)
+    if sh is None: return {}
+    try:
+        last = _last_row(sh, [1])
+        if last < 2: return {}
+        out = {}
+        for i, (name, fp, blk, col, check, n) in enumerate(_matrix(_range(sh, 2, 1, last, 6).Value2, last - 1, 6)):
+            if _text(name): out[_text(name)] = (i + 2, _text(fp), _int(col), _text(check), _int(n))
+        return out
+    finally:
+        try: Marshal.ReleaseComObject(sh)
+        except: pass
+
+def read_index(workbook, info, n):
+    """Chiavi (testo) delle n righe lette dal foglio indice; None se mancano o non sono n."""
+    if not info or not info[2] or info[4] != n or n == 0: return None
+    sh = _index_sheet(workbook)
+    if sh is None: return None
+    try:
+        return [_text(g[0]) for g in _matrix(_range(sh, 1, info[2], n, info[2]).Value2, n, 1)]
+    finally:
+        try: Marshal.ReleaseComObject(sh)
+        except: pass
+
+def write_meta(workbook, meta, spec, fp, texts, check):
+    """Registra impronta, indice e controllo dell'ultimo export del foglio (una scrittura ciascuno)."""
+    old = meta.get(spec.sheet)
+    if old is not None:
+        r = old[0]
+    else:
+        r = max([2] + [m[0] + 1 for m in meta.values()])
+    col = old[2] if old is not None and old[2] else max([0] + [m[2] for m in meta.values()]) + 1
+    n = len(texts)
+    sh = _meta_sheet(workbook, create=True)
+    try:
+        _range(sh, r, 1, r, 6).Value2 = _array([[spec.sheet, fp, spec.name, col, check, n]], 6)
+        meta[spec.sheet] = (r, fp, col, check, n)
+    finally:
+        try: Marshal.ReleaseComObject(sh)
+        except: pass
+    sh = _index_sheet(workbook, create=True)
+    try:
+        if n: _range(sh, 1, col, n, col).Value2 = _array([[t] for t in texts], 1)
+        if old is not None and old[4] > n: _range(sh, n + 1, col, old[4], col).ClearContents()
+    finally:
+        try: Marshal.ReleaseComObject(sh)
+        except: pass
+
+def _changelog_sheet(workbook, create=False):
+    try:
+        return workbook.Worksheets.Item[CHANGELOG_SHEET]
+    except:
+        if not create: return None
+    sh = workbook.Worksheets.Add()
+    sh.Name = CHANGELOG_SHEET
+    n = len(CHANGELOG_HEADERS)
+    _range(sh, 1, 1, 1, n).Value2 = _array([CHANGELOG_HEADERS], n)
+    return sh
+
+def key_label(spec, vals):
+    """Chiave leggibile della riga (celle chiave separate da " | ")."""
+    return u" | ".join(_text(vals[j]) for j in spec.key_index)
+
+def _book(workbook):
+    try: return workbook.FullName
+    except: return id(workbook)
+
+def record_changelog(workbook, entries):
+    """Accoda al registro entries = [(blocco, chiave, azione, colonna, prima, dopo)].
+
+    Le righe restano nell'esecuzione corrente (manens.timing) fino a
+    flush_changelog; anche entries vuoto segna il workbook, cosi' il registro
+    dell'esecuzione precedente si svuota. Senza esecuzione aperta scrive subito."""
+    run = timing.current()
+    if run is None: return _write_changelog(workbook, list(entries), None)
+    run.state.setdefault(CHANGELOG_SHEET, {}).setdefault(_book(workbook), []).extend(entries)
+    return 0
+
+def flush_changelog(workbook):
+    """Scrive in una volta le righe accodate dai blocchi al posto di quelle
+    dell'esecuzione precedente. Dopo l'ultimo blocco, prima di salvare."""
+    run = timing.current()
+    if run is None: return 0
+    entries = run.state.get(CHANGELOG_SHEET, {}).pop(_book(workbook), None)
+    if entries is None: return 0
+    return _write_changelog(workbook, entries, run)
+
+def _write_changelog(workbook, entries, run):
+    sh = _changelog_sheet(workbook, create=bool(entries))
+    if sh is None: return 0
+    try:
+        n = len(CHANGELOG_HEADERS)
+        last = _last_row(sh, [1])
+        if last >= 2: _range(sh, 2, 1, last, n).ClearContents()
+        if entries:
+            when = run.started if run is not None else time.strftime("%Y-%m-%dT%H:%M:%S")
+            _range(sh, 2, 1, len(entries) + 1, n).Value2 = _array([list(e) + [when] for e in entries], n)
+        return len(entries)
+    finally:
+        try: Marshal.ReleaseComObject(sh)
+        except: pass
+
+def sheet_intact(workbook, spec, info):
+    """Il foglio ha ancora le intestazioni nostre e le righe dati dell'ultimo export?
+
+    Intestazioni in una lettura e una End(xlUp) per colonna chiave: righe
+    eliminate o aggiunte a mano cambiano il conteggio e il blocco non salta."""
+    if not info: return False
+    try:
+        sh = workbook.Worksheets.Item[spec.sheet]
+    except:
+        return False
+    try:
+        headers, _ = _read_headers(sh)
+        if any(h not in headers for h in spec.headers): return False
+        last = _last_row(sh, [headers[spec.headers[j]] for j in spec.key_index])
+        return max(0, last - FIRST_ROW + 1) == info[4]
+    finally:
+        try: Marshal.ReleaseComObject(sh)
+        except: pass
+
+
+# -------------------------- RUN -----------------------------
+def _element(document, e):
+    """Elemento ripreso dallo snapshot (Id): riletto dal documento solo se serve."""
+    if isinstance(e, _int_types):
+        return document.GetElement(ElementId(e))
+    return e
+
+def _quantities(fns, e):
+    out = []
+    for fn in fns:
+        try: out.append(float(fn(e) or 0.0))
+        except: out.append(0.0)
+    return tuple(out)
+
+def _group(spec, snap, items, document=None, quantities=None):
+    """({chiave: valori}, {chiave: [istanze, somme di quantities...]}) da (valori dello
+       snapshot, elemento o Id); quantities = funzioni di spec.quantities o None."""
+    groups = {}; totals = {}
+    for ent, e in items:
+        if "k" not in ent:
+            e = _element(document, e)
+            snap.value(ent, "k", spec.key, e)
+        k = ent["k"]
+        if k is None: continue
+        vals = groups.get(k)
+        if vals is None:
+            if "r" not in ent:
+                e = _element(document, e)
+                snap.value(ent, "r", spec.row, e, k)
+            groups[k] = list(ent["r"])
+            tot = totals[k] = [1]
+        else:
+            tot = totals[k]
+            tot[0] += 1
+            for j, fn in spec.fill:
+                if not vals[j]:
+                    if j not in ent:
+                        e = _element(document, e)
+                        snap.value(ent, j, fn, e)
+                    vals[j] = ent[j] or vals[j]
+        if quantities:
+            if "q" not in ent:
+                e = _element(document, e)
+                snap.value(ent, "q", _quantities, quantities, e)
+            if len(tot) == 1: tot.extend(ent["q"])
+            else:
+                for i, v in enumerate(ent["q"]): tot[i + 1] += v
+    return groups, totals
+
+def group(spec, elems, snap=None, quantities=None):
+    """({chiave: valori}, {chiave: [istanze, quantita'...]}) dagli elementi del modello
+       (valori dallo snapshot se l'elemento non e' cambiato)."""
+    if snap is None: snap = snapshot.Table()
+    return _group(spec, snap, ((snap.entry(e), e) for e in elems), quantities=quantities)
+
+def _since_items(snap, document, changed, deleted):
+    """Elementi dello snapshot meno gli eliminati piu' i cambiati, per Id (ordine del collector)."""
+    ids = set(snap.old)
+    ids.difference_update(deleted)
+    ids.update(changed)
+    for i in sorted(ids):
+        if i in changed:
+            e = document.GetElement(ElementId(i))
+            if e is not None:
+                yield snap.entry(e), e
+        else:
+            yield snap.keep(i), i
+
+def run(spec, workbook, document):
+    """Esegue il blocco sul workbook aperto: aggiunge, aggiorna, elimina e ordina le righe."""
+    tm = timing.block(spec.name)
+    qfns = None
+    if quantities_on():
+        qfns = [fn for h, fn in spec.quantities]
+        spec = spec.with_quantities()
+    mark = dirty.mark(document)
+    name = u"export | {} | {}".format(spec.key.__module__, spec.name)
+    if spec.categories:
+        # stesso blocco con categorie diverse (GEN HVAC / PLU): tabelle separate
+        name += u" | " + u",".join(sorted(u"{}".format(int(c)) for c in spec.categories))
+    snap = snapshot.table(document, name)
+    since = None
+    if spec.categories and snap.complete:
+        since = dirty.since(document, snap.mark, spec.categories)
+    if since is None:
+        elems = spec.collect(document)
+        tm.lap("collect")
+        groups, totals = group(spec, elems, snap, qfns)
+        n_elems = len(elems)
+    else:
+        changed, deleted = since
+        print("[{}] Export incrementale: {} elementi cambiati, {} eliminati dall'ultimo export".format(
+            spec.name, len(changed), len(deleted.intersection(snap.old))))
+        tm.lap("collect")
+        groups, totals = _group(spec, snap, _since_items(snap, document, changed, deleted), document, qfns)
+        n_elems = len(snap.new)
+    snap.save(mark)
+    tm.lap("extract")
+
+    norms = [n for h, n in spec.keys]
+    rows = []
+    for k, vals in groups.items():
+        tot = totals[k]
+        if qfns is not None:
+            vals = vals + [tot[0]] + [round(v, 3) for v in tot[1:]]
+        key = tuple(norms[n](vals[j]) for n, j in enumerate(spec.key_index))
+        cells = [vals[j] if conv is None else conv(vals[j]) for j, conv in enumerate(spec.cells)]
+        rows.append((key, vals, cells, tot[0]))
+    rows.sort(key=lambda r: _order(r[0]))
+    tm.lap("group")
+    if sidecar.write(workbook, spec, rows):
+        tm.lap("sidecar")
+
+    fp = fingerprint(spec, rows)
+    meta = read_meta(workbook)
+    info = meta.get(spec.sheet)
+    skip = not full_sync() and (info or (0, None))[1] == fp and sheet_intact(workbook, spec, info)
+    tm.lap("meta")
+    if skip:
+        tm.count(elements=n_elems, rows=len(rows), updates=0, unchanged=len(rows), appends=0, deletes=0)
+        print("[{}] Foglio '{}' invariato dall'ultimo export: nessuna scrittura".format(spec.name, spec.sheet))
+        if changelog_on(): record_changelog(workbook, [])
+        return
+
+    sheet = None
+    try:
+        sheet = _sheet(workbook, spec.sheet)
+        headers = ensure_headers(sheet, spec)
+        values, last, stray = read_table(sheet, spec, headers)
+        tm.lap("read")
+        texts = read_index(workbook, info, len(values))
+        rebuilt = texts is None or key_check(spec, values, texts) != info[3]
+        if rebuilt:
+            texts = key_texts(spec, values)
+        existing = {}
+        for i, t in enumerate(texts):
+            if t: existing[t] = FIRST_ROW + i
+        tm.lap("index")
+
+        changes = {}; appends = []; added = []; current = set()
+        updated = 0
+        log = [] if changelog_on() else None
+        for key, vals, cells, count in rows:
+            t = key_text(key)
+            current.add(t)
+            r = existing.get(t)
+            if r is None:
+                appends.append(cells); added.append(vals)
+                if log is not None: log.append((spec.name, key_label(spec, cells), u"Aggiunta", u"", None, None))
+                continue
+            old = values[r - FIRST_ROW]
+            diff = [j for j, v in enumerate(cells) if not _same(old[j], v)]
+            for j in diff: changes.setdefault(j, {})[r] = cells[j]
+            if diff:
+                updated += 1
+                if log is not None:
+                    label = key_label(spec, cells)
+                    for j in diff: log.append((spec.name, label, u"Aggiornata", spec.headers[j], old[j], cells[j]))
+        removed_keys = []; rows_to_delete = []
+        for t, r in existing.items():
+            if t not in current:
+                old = values[r - FIRST_ROW]
+                rows_to_delete.append(r); removed_keys.append(row_key(spec, old))
+                if log is not None: log.append((spec.name, key_label(spec, old), u"Eliminata", u"", None, None))
+        tm.lap("diff")
+
+        write_cells(sheet, headers, spec, changes)
+        tm.lap("write")
+        removed_count = delete_rows(sheet, rows_to_delete, last) if rows_to_delete else 0
+        tm.lap("delete")
+        deleted = set(rows_to_delete)
+        plan = None if stray else merge_plan(spec, values, changes, deleted, appends)
+        if plan is None:
+            added_count = append_rows(sheet, headers, spec, last + 1 - removed_count, appends)
+            tm.lap("append")
+            sort_region(sheet, headers, spec)
+            tm.lap("sort")
+        else:
+            added_count = insert_rows(sheet, headers, spec, plan, last + 1 - removed_count)
+            tm.lap("append")
+        texts, check = final_index(spec, values, texts, changes, deleted, appends)
+        write_meta(workbook, meta, spec, fp, texts, check)
+        tm.lap("meta")
+        if log is not None: record_changelog(workbook, log)
+        tm.count(elements=n_elems, rows=len(existing), updates=updated,
+                 unchanged=len(rows) - len(appends) - updated, appends=len(appends), deletes=len(rows_to_delete),
+                 index_rebuilt=int(rebuilt), sorted=int(plan is None))
+
+        report.keys(spec.name, u"Aggiunte", added, added_count, spec.added)
+        report.keys(spec.name, u"Eliminate", removed_keys, removed_count, spec.removed)
+    finally:
+        try:
+            if sheet: Marshal.ReleaseComObject(sheet)
+        except: pass
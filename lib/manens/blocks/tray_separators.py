@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Blocco SEPARATORE PASSERELLE (Tray con Dividers) degli export Revit to Excel (ELE).
+Caricato da manens.blocks.load() solo se il blocco e' selezionato.
+"""
+import clr, re
+
+# Revit
+clr.AddReference("RevitAPI")
+from Autodesk.Revit.DB import FilteredElementCollector, BuiltInParameter, BuiltInCategory
+
+# Unit conversion (Revit 2022+ / <=2021)
+try:
+    from Autodesk.Revit.DB import UnitUtils, UnitTypeId  # 2022+
+    _HAS_UTID = True
+except:
+    from Autodesk.Revit.DB import UnitUtils, DisplayUnitType  # <=2021
+    _HAS_UTID = False
+
+from manens.keys import mm_key, mm_value
+from manens.blocks import sync
+from manens.blocks import cable_trays
+from manens.blocks.cable_trays import (
+    PAS_u, PAS_norm_text_strong, PAS_category_name, PAS_type_name, PAS_type_desc, PAS_type_param_text
+)
+
+doc = None
+
+def bind(document):
+    """Aggancia il blocco al documento e svuota le cache dei tipi (valgono per un clic)."""
+    global doc
+    doc = document
+    cable_trays.bind(document)     # PAS_type_desc legge doc e cache di cable_trays
+
+
+SEP_SHEET_NAME = "Separatore passerelle"
+SEP_HEADERS = [
+    "Category",
+    "Type Name",
+    "MAN_TypeDescription_IT",
+    "MAN_FamilyTypePrefix",
+    "Height",  # mm
+]
+
+def SEP_feet_to_mm(val_ft):
+    try:
+        if _HAS_UTID:
+            return float(UnitUtils.ConvertFromInternalUnits(float(val_ft), UnitTypeId.Millimeters))
+        else:
+            return float(UnitUtils.ConvertFromInternalUnits(float(val_ft), DisplayUnitType.DUT_MILLIMETERS))
+    except:
+        try: return float(val_ft) * 304.8
+        except: return 0.0
+
+def SEP_to_float_mm(x):
+    if x is None or x == "": return 0.0
+    try: return float(x)
+    except:
+        try:
+            return float(PAS_u(x).replace(",", ".").strip())
+        except:
+            m = re.search(r'(\d+(?:\.\d+)?)', PAS_u(x).replace(",", "."))
+            return float(m.group(1)) if m else 0.0
+
+def SEP_height_mm_key(elem):
+    """Ritorna (key_mm, val_mm) per Height del cable tray."""
+    try:
+        p = elem.get_Parameter(BuiltInParameter.RBS_CABLETRAY_HEIGHT_PARAM)
+    except:
+        p = None
+    # 1) prova come double interno (feet)
+    if p:
+        try:
+            ft = p.AsDouble()
+            if ft and ft > 0:
+                mm = SEP_feet_to_mm(ft)
+                return (mm_key(mm), mm)
+        except: pass
+        # 2) fallback string/value string in mm
+        try:
+            s = (p.AsString() or p.AsValueString() or "").strip()
+            if s:
+                mm = SEP_to_float_mm(s)
+                if mm > 0: return (mm_key(mm), mm)
+        except: pass
+    return (0, 0.0)
+
+def SEP_dividers_ok(elem):
+    """True se MAN_Dividers (istanza o tipo) è > 0 / non vuoto."""
+    def _val_from_param(pp):
+        if not pp: return 0
+        try:
+            return int(pp.AsInteger())
+        except:
+            s = (pp.AsString() or pp.AsValueString() or "").strip()
+            if not s: return 0
+            try: return int(float(s.replace(",", ".")))
+            except: return 0
+
+    # istanza
+    try:
+        p = elem.LookupParameter("MAN_Dividers")
+        v = _val_from_param(p)
+        if v > 0: return True
+    except: pass
+
+    # tipo
+    try:
+        tp = elem.get_Parameter(BuiltInParameter.ELEM_TYPE_PARAM)
+        tid = tp.AsElementId() if tp else None
+        if tid and tid.IntegerValue > 0:
+            t = doc.GetElement(tid)
+            if t:
+                p2 = t.LookupParameter("MAN_Dividers")
+                v2 = _val_from_param(p2)
+                if v2 > 0: return True
+    except: pass
+
+    return False
+
+# ---------------------- blocco (manens.blocks.sync) -----------------------
+def SEP_collect(document):
+    return FilteredElementCollector(document) \
+        .OfCategory(BuiltInCategory.OST_CableTray) \
+        .WhereElementIsNotElementType() \
+        .ToElements()
+
+def SEP_key(e):
+    # solo Cable Trays con MAN_Dividers > 0
+    if not SEP_dividers_ok(e): return None
+    h_key, h_val = SEP_height_mm_key(e)
+    if h_key <= 0: return None
+    t_key = PAS_norm_text_strong(PAS_type_name(e) or "")
+    if not t_key: return None
+    return (t_key, h_key)
+
+def SEP_prefix(e):
+    return PAS_type_param_text(e, "MAN_FamilyTypePrefix")
+
+def SEP_row(e, key):
+    return [PAS_category_name(e) or "Cable Trays", key[0], PAS_type_desc(e) or "", SEP_prefix(e) or "",
+            mm_value(key[1])]
+
+SPEC = sync.BlockSpec(
+    "SEP PASSERELLE", SEP_SHEET_NAME, SEP_HEADERS,
+    keys=[("Type Name", PAS_norm_text_strong), ("Height", lambda v: mm_key(SEP_to_float_mm(v)))],
+    collect=SEP_collect, key=SEP_key, row=SEP_row,
+    fill={"MAN_TypeDescription_IT": PAS_type_desc, "MAN_FamilyTypePrefix": SEP_prefix},
+    added=lambda r: (r[1], round(float(r[4]), 3)), categories=[BuiltInCategory.OST_CableTray])
+
+def run_cable_tray_separators_into_workbook(workbook):
+    sync.run(SPEC, workbook, doc)
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Ordine del testo come il sort di Excel (MatchCase = False), per chi deve
+prevedere l'ordine di un foglio ordinato da Excel senza rileggerlo
+(manens.blocks.sync: merge delle righe nuove e indice dopo il sort).
+
+Excel confronta il testo con le regole di Windows per la cultura dell'utente,
+non per codice carattere: "MAN_PIPE" viene prima di "MAN2" e "PE-AD" sta con
+"PEAD". In IronPython key() e' la SortKey di CompareInfo della cultura
+corrente (IgnoreCase), cioe' gli stessi byte del confronto di Excel; fuori da
+.NET (CPython, devtools) un'approssimazione del "word sort" di Windows:
+- maiuscole e minuscole uguali;
+- trattino e apostrofo ignorati; a parita' il testo che li contiene va dopo;
+- spazi, punteggiatura e simboli prima delle cifre, cifre prima delle lettere;
+- lettere accentate come la lettera base, poi l'accento.
+
+    sorted(texts, key=collate.key)
+"""
+import unicodedata
+
+try:
+    unicode
+    unichr
+except NameError:
+    unicode = str
+    unichr = chr
+
+try:
+    from System.Globalization import CompareOptions, CultureInfo
+    _compare = CultureInfo.CurrentCulture.CompareInfo
+except Exception:
+    _compare = None
+
+# simboli ASCII nell'ordine di Windows (trattino e apostrofo esclusi: ignorati)
+SYMBOLS = u" !\"#$%&()*,./:;?@[\\]^_`{|}~+<=>"
+IGNORED = u"-'"
+CACHE_MAX = 100000
+
+_symbol = dict((c, unichr(1 + i)) for i, c in enumerate(SYMBOLS))
+_cache = {}
+
+
+def _u(s):
+    if s is None: return u""
+    if isinstance(s, unicode): return s
+    try: return unicode(s)
+    except: return unicode(str(s))
+
+def _word_sort(text):
+    """(lettere e simboli, accenti, caratteri ignorati) del testo minuscolo."""
+    base = []; marks = []; ignored = 0
+    for c in unicodedata.normalize("NFD", text.lower()):
+        if c in IGNORED:
+            ignored += 1
+        elif unicodedata.combining(c):
+            marks.append(c)
+        elif c in _symbol:
+            base.append(_symbol[c])
+        elif c.isdigit() or c.isalpha():
+            base.append(c)
+        elif unicodedata.category(c)[0] in "PSZC":
+            base.append(u"\x21" + c)        # altri simboli: dopo quelli ASCII, prima delle cifre
+        else:
+            base.append(c)
+    return (u"".join(base), u"".join(marks), ignored)
+
+def key(text):
+    """Chiave di ordinamento del testo come il sort di Excel (confrontabile con <)."""
+    t = _u(text)
+    k = _cache.get(t)
+    if k is None:
+        if len(_cache) >= CACHE_MAX: _cache.clear()
+        if _compare is not None:
+            k = str(bytearray(_compare.GetSortKey(t, CompareOptions.IgnoreCase).KeyData))
+        else:
+            k = _word_sort(t)
+        _cache[t] = k
+    return k
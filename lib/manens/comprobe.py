@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Contatore delle chiamate COM verso Excel (opzionale, per diagnosi).
+
+wrap(workbook) restituisce un proxy che inoltra tutto all'oggetto COM e avvolge
+a sua volta gli oggetti restituiti (Worksheets, sheet, Range, Sort...). Ogni
+accesso a Cells, Range, Value2 (lettura / scrittura), End, Delete e Sort viene
+contato e cronometrato; gli altri membri finiscono in "(altro)". I conteggi
+vanno al blocco corrente di manens.timing (tabella [COM] e JSON dell'esecuzione).
+
+Attivo solo con la variabile d'ambiente MANENS_COMPROBE=1 (o ENABLED = True):
+altrimenti wrap() restituisce l'oggetto cosi' com'e'. Gli array .NET (Value2 di
+un Range multiplo) e i valori semplici non vengono avvolti.
+In modalita' probe gli oggetti intermedi non passano da ReleaseComObject
+(il proxy non e' un oggetto COM): vengono rilasciati dal GC a fine comando.
+
+Con MANENS_COMREC=1 (vedi manens.comrec) lo stesso proxy registra anche ogni
+operazione e il valore restituito, per riprodurre l'esecuzione fuori da Revit.
+"""
+import os
+from timeit import default_timer as _now
+
+from manens import comrec, timing
+
+ENABLED = None      # None = decide la variabile d'ambiente
+
+WATCHED = ("Cells", "Range", "Value2", "End", "Delete", "Sort")
+OTHER = "(altro)"
+
+try:
+    _PLAIN = (basestring, int, long, float, bool, type(None), tuple, list, dict)
+except NameError:
+    _PLAIN = (str, bytes, int, float, bool, type(None), tuple, list, dict)
+
+
+def enabled():
+    if ENABLED is not None: return bool(ENABLED)
+    return (os.environ.get("MANENS_COMPROBE") or "").strip().lower() in ("1", "true", "yes", "si")
+
+def wrap(obj):
+    """Proxy contatore attorno a un oggetto COM di Excel (se probe o registrazione sono attivi)."""
+    if obj is None or not (enabled() or comrec.enabled()): return obj
+    rid = comrec.open_book(obj)
+    if rid is None: return _wrap(obj)
+    return _Proxy(obj, rid)
+
+def unwrap(obj):
+    if isinstance(obj, (_Proxy, _Member)): return object.__getattribute__(obj, "_o")
+    return obj
+
+def finish():
+    """Fine comando: chiude la registrazione e in IronPython forza il rilascio
+       degli oggetti COM avvolti."""
+    comrec.close()
+    if not (enabled() or comrec.enabled()): return
+    try:
+        from System import GC
+        GC.Collect(); GC.WaitForPendingFinalizers()
+    except: pass
+
+
+def _wrap(v):
+    if isinstance(v, _PLAIN) or isinstance(v, (_Proxy, _Member)): return v
+    if hasattr(v, "GetLength"): return v      # array .NET
+    rec = comrec.active()
+    return _Proxy(v, rec.new_id() if rec is not None else None)
+
+def _id(p):
+    return object.__getattribute__(p, "_id")
+
+def _enc(v):
+    """Argomento / esito per la registrazione: i proxy diventano riferimenti."""
+    if isinstance(v, (_Proxy, _Member)): return {"r": _id(v)}
+    if isinstance(v, tuple): return {"t": [_enc(x) for x in v]}
+    if isinstance(v, list): return [_enc(x) for x in v]
+    return comrec.value(v)
+
+def _log(op):
+    rec = comrec.active()
+    if rec is not None: rec.log(op)
+
+def _args(args, kw):
+    a = tuple(unwrap(x) for x in args)
+    k = dict((n, unwrap(x)) for n, x in kw.items()) if kw else {}
+    return a, k
+
+def _key(key):
+    if isinstance(key, tuple): return tuple(unwrap(x) for x in key)
+    return unwrap(key)
+
+def _hit(name, t0, suffix=u""):
+    timing.call(name + suffix if name in WATCHED else OTHER, _now() - t0)
+
+
+class _Proxy(object):
+    __slots__ = ("_o", "_id")
+
+    def __init__(self, o, rid=None):
+        object.__setattr__(self, "_o", o)
+        object.__setattr__(self, "_id", rid)
+
+    def __getattr__(self, name):
+        o = object.__getattribute__(self, "_o")
+        t0 = _now()
+        v = getattr(o, name)
+        if callable(v) or hasattr(v, "__getitem__") and not isinstance(v, _PLAIN) and not hasattr(v, "GetLength"):
+            # metodo / proprieta' indicizzata (Cells(r, c), Range[a, b]): si conta la chiamata
+            rec = comrec.active()
+            m = _Member(name, v, rec.new_id() if rec is not None else None)
+            if rec is not None: rec.log(["g", _id(self), name, {"r": _id(m)}])
+            return m
+        _hit(name, t0, u" get" if name == "Value2" else u"")
+        w = _wrap(v)
+        _log(["g", _id(self), name, _enc(w)])
+        return w
+
+    def __setattr__(self, name, value):
+        o = object.__getattribute__(self, "_o")
+        t0 = _now()
+        setattr(o, name, unwrap(value))
+        _hit(name, t0, u" set" if name == "Value2" else u"")
+        _log(["s", _id(self), name, _enc(value)])
+
+    def __call__(self, *args, **kw):
+        return _Member(OTHER, object.__getattribute__(self, "_o"), _id(self))(*args, **kw)
+
+    def __getitem__(self, key):
+        return _Member(OTHER, object.__getattribute__(self, "_o"), _id(self))[key]
+
+    def __iter__(self):
+        items = [_wrap(x) for x in object.__getattribute__(self, "_o")]
+        _log(["n", _id(self), [_enc(x) for x in items]])
+        for x in items:
+            yield x
+
+    def __len__(self):
+        return len(object.__getattribute__(self, "_o"))
+
+    def __nonzero__(self):
+        return True
+    __bool__ = __nonzero__
+
+    def __eq__(self, other):
+        return object.__getattribute__(self, "_o") == unwrap(other)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(object.__getattribute__(self, "_o"))
+
+
+class _Member(object):
+    """Membro chiamabile / indicizzabile: conta al momento della chiamata."""
+    __slots__ = ("_name", "_o", "_id")
+
+    def __init__(self, name, o, rid=None):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_o", o)
+        object.__setattr__(self, "_id", rid)
+
+    def __call__(self, *args, **kw):
+        a, k = _args(args, kw)
+        t0 = _now()
+        v = object.__getattribute__(self, "_o")(*a, **k)
+        _hit(object.__getattribute__(self, "_name"), t0)
+        w = _wrap(v)
+        if comrec.active() is not None:
+            _log(["c", _id(self), [_enc(x) for x in args], dict((n, _enc(x)) for n, x in kw.items()), _enc(w)])
+        return w
+
+    def __getitem__(self, key):
+        t0 = _now()
+        v = object.__getattribute__(self, "_o")[_key(key)]
+        _hit(object.__getattribute__(self, "_name"), t0)
+        w = _wrap(v)
+        _log(["i", _id(self), _enc(key), _enc(w)])
+        return w
+
+    def __getattr__(self, name):
+        # es. sheet.Cells.Count, workbook.Worksheets.Item[...]
+        return getattr(self._proxy(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._proxy(), name, value)
+
+    def __iter__(self):
+        return iter(self._proxy())
+
+    def _proxy(self):
+        return _Proxy(object.__getattribute__(self, "_o"), _id(self))
+
+    def __len__(self):
+        return len(object.__getattribute__(self, "_o"))
+
+    def __nonzero__(self):
+        return True
+    __bool__ = __nonzero__
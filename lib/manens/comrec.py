@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Registrazione delle operazioni COM su Excel (per riprodurle fuori da Revit).
+
+Con la variabile d'ambiente MANENS_COMREC=1 il proxy di manens.comprobe scrive,
+oltre ai conteggi, ogni operazione sul workbook e il valore restituito in un
+file JSON compresso (una operazione per riga) in %APPDATA%\\Manens\\comrec.
+All'apertura viene salvato il contenuto iniziale di ogni sheet (UsedRange),
+cosi' il file basta da solo: devtools/manens_dev/comreplay lo riesegue sul
+workbook finto e ricostruisce lo stato di ogni sheet in ogni punto.
+
+Righe del file (liste JSON):
+    ["o", id, percorso, [[nome, visible, riga0, col0, valori], ...]]  workbook aperto
+    ["b", blocco]                     inizio delle operazioni di un blocco (manens.timing)
+    ["g", id, membro, esito]          lettura di proprieta' / membro
+    ["s", id, membro, valore]         scrittura (Value2 = ...)
+    ["c", id, argomenti, kw, esito]   chiamata (Cells(r, c), End(xlUp), Apply()...)
+    ["i", id, chiave, esito]          indice (Range[a, b], Item["Tubazioni"])
+    ["n", id, [id, ...]]              iterazione (for sh in Worksheets)
+Oggetti COM come {"r": id}, array 2D come {"a": righe, "lo": base}, tuple come
+{"t": [...]}, enum come {"e": intero}.
+"""
+import json
+import os
+import time
+
+from manens import timing
+
+ENABLED = None      # None = decide la variabile d'ambiente
+
+try:
+    _PLAIN = (basestring, int, long, float, bool, type(None))
+except NameError:
+    _PLAIN = (str, bytes, int, float, bool, type(None))
+
+_rec = None
+
+
+def enabled():
+    if ENABLED is not None: return bool(ENABLED)
+    return (os.environ.get("MANENS_COMREC") or "").strip().lower() in ("1", "true", "yes", "si")
+
+def active():
+    """Registratore aperto (None se la registrazione e' spenta)."""
+    return _rec
+
+def _store_dir():
+    base = os.environ.get("APPDATA") or os.path.expanduser("~")
+    return os.path.join(base, "Manens", "comrec")
+
+
+def value(v):
+    """Valore COM -> JSON (gli oggetti avvolti li codifica comprobe)."""
+    if isinstance(v, _PLAIN): return v
+    if hasattr(v, "GetLength"):
+        try:
+            lo = v.GetLowerBound(0)
+            n0, n1 = v.GetLength(0), v.GetLength(1)
+            return {"a": [[value(v.GetValue(i + lo, j + lo)) for j in range(n1)] for i in range(n0)], "lo": lo}
+        except: return {"x": u"array"}
+    try: return {"e": int(v)}
+    except: pass
+    try: return {"x": u"%s" % v}
+    except: return {"x": u"?"}
+
+
+class _Recorder(object):
+    def __init__(self, path):
+        self.path = path
+        self._f = None
+        self._next = 0
+        self._block = None
+        self.ops = 0
+        try:
+            import gzip
+            self._f = gzip.open(path, "wb")
+        except:
+            self._f = None
+
+    def new_id(self):
+        self._next += 1
+        return self._next
+
+    def log(self, op):
+        if self._f is None: return
+        run = timing.current()
+        blk = run._open.name if run is not None and run._open is not None else None
+        if blk != self._block:
+            self._block = blk
+            self._write(["b", blk])
+        self._write(op)
+        self.ops += 1
+
+    def _write(self, op):
+        try: self._f.write((json.dumps(op, separators=(",", ":")) + "\n").encode("ascii"))
+        except: pass
+
+    def close(self):
+        if self._f is None: return
+        try: self._f.close()
+        except: pass
+        self._f = None
+
+
+def _snapshot(workbook):
+    """Contenuto iniziale di ogni sheet: [nome, visible, riga0, col0, valori]."""
+    out = []
+    try: sheets = list(workbook.Worksheets)
+    except: sheets = []
+    for ws in sheets:
+        try:
+            used = ws.UsedRange
+            out.append([ws.Name, value(ws.Visible), used.Row, used.Column, value(used.Value2)])
+        except: pass
+    return out
+
+def open_book(workbook):
+    """Apre il file (al primo workbook) e registra lo stato iniziale; ritorna l'id radice."""
+    global _rec
+    if not enabled(): return None
+    if _rec is None:
+        try:
+            d = _store_dir()
+            if not os.path.isdir(d): os.makedirs(d)
+            run = timing.current()
+            tool = run.tool if run is not None else u"manens"
+            safe = u"".join(c if c.isalnum() else u"_" for c in tool)
+            now = time.time()
+            stamp = u"{}-{:03d}".format(time.strftime("%Y%m%d-%H%M%S", time.localtime(now)), int(now * 1000) % 1000)
+            _rec = _Recorder(os.path.join(d, u"{}-{}.jsonl.gz".format(stamp, safe)))
+        except:
+            return None
+    rid = _rec.new_id()
+    try: path = workbook.FullName
+    except: path = u""
+    _rec.log(["o", rid, path, _snapshot(workbook)])
+    return rid
+
+def close():
+    """Chiude il file della registrazione; ritorna il percorso (None se spenta)."""
+    global _rec
+    rec = _rec
+    _rec = None
+    if rec is None: return None
+    rec.close()
+    print("[COMREC] {} operazioni registrate: {}".format(rec.ops, rec.path))
+    return rec.path
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Elementi aggiunti / modificati / eliminati nella sessione Revit, per documento.
+
+startup.py dell'estensione chiama install() al caricamento di pyRevit:
+on_changed resta agganciato ad Application.DocumentChanged e, per ogni
+transazione confermata (anche undo / redo), registra gli Id delle istanze
+delle CATEGORIES della toolbar con un contatore crescente (seq). Una modifica
+a tipi, famiglie o livelli cambia le righe di tutte le loro istanze: segna solo
+"related" e il prossimo export rilegge il modello completo.
+
+Un export salva con lo snapshot (manens.snapshot) il mark() del momento;
+al clic successivo since() restituisce gli Id cambiati da allora, e il blocco
+rilegge solo quelli invece di raccogliere di nuovo tutta la categoria.
+since() e' None (export completo) se il tracciamento non e' attivo, se il
+documento e' stato riaperto, sincronizzato con il centrale o ricaricato (token
+nuovo) o se sono cambiati tipi / famiglie / livelli.
+
+Lo stato sta in AppDomain, come le variabili d'ambiente di pyRevit: pulsanti e
+handler girano in motori diversi dello stesso processo Revit.
+"""
+import uuid
+
+from Autodesk.Revit.DB import (
+    BuiltInCategory, ElementClassFilter, ElementIsElementTypeFilter, ElementMulticategoryFilter,
+    ElementType, Family, Level, LogicalAndFilter, LogicalOrFilter
+)
+from System import AppDomain
+from System.Collections.Generic import List
+
+_SLOT = "manens.dirty"
+_HANDLERS = "manens.dirty.handlers"
+
+# categorie dei blocchi di export (manens.blocks)
+CATEGORIES = (
+    "OST_PipeCurves", "OST_PipeInsulations", "OST_PipeFitting", "OST_PipeAccessory",
+    "OST_PlumbingFixtures", "OST_Sprinklers", "OST_MechanicalEquipment",
+    "OST_DuctCurves", "OST_DuctInsulations", "OST_DuctFitting", "OST_DuctAccessory",
+    "OST_DuctTerminal", "OST_FlexDuctCurves",
+    "OST_CableTray", "OST_CableTrayFitting", "OST_Conduit", "OST_ConduitFitting",
+    "OST_ElectricalEquipment", "OST_ElectricalFixtures", "OST_LightingDevices",
+    "OST_LightingFixtures", "OST_CommunicationDevices", "OST_DataDevices",
+    "OST_FireAlarmDevices", "OST_NurseCallDevices", "OST_SecurityDevices",
+)
+
+_filters = []
+
+
+def _doc_key(doc):
+    try:
+        p = doc.PathName
+        if p: return p
+    except: pass
+    try: return doc.Title
+    except: return u""
+
+def _root():
+    d = AppDomain.CurrentDomain.GetData(_SLOT)
+    if d is None:
+        d = {}
+        AppDomain.CurrentDomain.SetData(_SLOT, d)
+    return d
+
+def _state(doc, create=False):
+    root = _root()
+    key = _doc_key(doc)
+    st = root.get(key)
+    if st is None and create:
+        st = root[key] = {"token": uuid.uuid4().hex, "seq": 0, "related": 0,
+                          "changed": {}, "deleted": {}}
+    return st
+
+def _instance_filter():
+    """Istanze delle CATEGORIES; tipi, famiglie e livelli (costruiti una volta)."""
+    if not _filters:
+        cats = List[BuiltInCategory]()
+        for name in CATEGORIES:
+            try: cats.Add(getattr(BuiltInCategory, name))
+            except: pass
+        _filters.append(LogicalAndFilter(ElementMulticategoryFilter(cats), ElementIsElementTypeFilter(True)))
+        _filters.append(LogicalOrFilter(LogicalOrFilter(ElementClassFilter(ElementType), ElementClassFilter(Family)),
+                                        ElementClassFilter(Level)))
+    return _filters[0], _filters[1]
+
+
+def on_changed(sender, args):
+    try:
+        doc = args.GetDocument()
+        st = _state(doc, True)
+        inst, related = _instance_filter()
+        seq = st["seq"] = st["seq"] + 1
+        changed = st["changed"]; deleted = st["deleted"]
+        for ids in (args.GetAddedElementIds(inst), args.GetModifiedElementIds(inst)):
+            for eid in ids:
+                try:
+                    changed[eid.IntegerValue] = (seq, doc.GetElement(eid).Category.Id.IntegerValue)
+                except: pass
+        for eid in args.GetDeletedElementIds():
+            i = eid.IntegerValue
+            changed.pop(i, None)
+            deleted[i] = seq
+        if len(args.GetModifiedElementIds(related)):
+            st["related"] = seq
+    except:
+        pass
+
+def on_reset(sender, args):
+    """Documento aperto, sincronizzato o ricaricato: modifiche fuori dalla sessione."""
+    try:
+        _root().pop(_doc_key(args.Document), None)
+    except:
+        pass
+
+
+def install(app):
+    """Aggancia gli handler all'Application (un reload di pyRevit sostituisce i precedenti)."""
+    old = AppDomain.CurrentDomain.GetData(_HANDLERS)
+    if old is not None:
+        try:
+            app.DocumentChanged -= old[0]
+            app.DocumentOpened -= old[1]
+            app.DocumentSynchronizedWithCentral -= old[1]
+            app.DocumentReloadedLatest -= old[1]
+        except: pass
+    app.DocumentChanged += on_changed
+    app.DocumentOpened += on_reset
+    app.DocumentSynchronizedWithCentral += on_reset
+    app.DocumentReloadedLatest += on_reset
+    AppDomain.CurrentDomain.SetData(_HANDLERS, (on_changed, on_reset))
+    _root().clear()
+
+def installed():
+    return AppDomain.CurrentDomain.GetData(_HANDLERS) is not None
+
+
+def mark(doc):
+    """(token, seq) del documento adesso; None se il tracciamento non e' attivo."""
+    if not installed(): return None
+    st = _state(doc, True)
+    return (st["token"], st["seq"])
+
+def since(doc, mark, categories):
+    """(Id cambiati, Id eliminati) dopo mark nelle categorie date; None = serve un export completo."""
+    if not mark or not installed(): return None
+    st = _state(doc)
+    if st is None or st["token"] != mark[0] or st["related"] > mark[1]: return None
+    cats = set(int(c) for c in categories)
+    seq = mark[1]
+    changed = set(i for i, (s, c) in st["changed"].items() if s > seq and c in cats)
+    deleted = set(i for i, s in st["deleted"].items() if s > seq)
+    return changed, deleted
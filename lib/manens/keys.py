@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Chiavi canoniche per le misure in millimetri (export e import).
+
+Tutte le misure usate per il match Revit <-> Excel (diametri, spessori,
+MaxSize, altezze...) diventano interi in micrometri: 50 mm -> 50000,
+12.5 mm -> 12500. Le coppie Larghezza x Altezza diventano tuple di interi.
+Cosi' "50", "50.0", 50.0000001 e "Φ50 mm" producono la stessa chiave e il
+confronto non dipende piu' dalla rappresentazione dei float.
+
+0 significa "misura assente / non leggibile" (come il vecchio 0.0 / "").
+"""
+import re
+
+try:
+    unicode
+except NameError:
+    unicode = str
+try:
+    long
+except NameError:
+    long = int
+
+UM_PER_MM = 1000
+
+_PHI_RE = re.compile(u"[ΦφØø⌀ϕ]")
+_NUM_RE = re.compile(r"(\d+(?:\.\d+)?)")
+
+
+def _u(s):
+    if s is None: return u""
+    if isinstance(s, unicode): return s
+    try: return unicode(s)
+    except: return unicode(str(s))
+
+def _to_um(f):
+    try:
+        f = float(f)
+    except: return 0
+    if f != f or f <= 0: return 0
+    return int(round(f * UM_PER_MM))
+
+def mm_key(v):
+    """mm (numero o testo: "Φ50", "50 mm", "12,5") -> micrometri interi, 0 se assente."""
+    if v is None or isinstance(v, bool): return 0
+    if isinstance(v, (int, long, float)):
+        return _to_um(v)
+    s = _PHI_RE.sub(u"", _u(v)).replace(u",", u".")
+    m = _NUM_RE.search(s)
+    if not m: return 0
+    return _to_um(m.group(1))
+
+def mm_value(key):
+    """Chiave -> float in mm (per scrivere numeri in Excel)."""
+    try: return key / float(UM_PER_MM)
+    except: return 0.0
+
+def mm_text(key):
+    """Chiave -> testo mm senza zeri inutili ("50", "12.5"); "" se 0."""
+    if not key: return u""
+    s = u"%.3f" % mm_value(key)
+    return s.rstrip(u"0").rstrip(u".")
+
+def wh_key(v):
+    """Testo "300x104" / "300 mm x 104 mm" -> (300000, 104000); None se non ci sono 2 numeri."""
+    s = _PHI_RE.sub(u"", _u(v)).replace(u",", u".")
+    nums = _NUM_RE.findall(s)
+    if len(nums) < 2: return None
+    return (_to_um(nums[0]), _to_um(nums[1]))
+
+def wh_text(key):
+    """(300000, 104000) -> "300x104"."""
+    return u"{}x{}".format(mm_text(key[0]) or u"0", mm_text(key[1]) or u"0")
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Profilo per funzione di un pushbutton (opzionale, per diagnosi).
+
+Si attiva con Shift+clic sul pulsante (__shiftclick__ di pyRevit) o con la
+variabile d'ambiente MANENS_PROFILE=1. Nello script:
+
+    if __name__ == "__main__":
+        profiler.run(main, globals())
+
+run() sostituisce le funzioni del modulo (e quelle importate da manens, es.
+mm_key) con un involucro che conta chiamate, tempo cumulativo e tempo proprio,
+aggiorna anche i dizionari di funzioni (SHEETS_DISPATCH) e a fine esecuzione
+rimette gli originali. IronPython non ha cProfile: il profilo e' deterministico
+e l'involucro aggiunge qualche microsecondo a chiamata, quindi conta la
+classifica piu' dei valori assoluti per le funzioni chiamate milioni di volte
+(GEN_norm_text...). Il tempo delle chiamate COM ricade nella funzione che le fa
+(write_updates_batched_*...): per il dettaglio c'e' manens.comprobe.
+
+Le funzioni interne (def dentro def) e quelle gia' catturate altrove non si vedono.
+A fine esecuzione stampa le prime TOP funzioni per tempo proprio e scrive la
+tabella completa (TSV) accanto al workbook, o in %APPDATA%\\Manens\\profile.
+"""
+import io
+import os
+import time
+import types
+from timeit import default_timer as _now
+
+from manens import timing
+
+ENABLED = None      # None = variabile d'ambiente / Shift+clic
+TOP = 30
+
+_prof = None
+
+
+def enabled(ns=None):
+    if ENABLED is not None: return bool(ENABLED)
+    if (os.environ.get("MANENS_PROFILE") or "").strip().lower() in ("1", "true", "yes", "si"):
+        return True
+    if ns and ns.get("__shiftclick__"): return True
+    try:
+        import __builtin__ as _b
+    except ImportError:
+        import builtins as _b
+    return bool(getattr(_b, "__shiftclick__", False))
+
+def _ms(sec):
+    return sec * 1000.0
+
+
+class _Profile(object):
+    def __init__(self, tool):
+        self.tool = tool
+        self.stats = {}         # funzione -> [chiamate, cumulativo s, proprio s]
+        self.stack = []         # [funzione, tempo dei figli]
+        self.depth = {}
+        self._undo = []         # (contenitore, chiave, originale)
+
+    def wrap(self, label, fn):
+        prof = self
+        if label not in self.stats: self.stats[label] = [0, 0.0, 0.0]
+        rec = self.stats[label]
+
+        def wrapped(*args, **kw):
+            st = prof.stack
+            frame = [label, 0.0]
+            st.append(frame)
+            prof.depth[label] = prof.depth.get(label, 0) + 1
+            t0 = _now()
+            try:
+                return fn(*args, **kw)
+            finally:
+                dt = _now() - t0
+                st.pop()
+                d = prof.depth[label] = prof.depth[label] - 1
+                rec[0] += 1
+                if d == 0: rec[1] += dt         # ricorsione: il cumulativo conta una volta
+                rec[2] += dt - frame[1]
+                if st: st[-1][1] += dt
+        wrapped.__name__ = fn.__name__
+        wrapped.__doc__ = fn.__doc__
+        wrapped._manens_orig = fn
+        return wrapped
+
+    def instrument(self, ns, prefix=u""):
+        mod = ns.get("__name__")
+        done = {}
+        for k, v in list(ns.items()):
+            if not isinstance(v, types.FunctionType) or k.startswith("__") or hasattr(v, "_manens_orig"):
+                continue
+            own = getattr(v, "__module__", None)
+            label = prefix + k if own == mod else u"{}.{}".format(own, k)
+            w = self.wrap(label, v)
+            ns[k] = w
+            self._undo.append((ns, k, v))
+            done[id(v)] = w
+        # tabelle di dispatch costruite all'import (SHEETS_DISPATCH...)
+        for k, v in list(ns.items()):
+            if not isinstance(v, dict) or k.startswith("__"): continue
+            for kk, vv in list(v.items()):
+                w = done.get(id(vv))
+                if w is not None:
+                    v[kk] = w
+                    self._undo.append((v, kk, vv))
+
+    def restore(self):
+        for box, k, v in reversed(self._undo):
+            try: box[k] = v
+            except: pass
+        self._undo = []
+
+    def rows(self):
+        """[(funzione, chiamate, cumulativo ms, proprio ms)] per tempo proprio decrescente."""
+        out = [(k, v[0], _ms(v[1]), _ms(v[2])) for k, v in self.stats.items() if v[0]]
+        out.sort(key=lambda r: -r[3])
+        return out
+
+    def table(self, top=TOP):
+        rows = self.rows()
+        w = max([len(r[0]) for r in rows[:top]] + [8])
+        lines = [u"[PROFILO] {} | prime {} funzioni per tempo proprio".format(self.tool, min(top, len(rows))),
+                 u"{:<{w}} {:>10} {:>12} {:>12}".format(u"funzione", u"chiamate", u"cumul. ms", u"proprio ms", w=w)]
+        for name, n, cum, own in rows[:top]:
+            lines.append(u"{:<{w}} {:>10} {:>12.1f} {:>12.1f}".format(name, n, cum, own, w=w))
+        return lines
+
+    def save(self, paths):
+        """TSV completo accanto al (primo) workbook; ritorna il percorso (None se non riesce)."""
+        safe = u"".join(c if c.isalnum() else u"_" for c in self.tool)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        wb = [p for p in paths or [] if p]
+        if wb:
+            d = os.path.dirname(wb[0])
+            stem = os.path.splitext(os.path.basename(wb[0]))[0]
+            name = u"{}_profilo_{}_{}.tsv".format(stem, safe, stamp)
+        else:
+            d = os.path.join(os.environ.get("APPDATA") or os.path.expanduser("~"), "Manens", "profile")
+            name = u"profilo_{}_{}.tsv".format(safe, stamp)
+        try:
+            if d and not os.path.isdir(d): os.makedirs(d)
+            path = os.path.join(d, name)
+            with io.open(path, "w", encoding="utf-8") as f:
+                f.write(u"funzione\tchiamate\tcumulativo_ms\tproprio_ms\n")
+                for r in self.rows():
+                    f.write(u"{}\t{}\t{:.3f}\t{:.3f}\n".format(*r))
+            return path
+        except:
+            return None
+
+
+def instrument(ns, prefix=u""):
+    """Aggiunge al profilo in corso un modulo caricato dopo (importer del MULTI)."""
+    if _prof is not None: _prof.instrument(ns, prefix)
+
+def run(main, ns=None):
+    """Esegue main(), sotto profilo se attivo (Shift+clic / MANENS_PROFILE=1)."""
+    global _prof
+    if not enabled(ns): return main()
+    tool = os.path.basename(os.path.dirname(os.path.abspath((ns or {}).get("__file__") or u"script")))
+    _prof = _Profile(tool.replace(u".pushbutton", u""))
+    _prof.instrument(ns or {})
+    prof = _prof
+    before = timing.last()
+    try:
+        return prof.wrap(u"main", main)()
+    finally:
+        _prof = None
+        prof.restore()
+        for line in prof.table(): print(line)
+        run_log = timing.last()
+        path = prof.save(run_log.paths if run_log is not None and run_log is not before else [])
+        if path: print("[PROFILO] Tabella completa: {}".format(path))
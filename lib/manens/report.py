@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+Report unico a fine esecuzione al posto delle stampe sparse nei blocchi.
+
+La finestra di output di pyRevit e' lenta a disegnare: ogni print durante i
+blocchi (e le anteprime di 20 tuple per aggiunte / eliminate) allunga
+l'esecuzione. Da timing.begin() le print dei pushbutton finiscono in un log in
+memoria, attribuite al blocco aperto di manens.timing; timing.end() disegna un
+solo riepilogo HTML (tabella per blocco con elementi / aggiunte / eliminate /
+aggiornate / invariate da tm.count, dettagli richiudibili con i messaggi di
+ogni blocco) e scrive il log completo in un file di testo accanto al JSON
+dell'esecuzione (%APPDATA%\\Manens\\runs).
+
+Le liste lunghe si registrano con keys(): nel riepilogo il numero e le prime
+PREVIEW voci, nel file tutte. Il formato delle voci viene applicato solo a
+fine esecuzione, fuori dal tempo dei blocchi:
+
+    report.keys("PIPE", u"Aggiunte", appends, added_count, lambda r: (r[1], r[3]))
+
+Senza begin() (o con begin(..., buffered=False), es. il benchmark) le print
+vanno a console come prima e keys() stampa subito numero e anteprima.
+Fuori da pyRevit (stand-in, batch) il riepilogo e' testo semplice.
+"""
+import io
+import os
+import sys
+
+PREVIEW = 20        # voci di ogni lista nel riepilogo
+LINES = 40          # messaggi per blocco nel riepilogo (nel file ci sono tutti)
+
+# colonne della tabella: (intestazione, chiavi di tm.count in ordine di preferenza)
+COLUMNS = ((u"elementi", ("elements",)),
+           (u"aggiunte", ("appends",)),
+           (u"eliminate", ("deletes",)),
+           (u"aggiornate", ("updates", "updated")),
+           (u"invariate", ("unchanged",)))
+
+try:
+    _unicode = unicode
+except NameError:
+    _unicode = str
+
+_log = None
+
+
+def _text(v):
+    if isinstance(v, _unicode): return v
+    try: return v.decode("utf-8", "replace")
+    except AttributeError: return _unicode(v)
+
+def _item(v, fmt=None):
+    if fmt is not None:
+        try: v = fmt(v)
+        except: pass
+    if isinstance(v, tuple): return u" | ".join(_text(x) for x in v)
+    return _text(v)
+
+def _esc(s):
+    return s.replace(u"&", u"&amp;").replace(u"<", u"&lt;").replace(u">", u"&gt;")
+
+
+class _List(object):
+    """Lista registrata da keys(): formattata solo quando serve."""
+    def __init__(self, tag, label, count, items, fmt):
+        self.tag = tag
+        self.label = label
+        self.count = count
+        self.items = items
+        self.fmt = fmt
+
+    def head(self):
+        return u"[{}] {}: {}".format(self.tag, self.label, self.count)
+
+    def preview(self):
+        out = u"; ".join(_item(v, self.fmt) for v in self.items[:PREVIEW])
+        more = len(self.items) - PREVIEW
+        if more > 0: out += u" ... (+{} nel file)".format(more)
+        return out
+
+
+class _Log(object):
+    """Sostituto di sys.stdout durante l'esecuzione: righe per blocco."""
+    def __init__(self, run, stream):
+        self.run = run
+        self.stream = stream    # stdout originale
+        self.order = []         # blocchi (None = fuori dai blocchi) nell'ordine del primo messaggio
+        self.lines = {}         # blocco -> [testo o _List]
+        self._part = u""
+
+    def _add(self, entry):
+        blk = self.run._open
+        out = self.lines.get(blk)
+        if out is None:
+            out = self.lines[blk] = []
+            self.order.append(blk)
+        out.append(entry)
+
+    def write(self, s):
+        self._part += _text(s)
+        if u"\n" not in self._part: return
+        parts = self._part.split(u"\n")
+        self._part = parts.pop()
+        for p in parts: self._add(p)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self._part: self._add(self._part)
+        self._part = u""
+
+
+def start(run):
+    """Da qui in poi le print vanno nel log dell'esecuzione (chiamato da timing.begin)."""
+    global _log
+    stop()
+    _log = _Log(run, sys.stdout)
+    sys.stdout = _log
+    return _log
+
+def stop():
+    """Rimette lo stdout originale; ritorna il log (None se non c'era raccolta)."""
+    global _log
+    log = _log
+    _log = None
+    if log is None: return None
+    log.close()
+    if sys.stdout is log: sys.stdout = log.stream
+    return log
+
+def keys(tag, label, items, count=None, fmt=None):
+    """Lista lunga di un blocco (chiavi aggiunte, eliminate, match...):
+       numero e prime PREVIEW voci nel riepilogo, tutte nel file."""
+    items = list(items or [])
+    rec = _List(tag, label, len(items) if count is None else count, items, fmt)
+    if _log is None:
+        print(rec.head())
+        if items: print(u"[{}] {} (prime {}): {}".format(tag, label, min(PREVIEW, len(items)), rec.preview()))
+        return
+    _log._add(rec)
+
+
+def _cells(b):
+    out = []
+    for head, names in COLUMNS:
+        v = u"-"
+        for n in names:
+            if n in b.counts:
+                v = _text(b.counts[n]); break
+        out.append(v)
+    return out
+
+def _name(blk):
+    return blk.name if blk is not None else u"(esecuzione)"
+
+def _summary_lines(entries, limit):
+    out = []
+    for e in entries[:limit]:
+        if isinstance(e, _List):
+            out.append(e.head())
+            if e.items: out.append(u"    " + e.preview())
+        else:
+            out.append(e)
+    if len(entries) > limit: out.append(u"... altri {} messaggi nel file".format(len(entries) - limit))
+    return out
+
+def write_file(run, log, path):
+    """Log completo (messaggi e liste intere) per blocco; ritorna il percorso (None se non riesce)."""
+    try:
+        with io.open(path, "w", encoding="utf-8") as f:
+            f.write(u"[REPORT] {} | {}\n".format(_text(run.tool), _text(run.workbook)))
+            for blk in log.order:
+                f.write(u"\n== {} ==\n".format(_name(blk)))
+                for e in log.lines[blk]:
+                    if isinstance(e, _List):
+                        f.write(e.head() + u"\n")
+                        for v in e.items: f.write(u"    " + _item(v, e.fmt) + u"\n")
+                    else:
+                        f.write(e + u"\n")
+            f.write(u"\n")
+            for line in run.table(): f.write(_text(line) + u"\n")
+        return path
+    except:
+        return None
+
+
+def _html(run, log, json_path, txt_path):
+    h = [u"<h3>{} | {}</h3>".format(_esc(_text(run.tool)), _esc(_text(run.workbook)))]
+    h.append(u"<table><tr><th style='text-align:left'>blocco</th>" +
+             u"".join(u"<th style='text-align:right'>{}</th>".format(c[0]) for c in COLUMNS) +
+             u"<th style='text-align:right'>ms</th></tr>")
+    for b in run.blocks:
+        h.append(u"<tr><td>{}</td>".format(_esc(b.name)) +
+                 u"".join(u"<td style='text-align:right'>{}</td>".format(_esc(c)) for c in _cells(b)) +
+                 u"<td style='text-align:right'>{}</td></tr>".format(b.total_ms()))
+    h.append(u"<tr><td><b>totale</b></td>" + u"<td></td>" * len(COLUMNS) +
+             u"<td style='text-align:right'><b>{}</b></td></tr></table>".format(run.total_ms()))
+
+    # finestra di output di pyRevit = motore IE: niente <details>, apri / chiudi con onclick
+    def fold(title, lines):
+        h.append(u"<div><a href='#' onclick=\"var d=this.nextSibling;"
+                 u"d.style.display=d.style.display=='none'?'block':'none';return false;\">&#9656; {}</a>"
+                 u"<pre style='display:none'>{}</pre></div>".format(_esc(title), _esc(u"\n".join(lines))))
+
+    for blk in log.order:
+        entries = log.lines[blk]
+        if blk is None:
+            h.append(u"<pre>{}</pre>".format(_esc(u"\n".join(_summary_lines(entries, LINES)))))
+        else:
+            fold(u"{} ({} messaggi)".format(blk.name, len(entries)), _summary_lines(entries, LINES))
+    fold(u"Tempi per fase", [_text(l) for l in run.table()])
+    for label, p in ((u"Log completo", txt_path), (u"JSON", json_path)):
+        if p: h.append(u"<p>{}: <a href='file:///{}'>{}</a></p>".format(
+            label, _esc(p.replace(u"\\", u"/")), _esc(p)))
+    return u"\n".join(h)
+
+def _output():
+    try:
+        from pyrevit import script
+        return script.get_output()
+    except:
+        return None
+
+def show(run, log, json_path=None):
+    """Riepilogo a fine esecuzione (chiamato da timing.end, a raccolta gia' chiusa)."""
+    txt_path = None
+    if log is not None:
+        txt_path = write_file(run, log, os.path.splitext(json_path)[0] + u".txt" if json_path else run.path(u".txt"))
+        out = _output()
+        if out is not None:
+            try:
+                out.print_html(_html(run, log, json_path, txt_path))
+                return
+            except: pass
+        for blk in log.order:
+            if blk is not None: print(u"== {} ==".format(blk.name))
+            for line in _summary_lines(log.lines[blk], LINES): print(line)
+    for line in run.table(): print(line)
+    if json_path: print("[TEMPI] JSON: {}".format(json_path))
+    if txt_path: print("[REPORT] Log completo: {}".format(txt_path))
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Hash per riga per l'import incrementale Excel -> Revit.
+
+Per ogni riga importata si calcola un hash di (chiave, MAN_ProductCode,
+MAN_BoQ_Units, Id degli elementi corrispondenti). Gli hash sono salvati in un
+file JSON per (importer, documento Revit, workbook) sotto %APPDATA%\\Manens\\rowhash:
+al successivo import le righe con hash invariato vengono saltate, ma solo se
+gli elementi hanno ancora i valori della riga in PARAMS: un Undo dell'import,
+una modifica a mano o l'import di un altro utente sullo stesso workbook
+riportano la riga fra quelle da applicare.
+Lo scope dell'importer serve perche' piu' discipline usano gli stessi nomi di
+foglio ("Generale", "Tubazioni", ...) con chiavi diverse.
+
+Il workbook non viene modificato: gli importer lo aprono in sola lettura.
+"""
+import hashlib
+import json
+import os
+
+try:
+    unicode
+except NameError:
+    unicode = str
+
+STORE_VERSION = 1
+PARAMS = ("MAN_ProductCode", "MAN_BoQ_Units")
+
+
+def _u(s):
+    if s is None: return u""
+    if isinstance(s, unicode): return s
+    try: return unicode(s)
+    except: return unicode(str(s))
+
+def _md5(text):
+    return hashlib.md5(_u(text).encode("utf-8")).hexdigest()
+
+def key_text(key):
+    """Rappresentazione testuale stabile della chiave (tuple/str/float)."""
+    if not isinstance(key, tuple):
+        key = (key,)
+    parts = []
+    for k in key:
+        if isinstance(k, float):
+            parts.append(repr(k))
+        elif isinstance(k, tuple):
+            parts.append(u"(" + key_text(k) + u")")
+        else:
+            parts.append(_u(k))
+    return u"\x1f".join(parts)
+
+def elems_signature(elems):
+    ids = []
+    for e in elems or []:
+        try: ids.append(e.Id.IntegerValue)
+        except: pass
+    ids.sort()
+    return u",".join([u"%d" % i for i in ids])
+
+def row_hash(key, prod_code, boq_units, elems):
+    return _md5(u"\x1e".join([key_text(key), _u(prod_code), _u(boq_units), elems_signature(elems)]))
+
+
+def _param_text(elem, name):
+    """Valore attuale del parametro come testo; None se l'elemento non lo ha."""
+    try: p = elem.LookupParameter(name)
+    except: return None
+    if not p: return None
+    try: v = p.AsString()
+    except: v = None
+    if v is None:
+        try: v = p.AsValueString()
+        except: v = None
+    return _u(v).strip()
+
+def in_model(elems, prod_code, boq_units):
+    """True se tutti gli elementi hanno gia' i valori della riga (parametri mancanti ignorati)."""
+    want = (_u(prod_code).strip(), _u(boq_units).strip())
+    for e in elems or []:
+        for name, w in zip(PARAMS, want):
+            v = _param_text(e, name)
+            if v is not None and v != w: return False
+    return True
+
+
+def _store_dir():
+    base = os.environ.get("APPDATA") or os.path.expanduser("~")
+    return os.path.join(base, "Manens", "rowhash")
+
+def _doc_key(doc):
+    try:
+        p = doc.PathName
+        if p: return _u(p)
+    except: pass
+    try: return _u(doc.Title)
+    except: return u""
+
+
+class SheetHashes(object):
+    """Hash di uno sheet: confronto con l'import precedente + hash correnti."""
+
+    def __init__(self, store, sheet_name, old):
+        self.store = store
+        self.sheet_name = sheet_name
+        self.old = old
+        self.new = {}
+
+    def changed(self, key, prod_code, boq_units, elems):
+        """True se la riga va applicata. Registra sempre l'hash corrente."""
+        kh = _md5(key_text(key))
+        h = row_hash(key, prod_code, boq_units, elems)
+        self.new[kh] = h
+        if not self.store.skip_unchanged or self.old.get(kh) != h:
+            return True
+        return not in_model(elems, prod_code, boq_units)
+
+    def discard(self, key):
+        """Non memorizza la riga (es. scrittura fallita): verra' riapplicata."""
+        self.new.pop(_md5(key_text(key)), None)
+
+    def commit(self):
+        """Da chiamare solo dopo il Commit della transazione Revit."""
+        self.store.sheets[self.sheet_name] = self.new
+        self.store.dirty = True
+
+
+class RowHashStore(object):
+    def __init__(self, path, doc_key, workbook_path, skip_unchanged=True, scope=u""):
+        self.path = path
+        self.scope = scope
+        self.doc_key = doc_key
+        self.workbook_path = workbook_path
+        self.skip_unchanged = skip_unchanged
+        self.sheets = {}
+        self.dirty = False
+
+    @classmethod
+    def for_import(cls, doc, workbook_path, skip_unchanged=True, scope=u""):
+        doc_key = _doc_key(doc)
+        wb = os.path.normcase(os.path.abspath(_u(workbook_path)))
+        name = _md5(_u(scope) + u"\x1f" + doc_key + u"\x1f" + wb) + ".json"
+        store = cls(os.path.join(_store_dir(), name), doc_key, wb, skip_unchanged, _u(scope))
+        store.load()
+        return store
+
+    def load(self):
+        try:
+            if not os.path.exists(self.path): return
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if data.get("version") != STORE_VERSION: return
+            self.sheets = dict((k, dict(v)) for k, v in data.get("sheets", {}).items())
+        except Exception as ex:
+            print("[HASH] Archivio hash illeggibile, import completo: {}".format(ex))
+            self.sheets = {}
+
+    def sheet(self, sheet_name):
+        return SheetHashes(self, sheet_name, self.sheets.get(sheet_name, {}))
+
+    def save(self):
+        if not self.dirty: return False
+        try:
+            d = os.path.dirname(self.path)
+            if not os.path.isdir(d): os.makedirs(d)
+            data = {"version": STORE_VERSION, "scope": self.scope, "document": self.doc_key,
+                    "workbook": self.workbook_path, "sheets": self.sheets}
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+            if os.path.exists(self.path): os.remove(self.path)
+            os.rename(tmp, self.path)
+            self.dirty = False
+            return True
+        except Exception as ex:
+            print("[HASH] Impossibile salvare gli hash: {}".format(ex))
+            return False
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Sessione di import condivisa tra piu' discipline / workbook (Excel to Revit MULTI).
+
+Con una sessione attiva gli import delle singole discipline:
+- raccolgono ogni categoria / classe una sola volta (elements);
+- costruiscono una sola volta gli indici chiave -> elementi con lo stesso nome
+  (index), es. Tubazioni per Type + Diameter usato da HVAC ed ELE;
+- registrano il riepilogo di ogni blocco (record) per il report unico finale;
+- affidano alla sessione gli hash per riga dell'import incrementale
+  (save_hashes, manens.rowhash): si salvano solo dopo il Commit della
+  transazione unica (committed) e si scartano se la transazione viene annullata,
+  altrimenti il clic successivo salterebbe righe mai scritte nel modello.
+
+Senza sessione (pulsanti singoli) le funzioni di modulo eseguono direttamente
+collect() / build() e record non fa nulla: il comportamento resta quello di prima.
+Gli indici non dipendono dai parametri scritti dall'import (MAN_ProductCode /
+MAN_BoQ_Units), quindi restano validi per tutta la sessione.
+"""
+
+_current = None
+
+
+class ImportSession(object):
+    def __init__(self, doc):
+        self.doc = doc
+        self.discipline = u""
+        self.workbook = u""
+        self._elems = {}
+        self._index = {}
+        self.rows = []          # (workbook, disciplina, blocco, {valori})
+        self.hits = {"elements": 0, "index": 0}
+        self.builds = {"elements": 0, "index": 0}
+        self.hashes = []        # archivi di manens.rowhash in attesa del Commit
+
+    def elements(self, what, collect):
+        lst = self._elems.get(what)
+        if lst is None:
+            lst = self._elems[what] = list(collect())
+            self.builds["elements"] += 1
+        else:
+            self.hits["elements"] += 1
+        return lst
+
+    def index(self, name, build):
+        idx = self._index.get(name)
+        if idx is None:
+            idx = self._index[name] = build()
+            self.builds["index"] += 1
+        else:
+            self.hits["index"] += 1
+        return idx
+
+    def record(self, block, values):
+        self.rows.append((self.workbook, self.discipline, block, values))
+
+    def committed(self):
+        """Transazione della sessione confermata: salva gli hash in attesa."""
+        stores, self.hashes = self.hashes, []
+        for store in stores: store.save()
+
+    def report(self):
+        """Righe di testo del report consolidato (per disciplina e blocco, con totali)."""
+        out = []
+        tot = {}
+        for wb, disc, block, vals in self.rows:
+            out.append(u"[{}] {} | {} | {}".format(disc, wb, block, u" | ".join(
+                u"{}: {}".format(k, vals[k]) for k in sorted(vals))))
+            for k, v in vals.items():
+                tot[k] = tot.get(k, 0) + v
+        out.append(u"[TOTALE] " + u" | ".join(u"{}: {}".format(k, tot[k]) for k in sorted(tot)))
+        out.append(u"[CACHE] Raccolte elementi: {} (riusate {}) | Indici: {} (riusati {})".format(
+            self.builds["elements"], self.hits["elements"], self.builds["index"], self.hits["index"]))
+        return out
+
+
+def begin(doc):
+    global _current
+    _current = ImportSession(doc)
+    return _current
+
+def end():
+    """Chiude la sessione; gli hash non salvati da committed() vengono scartati."""
+    global _current
+    _current = None
+
+def active():
+    return _current is not None
+
+def elements(what, collect):
+    """Elementi di una categoria / classe; what e' la chiave di cache (es. ("class", "Pipe"))."""
+    if _current is None: return collect()
+    return _current.elements(what, collect)
+
+def index(name, build):
+    """Indice chiave -> elementi; con lo stesso name viene costruito una volta per sessione."""
+    if _current is None: return build()
+    return _current.index(name, build)
+
+def record(block, **values):
+    if _current is not None: _current.record(block, values)
+
+def save_hashes(store):
+    """Salva l'archivio di hash per riga: subito senza sessione, dopo committed() con la sessione."""
+    if _current is None: return store.save()
+    _current.hashes.append(store)
+    return False
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Tabella finale di ogni blocco di export anche in un file colonnare accanto al
+workbook, per gli strumenti di stima che oggi riaprono Excel solo per leggerla.
+
+Attivo con la variabile d'ambiente MANENS_SIDECAR (o FORMAT):
+    csv       <workbook>.<foglio>.csv (UTF-8, separatore virgola, RFC 4180)
+    parquet   <workbook>.<foglio>.parquet se pyarrow e' importabile (CPython),
+              altrimenti CSV
+Vuota / 0 = nessun file.
+
+Colonne: le intestazioni nostre del blocco (valori come nelle celle) piu'
+COUNT_HEADER, le istanze del modello di ogni riga (con MANENS_QUANTITIES le
+istanze e le lunghezze sono gia' colonne del blocco). Le righe arrivano dal
+raggruppamento di manens.blocks.sync, nell'ordine delle chiavi; il CSV si
+scrive riga per riga. Il file si riscrive a ogni export del blocco, anche
+se il foglio e' invariato (le istanze possono cambiare senza cambiare il
+foglio). Due blocchi sullo stesso foglio scrivono lo stesso file: vale
+l'ultimo, come per il foglio.
+"""
+import io
+import os
+import re
+
+FORMAT = None               # None = variabile d'ambiente MANENS_SIDECAR
+COUNT_HEADER = u"Instances"
+
+try:
+    unicode
+    _num_types = (int, long, float)
+except NameError:
+    unicode = str
+    _num_types = (int, float)
+
+
+def _u(s):
+    if s is None: return u""
+    if isinstance(s, unicode): return s
+    try: return unicode(s)
+    except: return unicode(str(s))
+
+def fmt():
+    """Formato richiesto: u"csv", u"parquet" o None."""
+    v = FORMAT if FORMAT is not None else os.environ.get("MANENS_SIDECAR")
+    v = (v or u"").strip().lower()
+    if v in (u"", u"0", u"no", u"false"): return None
+    return u"parquet" if v == u"parquet" else u"csv"
+
+def path_for(workbook_path, sheet, ext):
+    base = os.path.splitext(_u(workbook_path))[0]
+    return u"{}.{}.{}".format(base, re.sub(u'[\\\\/:*?"<>|]', u"_", _u(sheet)), ext)
+
+def _is_num(v):
+    return isinstance(v, _num_types) and not isinstance(v, bool)
+
+def _field(v):
+    if v is None: return u""
+    if _is_num(v):
+        if isinstance(v, float) and abs(v) < 1e15 and v == int(v): return u"%d" % int(v)
+        return _u(repr(v) if isinstance(v, float) else v)
+    t = _u(v)
+    if any(c in t for c in u',"\r\n'):
+        t = u'"' + t.replace(u'"', u'""') + u'"'
+    return t
+
+def write_csv(path, headers, rows):
+    """rows = iterabile di liste di valori (stesso ordine di headers)."""
+    tmp = path + u".tmp"
+    n = 0
+    with io.open(tmp, "w", encoding="utf-8", newline="") as f:
+        f.write(u",".join(_field(h) for h in headers) + u"\r\n")
+        for r in rows:
+            f.write(u",".join(_field(v) for v in r) + u"\r\n")
+            n += 1
+    if os.path.exists(path): os.remove(path)
+    os.rename(tmp, path)
+    return n
+
+def write_parquet(path, headers, rows):
+    """Colonne numeriche (tutti numeri o vuote) come double, le altre come testo."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    cols = [[] for h in headers]
+    for r in rows:
+        for j, v in enumerate(r):
+            cols[j].append(v)
+    arrays = []
+    for c in cols:
+        if all(v is None or v == u"" or _is_num(v) for v in c):
+            arrays.append(pa.array([None if v is None or v == u"" else float(v) for v in c], pa.float64()))
+        else:
+            arrays.append(pa.array([None if v is None else _u(v) for v in c], pa.string()))
+    pq.write_table(pa.Table.from_arrays(arrays, names=list(headers)), path)
+    return len(cols[0]) if cols else 0
+
+def write(workbook, spec, rows):
+    """Tabella del blocco accanto al workbook; rows = [(chiave, valori, celle, istanze)].
+       Ritorna il percorso scritto o None (disattivo o errore)."""
+    kind = fmt()
+    if kind is None: return None
+    try:
+        book_path = workbook.FullName
+    except Exception:
+        return None
+    if COUNT_HEADER in spec.headers:            # colonne delle quantita' gia' nel blocco
+        headers = list(spec.headers)
+        table = (cells for key, vals, cells, count in rows)
+    else:
+        headers = list(spec.headers) + [COUNT_HEADER]
+        table = (list(cells) + [count] for key, vals, cells, count in rows)
+    try:
+        n = None
+        if kind == u"parquet":
+            path = path_for(book_path, spec.sheet, kind)
+            try:
+                n = write_parquet(path, headers, table)
+            except ImportError:
+                print("[SIDECAR] pyarrow non disponibile: CSV al posto di Parquet")
+        if n is None:
+            path = path_for(book_path, spec.sheet, u"csv")
+            n = write_csv(path, headers, table)
+        print("[{}] Tabella in {} ({} righe)".format(spec.name, os.path.basename(path), n))
+        return path
+    except Exception as ex:
+        print("[SIDECAR] Impossibile scrivere la tabella di {}: {}".format(spec.name, ex))
+        return None
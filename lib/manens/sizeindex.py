@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Indice per Type Name con le size ordinate, per i match "quasi uguali".
+
+Le chiavi sono (Type Name, size) con size in micrometri interi (manens.keys).
+Quando una riga Excel non trova la chiave esatta, si cercano con bisect le size
+dello stesso Type Name entro la tolleranza: O(log n) per riga, senza riscorrere
+tutte le chiavi. Ogni chiave va a una sola riga: assign() risolve tutte le
+righe insieme, dalla coppia piu' vicina, e una riga la cui size piu' vicina e'
+gia' presa prende l'altra entro tolleranza.
+
+    hits = SizeIndex(free_keys, tol_um).assign(unmatched_keys)
+"""
+import bisect
+
+
+class SizeIndex(object):
+    def __init__(self, keys, tol_um):
+        self.tol = int(tol_um or 0)
+        by_type = {}
+        for k in keys:
+            try: t, s = k[0], k[1]
+            except: continue
+            if not s: continue
+            by_type.setdefault(t, set()).add(s)
+        self._sizes = dict((t, sorted(v)) for t, v in by_type.items())
+        self._claimed = set()
+
+    def candidates(self, type_name, size):
+        """[(distanza, size)] dello stesso Type Name entro tolleranza, dalla piu' vicina."""
+        if self.tol <= 0 or not size: return []
+        lst = self._sizes.get(type_name)
+        if not lst: return []
+        lo = bisect.bisect_left(lst, size - self.tol)
+        hi = bisect.bisect_right(lst, size + self.tol)
+        return sorted((abs(s - size), s) for s in lst[lo:hi])
+
+    def nearest(self, type_name, size):
+        """Size dello stesso Type Name piu' vicina entro tolleranza, None se assente."""
+        c = self.candidates(type_name, size)
+        return c[0][1] if c else None
+
+    def match(self, key):
+        """(type, size) -> chiave dell'indice entro tolleranza, None se nessuna.
+           Ogni chiave viene assegnata a una sola riga Excel: se la piu' vicina e'
+           gia' presa si passa alla successiva entro tolleranza."""
+        for d, s in self.candidates(key[0], key[1]):
+            hit = (key[0], s)
+            if hit not in self._claimed:
+                self._claimed.add(hit)
+                return hit
+        return None
+
+    def assign(self, keys):
+        """{(type, size): chiave dell'indice} per tutte le chiavi insieme, dalla coppia
+           piu' vicina: una chiave dell'indice va alla riga con la size piu' vicina,
+           non alla prima incontrata. Le chiavi senza match non compaiono."""
+        pairs = []
+        for k in keys:
+            try: t, size = k[0], k[1]
+            except: continue
+            for d, s in self.candidates(t, size):
+                pairs.append((d, k, s))
+        pairs.sort()
+        out = {}
+        for d, k, s in pairs:
+            hit = (k[0], s)
+            if k in out or hit in self._claimed: continue
+            self._claimed.add(hit)
+            out[k] = hit
+        return out
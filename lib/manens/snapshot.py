@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+Snapshot su disco dei valori estratti dagli elementi del modello, condiviso da
+export (Revit -> Excel) e import (Excel -> Revit).
+
+Per ogni (documento, tabella) un file sotto %APPDATA%\\Manens\\snapshot conserva,
+per ElementId, la versione dell'elemento e i valori letti l'ultima volta:
+chiave, riga e campi di completamento per i blocchi di export (manens.blocks.sync),
+chiave dell'indice per gli import ("import | Pipes | Type + Diameter"). Al clic
+successivo gli elementi con la stessa versione riusano i valori salvati; solo
+quelli nuovi o modificati rileggono i parametri.
+
+Versione: VersionGuid dell'elemento, del tipo (e della famiglia), dell'host
+(isolanti) e del livello. Se Revit non espone VersionGuid l'elemento viene
+sempre riletto e non finisce nel file. Il file non conosce le unita' di
+progetto: dopo un cambio di unita' MANENS_FULL_SYNC=1 ignora lo snapshot
+(e lo riscrive).
+
+    idx = snapshot.index(doc, "Pipes | Type + Diameter", elems, elem_key)
+
+index() e' l'indice chiave -> elementi degli import (stesso nome di
+session.index); sync.group usa direttamente table / entry / value.
+
+Gli elementi non piu' visti in una tabella escono dal file al salvataggio.
+Con il file si salva il mark di manens.dirty: se nel frattempo sono cambiati
+solo elementi noti, keep() riprende gli altri senza rileggerne la versione.
+"""
+import hashlib
+import os
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+try:
+    unicode
+except NameError:
+    unicode = str
+
+STORE_VERSION = 2           # 2: file scritti con le cache dei tipi svuotate a ogni clic
+FULL = None                 # None = variabile d'ambiente MANENS_FULL_SYNC
+
+
+def _u(s):
+    if s is None: return u""
+    if isinstance(s, unicode): return s
+    try: return unicode(s)
+    except: return unicode(str(s))
+
+def _md5(text):
+    return hashlib.md5(_u(text).encode("utf-8")).hexdigest()
+
+def _store_dir():
+    base = os.environ.get("APPDATA") or os.path.expanduser("~")
+    return os.path.join(base, "Manens", "snapshot")
+
+def _doc_key(doc):
+    try:
+        p = doc.PathName
+        if p: return _u(p)
+    except: pass
+    try: return _u(doc.Title)
+    except: return u""
+
+def _id(eid):
+    try: return eid.IntegerValue
+    except: return None
+
+def full_sync():
+    if FULL is not None:
+        return bool(FULL)
+    return os.environ.get("MANENS_FULL_SYNC", "").strip() not in ("", "0")
+
+
+class Table(object):
+    """Valori per ElementId di una tabella; entry(e) e' vuota se l'elemento e' cambiato."""
+
+    def __init__(self, path=None, doc=None, name=u"", reuse=True):
+        self.path = path
+        self.doc = doc
+        self.name = _u(name)
+        self.doc_key = _doc_key(doc) if doc is not None else u""
+        self.reuse = reuse
+        self.old = {}
+        self.new = {}
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+        self.mark = None            # manens.dirty.mark() del salvataggio precedente
+        self.complete = False       # tutti gli elementi hanno una versione
+        self.partial = False
+        self._related = {}
+
+    def load(self):
+        if not self.path or not self.reuse: return
+        try:
+            if not os.path.exists(self.path): return
+            with open(self.path, "rb") as f:
+                data = pickle.load(f)
+            if data.get("version") != STORE_VERSION or data.get("document") != self.doc_key: return
+            self.old = data.get("entries") or {}
+            self.mark = data.get("mark")
+            self.complete = bool(data.get("complete"))
+        except Exception as ex:
+            print("[SNAP] Snapshot illeggibile ({}), rilettura completa: {}".format(self.name, ex))
+            self.old = {}
+
+    def _guid(self, elem):
+        try: return u"{}".format(elem.VersionGuid)
+        except: return None
+
+    def _related_guid(self, eid):
+        """Versione di tipo / host / livello, una lettura per Id e per tabella."""
+        i = _id(eid)
+        if i is None or i <= 0: return u""
+        v = self._related.get(i)
+        if v is None:
+            v = u""
+            try:
+                e = self.doc.GetElement(eid)
+                if e is not None:
+                    v = self._guid(e) or u""
+                    fam = getattr(e, "Family", None)
+                    if fam is not None:
+                        v += u"+" + (self._guid(fam) or u"")
+            except: pass
+            self._related[i] = v
+        return v
+
+    def version(self, elem):
+        """Versione dell'elemento (None = non disponibile, niente snapshot)."""
+        v = self._guid(elem)
+        if v is None: return None
+        parts = [v]
+        try: parts.append(self._related_guid(elem.GetTypeId()))
+        except: pass
+        for attr in ("HostElementId", "LevelId"):
+            eid = getattr(elem, attr, None)
+            if eid is not None:
+                parts.append(self._related_guid(eid))
+        return u"|".join(parts)
+
+    def entry(self, elem):
+        """Valori salvati dell'elemento (dict da completare con value)."""
+        i = _id(elem.Id) if self.path else None
+        v = self.version(elem) if i is not None else None
+        if v is None:
+            self.misses += 1
+            self.partial = True
+            return {}
+        old = self.old.get(i)
+        if old is not None and old[0] == v:
+            self.hits += 1
+            ent = old[1]
+        else:
+            self.misses += 1
+            ent = {}
+            self.dirty = True
+        self.new[i] = (v, ent)
+        return ent
+
+    def keep(self, i):
+        """Valori salvati dell'Id senza rileggere l'elemento (non cambiato secondo manens.dirty)."""
+        old = self.new[i] = self.old[i]
+        self.hits += 1
+        return old[1]
+
+    def value(self, ent, field, fn, *args):
+        """ent[field], calcolato con fn(*args) se manca."""
+        try:
+            return ent[field]
+        except KeyError:
+            pass
+        v = ent[field] = fn(*args)
+        self.dirty = True
+        return v
+
+    def save(self, mark=None):
+        if not self.path: return False
+        complete = not self.partial
+        if not self.dirty and len(self.new) == len(self.old) and mark == self.mark \
+                and complete == self.complete: return False
+        try:
+            d = os.path.dirname(self.path)
+            if not os.path.isdir(d): os.makedirs(d)
+            data = {"version": STORE_VERSION, "document": self.doc_key, "table": self.name,
+                    "entries": self.new, "mark": mark, "complete": complete}
+            tmp = self.path + ".tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(data, f, 2)
+            if os.path.exists(self.path): os.remove(self.path)
+            os.rename(tmp, self.path)
+            self.old = self.new
+            self.new = {}
+            self.dirty = False
+            self.mark = mark
+            self.complete = complete
+            return True
+        except Exception as ex:
+            print("[SNAP] Impossibile salvare lo snapshot ({}): {}".format(self.name, ex))
+            return False
+
+
+def table(doc, name):
+    """Tabella dello snapshot per il documento (vuota se il documento manca)."""
+    if doc is None:
+        return Table(name=name)
+    key = _doc_key(doc)
+    path = os.path.join(_store_dir(), _md5(key + u"\x1f" + _u(name)) + ".pickle")
+    tab = Table(path, doc, name, reuse=not full_sync())
+    tab.load()
+    return tab
+
+
+def index(doc, name, elems, key):
+    """{chiave: [elementi]} per gli indici degli import; key(elem) -> chiave, None = scartato."""
+    tab = table(doc, u"import | " + _u(name))
+    idx = {}
+    for e in elems:
+        k = tab.value(tab.entry(e), "k", key, e)
+        if k is None: continue
+        idx.setdefault(k, []).append(e)
+    tab.save()
+    return idx
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Suggerimenti per le righe Excel senza elementi (refusi, famiglie rinominate).
+
+Indice delle parole del testo delle chiavi del modello (Family / Type Name),
+senza confronto tutti-contro-tutti. Un refuso (lettere scambiate, doppie,
+mancanti) o una famiglia rinominata cambia di solito una parola sola: per
+ogni parola della riga i candidati sono le chiavi che hanno tutte le altre
+(intersezione delle liste invertite, dalla piu' corta, ferma appena e' vuota);
+ipotesi troppo generiche (oltre CANDIDATES chiavi) non contano.
+
+Se le parole non bastano (testo di una parola, piu' parole sbagliate) si
+passa ai trigrammi, con l'indice costruito solo al primo bisogno: la sequenza
+dei trigrammi della riga si divide in SEGMENTS parti e i candidati sono le
+chiavi con tutti i trigrammi di una coppia di parti (poi di una parte sola),
+infine il conteggio sulle liste dei trigrammi piu' rari entro POSTING_BUDGET
+voci. Costo per riga limitato, non proporzionale al numero di chiavi.
+
+Punteggio: Dice sui trigrammi, 2*comuni / (trigrammi riga + trigrammi chiave).
+"""
+import heapq
+from itertools import combinations
+
+from manens.keys import mm_text, wh_text
+
+try:
+    unicode
+except NameError:
+    unicode = str
+try:
+    long
+except NameError:
+    long = int
+
+MIN_SCORE = 0.5
+SEGMENTS = 4
+CANDIDATES = 20
+POSTING_BUDGET = 2000
+COUNT_SLACK = 2
+
+
+def _u(s):
+    if s is None: return u""
+    if isinstance(s, unicode): return s
+    try: return unicode(s)
+    except: return unicode(str(s))
+
+def key_text(key):
+    """Parte testuale della chiave, minuscola e a spazi singoli (le misure sono escluse)."""
+    if not isinstance(key, tuple): key = (key,)
+    parts = [_u(p) for p in key if isinstance(p, (str, unicode))]
+    return u" ".join(u" ".join(parts).lower().split())
+
+def _num_parts(key):
+    if not isinstance(key, tuple): return ()
+    return tuple(p for p in key if not isinstance(p, (str, unicode)))
+
+def key_label(key):
+    """Chiave leggibile: testi cosi' come sono, micrometri in mm, (L, H) come "LxH"."""
+    if not isinstance(key, tuple): key = (key,)
+    out = []
+    for p in key:
+        if isinstance(p, tuple) and len(p) == 2: out.append(wh_text(p))
+        elif isinstance(p, (int, long)) and not isinstance(p, bool): out.append(mm_text(p) or u"-")
+        else: out.append(_u(p))
+    return u" | ".join(out)
+
+def trigrams(text):
+    t = u"  " + text + u" "
+    return set([t[i:i+3] for i in range(len(t) - 2)])
+
+def _gram_seq(text):
+    """Trigrammi nell'ordine del testo, senza ripetizioni."""
+    t = u"  " + text + u" "
+    seen = set(); out = []
+    for i in range(len(t) - 2):
+        x = t[i:i+3]
+        if x not in seen:
+            seen.add(x); out.append(x)
+    return out
+
+
+class SuggestIndex(object):
+    def __init__(self, keys):
+        self._texts = []    # testo normalizzato per id
+        self._keys = []     # chiavi del modello per id (stesso testo, misure diverse)
+        by_text = {}
+        words = {}
+        for k in keys:
+            t = key_text(k)
+            if not t: continue
+            i = by_text.get(t)
+            if i is None:
+                i = by_text[t] = len(self._texts)
+                self._texts.append(t); self._keys.append([])
+                for w in set(t.split()):
+                    lst = words.get(w)
+                    if lst is None: words[w] = [i]
+                    else: lst.append(i)
+            self._keys[i].append(k)
+        self._grams = [None] * len(self._texts)    # set di trigrammi per id (calcolato quando serve)
+        self._words = dict((w, set(lst)) for w, lst in words.items())
+        self._post = None
+        self._cache = {}
+
+    def _trigram_index(self):
+        if self._post is None:
+            post = {}
+            for i, t in enumerate(self._texts):
+                for x in self._gram_set(i):
+                    lst = post.get(x)
+                    if lst is None: post[x] = [i]
+                    else: lst.append(i)
+            self._post = dict((x, set(lst)) for x, lst in post.items())
+        return self._post
+
+    def _gram_set(self, i):
+        g = self._grams[i]
+        if g is None: g = self._grams[i] = trigrams(self._texts[i])
+        return g
+
+    def _common(self, lists):
+        """Id presenti in tutte le liste (ordinate dalla piu' corta)."""
+        s = lists[0]
+        for p in lists[1:]:
+            s = s & p
+            if not s: break
+        return s
+
+    def _by_words(self, text):
+        """Candidati con tutte le parole note della riga; se sono tutte note, con tutte
+           tranne una (refuso che da' un'altra parola del modello)."""
+        found = [self._words.get(w) for w in set(text.split())]
+        known = sorted([f for f in found if f is not None], key=len)
+        if not known: return set()
+        if len(known) < len(found):
+            s = self._common(known)
+            return s if len(s) <= CANDIDATES else set()
+        s = self._common(known)
+        if s and len(s) <= CANDIDATES: return s    # testo identico (misure diverse)
+        cands = set()
+        for j in range(len(known)):
+            lists = known[:j] + known[j + 1:]
+            if not lists: continue
+            s = self._common(lists)
+            if len(s) <= CANDIDATES: cands |= s
+        return cands
+
+    def _by_parts(self, seq):
+        """Candidati delle coppie di parti (poi delle parti singole) della sequenza."""
+        post = self._trigram_index()
+        k = min(SEGMENTS, len(seq))
+        parts = [sorted([post[x] for x in seq[len(seq) * j // k:len(seq) * (j + 1) // k]], key=len)
+                 for j in range(k)]
+        for size in (2, 1):
+            if size > k: continue
+            cands = set()
+            for combo in combinations(range(k), size):
+                lists = parts[combo[0]] if size == 1 else sorted(parts[combo[0]] + parts[combo[1]], key=len)
+                s = self._common(lists)
+                if len(s) <= CANDIDATES: cands |= s
+            if cands: return cands
+        return cands
+
+    def _by_count(self, seq):
+        """Candidati vicini al migliore sulle liste dei trigrammi piu' rari (entro POSTING_BUDGET)."""
+        lists = sorted([self._post[x] for x in seq], key=len)
+        counts = {}
+        seen = 0
+        for lst in lists:
+            if seen and seen + len(lst) > POSTING_BUDGET: break
+            seen += len(lst)
+            for i in lst: counts[i] = counts.get(i, 0) + 1
+        floor = max(counts.values() or [0]) - COUNT_SLACK
+        cands = [i for i, c in counts.items() if c >= floor]
+        if len(cands) > CANDIDATES:
+            cands = heapq.nlargest(CANDIDATES, cands, key=counts.get)
+        return cands
+
+    def _scored(self, text):
+        """[(score, id)] ordinati per punteggio decrescente, per un testo normalizzato."""
+        hit = self._cache.get(text)
+        if hit is not None: return hit
+        g = trigrams(text)
+        res = self._score(g, self._by_words(text))
+        if not res:
+            post = self._trigram_index()
+            seq = [x for x in _gram_seq(text) if x in post]
+            if seq: res = self._score(g, self._by_parts(seq) or self._by_count(seq))
+        res.sort(key=lambda r: (-r[0], self._texts[r[1]]))
+        self._cache[text] = res
+        return res
+
+    def _score(self, g, cands):
+        n = len(g)
+        res = []
+        for i in cands:
+            gi = self._gram_set(i)
+            score = 2.0 * len(g & gi) / (n + len(gi))
+            if score >= MIN_SCORE: res.append((score, i))
+        return res
+
+    def suggest(self, key, n=3):
+        """Fino a n chiavi del modello simili a key: [(score, chiave)].
+           A parita' di testo preferisce la chiave con le stesse misure."""
+        text = key_text(key)
+        if not text: return []
+        nums = _num_parts(key)
+        out = []
+        for score, i in self._scored(text)[:n]:
+            cands = self._keys[i]
+            best = cands[0]
+            for k in cands:
+                if _num_parts(k) == nums: best = k; break
+            out.append((score, best))
+        return out
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+Tempi per fase di ogni blocco export / import, con report a fine esecuzione.
+
+Uso nei pushbutton:
+    timing.begin("Revit to Excel HVAC", excel_path)   # in main()
+    tm = timing.block("PIPE")                         # all'inizio del blocco
+    ...collector...;      tm.lap("collect")
+    ...lettura sheet...;  tm.lap("read")
+    tm.count(elements=..., rows=...)
+    timing.lap("save")                                # fasi fuori dai blocchi
+    timing.end()                                      # tabella + JSON
+
+tm.lap(fase) assegna alla fase il tempo trascorso dal lap precedente (stesso nome
+= tempi sommati), quindi le fasi si aggiungono senza reindentare il codice.
+Il JSON di ogni esecuzione finisce in %APPDATA%\\Manens\\runs.
+Senza begin() i blocchi misurano lo stesso ma non vengono riportati.
+Tra begin() ed end() le print vanno nel log di manens.report: end() disegna
+un solo riepilogo invece delle righe sparse dei blocchi.
+
+call(nome, secondi) registra una chiamata esterna (es. COM verso Excel, vedi
+manens.comprobe) nel blocco aperto: conteggi per nome e istogramma delle latenze.
+"""
+import json
+import os
+import time
+from timeit import default_timer as _now
+
+from manens import report
+
+# ordine delle colonne nel report (le fasi non elencate vanno in coda)
+PHASES = ("open", "collect", "extract", "group", "sidecar", "read", "index", "diff", "write",
+          "delete", "append", "sort", "report", "save", "commit")
+
+# limiti superiori (ms) delle classi dell'istogramma latenze; l'ultima e' aperta
+HIST_MS = (0.1, 1.0, 10.0, 100.0)
+
+_current = None
+_last = None
+
+
+def _ms(sec):
+    return int(round(sec * 1000.0))
+
+def _hist_labels():
+    return [u"<{:g}ms".format(x) for x in HIST_MS] + [u">={:g}ms".format(HIST_MS[-1])]
+
+def _store_dir():
+    base = os.environ.get("APPDATA") or os.path.expanduser("~")
+    return os.path.join(base, "Manens", "runs")
+
+
+class BlockTimer(object):
+    def __init__(self, name, run=None):
+        self.name = name
+        self.run = run
+        self.phases = []        # [(fase, secondi)] nell'ordine del primo lap
+        self._acc = {}
+        self.counts = {}
+        self.calls = {}         # nome -> [numero, secondi]
+        self._t0 = self._t = _now()
+
+    def lap(self, phase):
+        t = _now()
+        if phase not in self._acc:
+            self._acc[phase] = 0.0
+            self.phases.append(phase)
+        self._acc[phase] += t - self._t
+        self._t = t
+        if self.run is not None: self.run._t = t
+        return self
+
+    def count(self, **values):
+        self.counts.update(values)
+        return self
+
+    def call(self, name, sec):
+        c = self.calls.get(name)
+        if c is None: c = self.calls[name] = [0, 0.0]
+        c[0] += 1; c[1] += sec
+
+    def n_calls(self):
+        return sum(c[0] for c in self.calls.values())
+
+    def ms(self, phase):
+        return _ms(self._acc.get(phase, 0.0))
+
+    def total_ms(self):
+        return _ms(self._t - self._t0)
+
+    def record(self):
+        return {"block": self.name,
+                "total_ms": self.total_ms(),
+                "ms": dict((p, self.ms(p)) for p in self.phases),
+                "counts": dict(self.counts),
+                "calls": dict((k, v[0]) for k, v in self.calls.items()),
+                "calls_ms": dict((k, _ms(v[1])) for k, v in self.calls.items())}
+
+
+class RunLog(object):
+    def __init__(self, tool, workbook=u""):
+        self.tool = tool
+        self.workbook = workbook
+        self.started = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.blocks = []
+        self.prefix = u""       # es. "HVAC | " nell'import MULTI
+        self.paths = []         # percorsi completi dei workbook
+        self.state = {}         # dati dei moduli da tenere fino a fine esecuzione (registro di manens.blocks.sync)
+        self.main = BlockTimer(u"(run)")
+        self.hist = [0] * (len(HIST_MS) + 1)
+        self._open = None       # blocco a cui vanno le call() (e le print, vedi manens.report)
+        self._stamp = None
+        self._t0 = self._t = _now()
+
+    def block(self, name):
+        b = BlockTimer(self.prefix + name, self)
+        self.blocks.append(b)
+        self._open = b
+        return b
+
+    def lap(self, phase):
+        """Fase fuori dai blocchi (apertura workbook, salvataggio...)."""
+        self._open = None
+        self.main._t = self._t
+        self.main.lap(phase)
+        self._t = self.main._t
+
+    def call(self, name, sec):
+        (self._open or self.main).call(name, sec)
+        ms = sec * 1000.0
+        i = 0
+        while i < len(HIST_MS) and ms >= HIST_MS[i]: i += 1
+        self.hist[i] += 1
+
+    def total_ms(self):
+        return _ms(_now() - self._t0)
+
+    def record(self):
+        return {"tool": self.tool, "workbook": self.workbook, "started": self.started,
+                "total_ms": self.total_ms(),
+                "run_ms": dict((p, self.main.ms(p)) for p in self.main.phases),
+                "run_calls": dict((k, v[0]) for k, v in self.main.calls.items()),
+                "call_hist": dict(zip(_hist_labels(), self.hist)),
+                "blocks": [b.record() for b in self.blocks]}
+
+    def table(self):
+        """Righe di testo: un blocco per riga, ms per fase, totale e conteggi."""
+        used = []
+        for b in self.blocks + [self.main]:
+            for p in b.phases:
+                if p not in used: used.append(p)
+        cols = [p for p in PHASES if p in used] + [p for p in used if p not in PHASES]
+        w = max([len(b.name) for b in self.blocks + [self.main]] + [6])
+        head = u"{:<{w}} ".format(u"blocco", w=w) + u" ".join(u"{:>8}".format(c) for c in cols) + u" {:>9}".format(u"totale")
+        out = [u"[TEMPI] {} | {}".format(self.tool, self.workbook), head]
+        for b in self.blocks + [self.main]:
+            if b is self.main and not b.phases: continue
+            cells = u" ".join(u"{:>8}".format(b.ms(c) if c in b._acc else u"-") for c in cols)
+            tot = b.total_ms() if b is not self.main else sum(b.ms(p) for p in b.phases)
+            cnt = u", ".join(u"{}={}".format(k, b.counts[k]) for k in sorted(b.counts))
+            out.append(u"{:<{w}} {} {:>9}  {}".format(b.name, cells, tot, cnt, w=w).rstrip())
+        out.append(u"[TEMPI] Totale: {} ms".format(self.total_ms()))
+        if sum(self.hist):
+            for b in self.blocks + [self.main]:
+                if not b.calls: continue
+                out.append(u"[COM] {}: {} chiamate, {} ms | {}".format(
+                    b.name, b.n_calls(), _ms(sum(c[1] for c in b.calls.values())),
+                    u", ".join(u"{}={}".format(k, b.calls[k][0]) for k in sorted(b.calls))))
+            out.append(u"[COM] Latenze: " + u" | ".join(
+                u"{}: {}".format(l, n) for l, n in zip(_hist_labels(), self.hist)))
+        return out
+
+    def path(self, ext):
+        """File dell'esecuzione in %APPDATA%\\Manens\\runs (stesso nome per ogni estensione)."""
+        try:
+            d = _store_dir()
+            if not os.path.isdir(d): os.makedirs(d)
+            if self._stamp is None:
+                now = time.time()
+                self._stamp = u"{}-{:03d}".format(time.strftime("%Y%m%d-%H%M%S", time.localtime(now)), int(now * 1000) % 1000)
+            safe = u"".join(c if c.isalnum() else u"_" for c in self.tool)
+            return os.path.join(d, u"{}-{}{}".format(self._stamp, safe, ext))
+        except:
+            return None
+
+    def save(self):
+        """Scrive il record JSON dell'esecuzione; ritorna il percorso (None se non riesce)."""
+        try:
+            path = self.path(u".json")
+            with open(path, "w") as f:
+                json.dump(self.record(), f, indent=1, sort_keys=True)
+            return path
+        except:
+            return None
+
+
+def begin(tool, workbook_path=u"", buffered=True):
+    """Apre l'esecuzione; workbook_path puo' essere anche una lista di percorsi.
+       buffered: print raccolte nel log di manens.report fino a end()."""
+    global _current
+    if isinstance(workbook_path, (list, tuple)):
+        name = u", ".join(os.path.basename(p) for p in workbook_path)
+    else:
+        name = os.path.basename(workbook_path or u"")
+    _current = RunLog(tool, name)
+    _current.paths = list(workbook_path) if isinstance(workbook_path, (list, tuple)) else [workbook_path or u""]
+    if buffered: report.start(_current)
+    return _current
+
+def current():
+    return _current
+
+def last():
+    """Ultima esecuzione chiusa da end() (per chi deve scrivere accanto al workbook)."""
+    return _last
+
+def scope(label):
+    """Prefisso dei blocchi successivi (disciplina / workbook nell'import MULTI)."""
+    if _current is not None: _current.prefix = label + u" | " if label else u""
+
+def block(name):
+    """Timer di un blocco, agganciato all'esecuzione corrente (se c'e')."""
+    if _current is None: return BlockTimer(name)
+    return _current.block(name)
+
+def lap(phase):
+    if _current is not None: _current.lap(phase)
+
+def call(name, sec):
+    if _current is not None: _current.call(name, sec)
+
+def end(show=True, save=True):
+    """Chiude l'esecuzione: salva il JSON e disegna il riepilogo (manens.report)."""
+    global _current, _last
+    run = _current
+    _current = None
+    if run is None: return None
+    _last = run
+    log = report.stop()
+    path = run.save() if save else None
+    if show: report.show(run, log, path)
+    elif log is not None and save: report.write_file(run, log, run.path(u".txt"))
+    return run
@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+"""
+Avvio dell'estensione: pyRevit esegue questo file una volta, al caricamento.
+
+Aggancia il tracciamento delle modifiche al modello (manens.dirty) usato dagli
+export Revit -> Excel per rileggere solo gli elementi cambiati dall'ultimo clic.
+"""
+try:
+    from manens import dirty
+    dirty.install(__revit__.Application)
+except Exception as ex:
+    print("[MANENS] Tracciamento modifiche non attivo: {}".format(ex))